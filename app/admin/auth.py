@@ -28,10 +28,11 @@ class AdminAuthService:
         return user_id in self.admin_ids
 
     def is_locked(self, user_id: int) -> bool:
-        row = self.repo.conn.execute(
-            "SELECT locked_until FROM admin_login_attempt WHERE user_id=?",
-            (user_id,),
-        ).fetchone()
+        with self.repo.reader() as conn:
+            row = conn.execute(
+                "SELECT locked_until FROM admin_login_attempt WHERE user_id=?",
+                (user_id,),
+            ).fetchone()
         if not row or row["locked_until"] is None:
             return False
         return int(row["locked_until"]) > int(time.time())
@@ -54,8 +55,8 @@ class AdminAuthService:
             return False, "invalid_password"
         self._clear_failed_attempt(user_id)
         now = int(time.time())
-        with self.repo.conn:
-            self.repo.conn.execute(
+        with self.repo.writer() as conn:
+            conn.execute(
                 """
                 INSERT INTO admin_session(user_id, expires_at, created_at)
                 VALUES (?, ?, ?)
@@ -66,14 +67,15 @@ class AdminAuthService:
         return True, "ok"
 
     def logout(self, user_id: int) -> None:
-        with self.repo.conn:
-            self.repo.conn.execute("DELETE FROM admin_session WHERE user_id=?", (user_id,))
+        with self.repo.writer() as conn:
+            conn.execute("DELETE FROM admin_session WHERE user_id=?", (user_id,))
 
     def is_authenticated(self, user_id: int) -> bool:
-        row = self.repo.conn.execute(
-            "SELECT expires_at FROM admin_session WHERE user_id=?",
-            (user_id,),
-        ).fetchone()
+        with self.repo.reader() as conn:
+            row = conn.execute(
+                "SELECT expires_at FROM admin_session WHERE user_id=?",
+                (user_id,),
+            ).fetchone()
         if not row:
             return False
         now = int(time.time())
@@ -83,17 +85,18 @@ class AdminAuthService:
         return True
 
     def _record_failed_attempt(self, user_id: int) -> None:
-        row = self.repo.conn.execute(
-            "SELECT failed_attempts FROM admin_login_attempt WHERE user_id=?",
-            (user_id,),
-        ).fetchone()
+        with self.repo.reader() as conn:
+            row = conn.execute(
+                "SELECT failed_attempts FROM admin_login_attempt WHERE user_id=?",
+                (user_id,),
+            ).fetchone()
         failed_attempts = int(row["failed_attempts"]) + 1 if row else 1
         locked_until = None
         if failed_attempts >= self.max_failed_attempts:
             locked_until = int(time.time()) + self.lockout_seconds
             failed_attempts = 0
-        with self.repo.conn:
-            self.repo.conn.execute(
+        with self.repo.writer() as conn:
+            conn.execute(
                 """
                 INSERT INTO admin_login_attempt(user_id, failed_attempts, locked_until)
                 VALUES (?, ?, ?)
@@ -105,6 +108,6 @@ class AdminAuthService:
             )
 
     def _clear_failed_attempt(self, user_id: int) -> None:
-        with self.repo.conn:
-            self.repo.conn.execute("DELETE FROM admin_login_attempt WHERE user_id=?", (user_id,))
+        with self.repo.writer() as conn:
+            conn.execute("DELETE FROM admin_login_attempt WHERE user_id=?", (user_id,))
 
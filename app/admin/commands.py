@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import logging
+import time
 
 from telegram import Update
 from telegram.constants import ChatType
 from telegram.ext import ContextTypes
 
 from app.context import RuntimeContext
+from app.storage.repository import ChannelStats
 
 
 logger = logging.getLogger(__name__)
@@ -260,6 +262,12 @@ async def admin_channel_enable(update: Update, context: ContextTypes.DEFAULT_TYP
         await update.effective_message.reply_text(f"Channel {chat_id} not found in whitelist.")
 
 
+def _format_channel_stats(item: ChannelStats) -> str:
+    first = time.strftime("%Y-%m-%d", time.localtime(item.first_timestamp))
+    last = time.strftime("%Y-%m-%d", time.localtime(item.last_timestamp))
+    return f"{item.message_count} msgs, {first} ~ {last}"
+
+
 async def admin_channel_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """List all channels in whitelist: /admin_channel_list"""
     runtime = _ctx(context)
@@ -269,17 +277,24 @@ async def admin_channel_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
         return
     
     channels = runtime.repo.get_allowed_channels()
+    stats = {item.chat_id: item for item in runtime.repo.get_channel_stats()}
     runtime.repo.insert_admin_audit(admin_id, action="admin_channel_list")
     
     if not channels:
-        await update.effective_message.reply_text("Whitelist is empty. All channels are allowed.")
+        lines = ["Whitelist is empty. All channels are allowed."]
+        if stats:
+            lines.append("📚 Indexed Channels:")
+            lines.extend(f"• {chat_id} - {_format_channel_stats(item)}" for chat_id, item in stats.items())
+        await update.effective_message.reply_text("\n".join(lines))
         return
     
     lines = ["📋 Allowed Channels:"]
     for ch in channels:
         status = "✓ Enabled" if ch["enabled"] else "✗ Disabled"
         desc = f" ({ch['description']})" if ch["description"] else ""
-        lines.append(f"• {ch['chat_id']} - {ch['channel_name']} [{status}]{desc}")
+        item = stats.get(ch["chat_id"])
+        counts = f" — {_format_channel_stats(item)}" if item else " — 0 msgs"
+        lines.append(f"• {ch['chat_id']} - {ch['channel_name']} [{status}]{desc}{counts}")
     
     await update.effective_message.reply_text("\n".join(lines))
 
@@ -318,3 +333,63 @@ async def admin_delete_msg(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await update.effective_message.reply_text(
         f"Message not found: chat_id={chat_id}, message_id={message_id}"
     )
+
+
+async def admin_stats(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show runtime metrics: /admin_stats"""
+    runtime = _ctx(context)
+    admin_id = _check_admin(update, runtime)
+    if admin_id is None:
+        await update.effective_message.reply_text("Admin authentication required.")
+        return
+
+    lines = ["📊 Runtime Stats:"]
+    queue = runtime.ingest_queue
+    if queue is not None:
+        stats = queue.stats
+        lines.append(
+            f"• ingest queue: depth={queue.depth}/{queue.max_size} enqueued={stats.enqueued} "
+            f"committed={stats.committed} unchanged={stats.unchanged} failed={stats.failed}"
+        )
+        lines.append(
+            f"• ingest commits: batches={stats.batches} last_batch={stats.last_batch_size} "
+            f"last={stats.last_commit_ms:.1f}ms avg={stats.avg_commit_ms:.1f}ms max={stats.max_commit_ms:.1f}ms"
+        )
+    inline = runtime.inline_gate.stats
+    lines.append(
+        f"• inline queries: received={inline.received} answered={inline.answered} "
+        f"cancelled={inline.cancelled} skipped={inline.skipped} too_short={inline.too_short}"
+    )
+    for name, cache in (("search cache", runtime.search_service.cache), ("inline cache", runtime.inline_cache)):
+        if cache.enabled:
+            lines.append(
+                f"• {name}: entries={len(cache)}/{cache.max_entries} hits={cache.stats.hits} "
+                f"misses={cache.stats.misses} stale={cache.stats.stale} evictions={cache.stats.evictions} "
+                f"hit_rate={cache.stats.hit_rate:.1%}"
+            )
+        else:
+            lines.append(f"• {name}: disabled")
+    runtime.repo.insert_admin_audit(admin_id, action="admin_stats")
+    await update.effective_message.reply_text("\n".join(lines))
+
+
+async def admin_fts_optimize(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Merge all FTS segments and run PRAGMA optimize: /admin_fts_optimize"""
+    runtime = _ctx(context)
+    admin_id = _check_admin(update, runtime)
+    if admin_id is None:
+        await update.effective_message.reply_text("Admin authentication required.")
+        return
+
+    await update.effective_message.reply_text("Running full FTS optimize, this may take a while...")
+    started = time.perf_counter()
+    try:
+        await runtime.async_repo.run(runtime.repo.fts_optimize)
+    except Exception as exc:
+        logger.exception("admin fts optimize failed")
+        runtime.repo.insert_admin_audit(admin_id, action="admin_fts_optimize", detail=f"failed: {exc!r}")
+        await update.effective_message.reply_text(f"FTS optimize failed: {exc!r}")
+        return
+    elapsed = time.perf_counter() - started
+    runtime.repo.insert_admin_audit(admin_id, action="admin_fts_optimize", detail=f"ok {elapsed:.1f}s")
+    await update.effective_message.reply_text(f"FTS optimize done in {elapsed:.1f}s.")
@@ -37,6 +37,15 @@ class ConfigStore:
             return value
         return self._decrypt_value(value)
 
+    def get_int(self, key: str, default: int) -> int:
+        value = self.get(key)
+        if value is None or value.strip() == "":
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            return default
+
     def list_masked(self) -> list[tuple[str, str, bool]]:
         rows = self.repo.list_config()
         result: list[tuple[str, str, bool]] = []
@@ -5,6 +5,8 @@ import os
 from dataclasses import dataclass
 from pathlib import Path
 
+from app.search.ranking import parse_sort
+
 
 def _parse_bool(value: str | None, default: bool = False) -> bool:
     if value is None:
@@ -24,16 +26,58 @@ def _parse_admin_ids(value: str | None) -> set[int]:
     return ids
 
 
+def _parse_fts_mode(raw: str | None) -> str:
+    value = (raw or "external").strip().lower()
+    if value not in {"external", "contentless"}:
+        raise ValueError("FTS_MODE must be external or contentless")
+    return value
+
+
+def _parse_pragmas(value: str | None) -> dict[str, str]:
+    if not value:
+        return {}
+    pragmas: dict[str, str] = {}
+    for item in value.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        if "=" not in item:
+            raise ValueError(f"invalid SQLITE_PRAGMAS entry: {item}")
+        name, raw = item.split("=", 1)
+        pragmas[name.strip().lower()] = raw.strip()
+    return pragmas
+
+
 @dataclass(slots=True)
 class Settings:
     bot_token: str
     app_mode: str
     sqlite_path: str
+    sqlite_read_pool_size: int
+    sqlite_busy_timeout_ms: int
+    sqlite_pragmas: dict[str, str]
+    fts_mode: str
+    db_executor_workers: int
+    concurrent_updates: int
+    ingest_batch_size: int
+    ingest_flush_ms: int
+    ingest_queue_max_size: int
     default_search_limit: int
+    search_count_limit: int
+    search_default_sort: str
+    search_hybrid_half_life_days: float
+    search_hybrid_recency_weight: float
+    search_cache_size: int
+    search_cache_ttl_seconds: float
     default_random_limit: int
     max_random_limit: int
     private_page_size: int
     private_separator: str
+    inline_page_size: int
+    inline_min_query_chars: int
+    inline_cache_time: int
+    inline_result_cache_size: int
+    inline_debounce_ms: int
     webhook_url: str
     webhook_listen_host: str
     webhook_listen_port: int
@@ -81,11 +125,31 @@ def load_settings() -> Settings:
         bot_token=os.getenv("BOT_TOKEN", "").strip(),
         app_mode=os.getenv("APP_MODE", "polling").strip(),
         sqlite_path=os.getenv("SQLITE_PATH", "data/tg_search.db").strip(),
+        sqlite_read_pool_size=int(os.getenv("SQLITE_READ_POOL_SIZE", "4")),
+        sqlite_busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        sqlite_pragmas=_parse_pragmas(os.getenv("SQLITE_PRAGMAS")),
+        fts_mode=_parse_fts_mode(os.getenv("FTS_MODE")),
+        db_executor_workers=int(os.getenv("DB_EXECUTOR_WORKERS", "4")),
+        concurrent_updates=int(os.getenv("BOT_CONCURRENT_UPDATES", "16")),
+        ingest_batch_size=int(os.getenv("INGEST_BATCH_SIZE", "200")),
+        ingest_flush_ms=int(os.getenv("INGEST_FLUSH_MS", "50")),
+        ingest_queue_max_size=int(os.getenv("INGEST_QUEUE_MAX_SIZE", "5000")),
         default_search_limit=int(os.getenv("DEFAULT_SEARCH_LIMIT", "50")),
+        search_count_limit=int(os.getenv("SEARCH_COUNT_LIMIT", "1000")),
+        search_default_sort=parse_sort(os.getenv("SEARCH_DEFAULT_SORT")),
+        search_hybrid_half_life_days=float(os.getenv("SEARCH_HYBRID_HALF_LIFE_DAYS", "30")),
+        search_hybrid_recency_weight=float(os.getenv("SEARCH_HYBRID_RECENCY_WEIGHT", "1.0")),
+        search_cache_size=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+        search_cache_ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60")),
         default_random_limit=int(os.getenv("DEFAULT_RANDOM_LIMIT", "1")),
         max_random_limit=int(os.getenv("MAX_RANDOM_LIMIT", "10")),
         private_page_size=int(os.getenv("PRIVATE_PAGE_SIZE", "10")),
         private_separator=os.getenv("PRIVATE_SEPARATOR", "🐾🐾🐾"),
+        inline_page_size=int(os.getenv("INLINE_PAGE_SIZE", "10")),
+        inline_min_query_chars=int(os.getenv("INLINE_MIN_QUERY_CHARS", "1")),
+        inline_cache_time=int(os.getenv("INLINE_CACHE_TIME", "30")),
+        inline_result_cache_size=int(os.getenv("INLINE_RESULT_CACHE_SIZE", "512")),
+        inline_debounce_ms=int(os.getenv("INLINE_DEBOUNCE_MS", "0")),
         webhook_url=os.getenv("WEBHOOK_URL", "").strip(),
         webhook_listen_host=os.getenv("WEBHOOK_LISTEN_HOST", "0.0.0.0").strip(),
         webhook_listen_port=int(os.getenv("WEBHOOK_LISTEN_PORT", "8443")),
@@ -5,8 +5,14 @@ import time
 
 from app.admin.auth import AdminAuthService
 from app.admin.config_store import ConfigStore
+from app.ingest.ordering import IngestOrder
+from app.ingest.queue import IngestQueue
+from app.interaction.inline_gate import InlineQueryGate
+from app.search.async_service import AsyncSearchService
+from app.search.cache import SearchCache
 from app.search.service import SearchService
 from app.search.tokenizer import Tokenizer
+from app.storage.async_repository import AsyncMessageRepository, create_db_executor
 from app.storage.repository import MessageRepository
 
 
@@ -24,6 +30,25 @@ class RuntimeContext:
     private_separator: str
     proxy_fail_open: bool
     polling_idle_restart_seconds: int
+    async_repo: AsyncMessageRepository | None = None
+    async_search: AsyncSearchService | None = None
+    ingest_queue: IngestQueue | None = None
+    ingest_order: IngestOrder = field(default_factory=IngestOrder)
+    inline_gate: InlineQueryGate = field(default_factory=InlineQueryGate)
+    # Results per inline answer; more load via next_offset as the user scrolls.
+    inline_page_size: int = 10
+    # Telegram-side cache_time for shared (non-personal) inline answers; 1 keeps
+    # every answer personal and uncached.
+    inline_cache_time: int = 1
+    # Built inline result pages, invalidated by the same write generations.
+    inline_cache: SearchCache = field(default_factory=SearchCache)
     last_update_ts: float = 0.0
     last_api_ok_ts: float = 0.0
     started_at_ts: float = field(default_factory=time.time)
+
+    def __post_init__(self) -> None:
+        if self.async_repo is None:
+            executor = self.async_search.executor if self.async_search is not None else create_db_executor()
+            self.async_repo = AsyncMessageRepository(self.repo, executor)
+        if self.async_search is None:
+            self.async_search = AsyncSearchService(self.search_service, self.async_repo.executor)
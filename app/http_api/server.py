@@ -10,6 +10,9 @@ from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import parse_qs, urlparse
 
 from app.context import RuntimeContext
+from app.search.cursor import next_cursor
+from app.search.ranking import SORT_TIME, parse_sort
+from app.search.time_window import parse_time_bound
 
 
 logger = logging.getLogger(__name__)
@@ -123,14 +126,29 @@ def _build_handler(runtime: RuntimeContext):
                 )
                 limit = min(limit, 200)
                 offset = _parse_non_negative_int(query_dict.get("offset", [None])[0], default=0)
+                cursor = (query_dict.get("cursor", [""])[0] or "").strip() or None
+                if cursor is not None:
+                    offset = 0
+                sort = parse_sort(
+                    query_dict.get("sort", [None])[0],
+                    default=runtime.search_service.default_sort,
+                )
+
+                since = parse_time_bound(query_dict.get("since", [None])[0])
+                until = parse_time_bound(query_dict.get("until", [None])[0], end=True)
 
-                total = runtime.search_service.count(query=query, channel_filter=channel_filter)
-                rows = runtime.search_service.search(
+                page = runtime.search_service.search_page(
                     query=query,
                     limit=limit,
                     offset=offset,
                     channel_filter=channel_filter,
+                    cursor=cursor,
+                    exact=_parse_bool(query_dict.get("exact_total", [None])[0]),
+                    sort=sort,
+                    since=since,
+                    until=until,
                 )
+                rows = page.rows
                 items = [
                     {
                         "id": row.id,
@@ -153,7 +171,13 @@ def _build_handler(runtime: RuntimeContext):
                             "channel": channel_filter,
                             "limit": limit,
                             "offset": offset,
-                            "total": total,
+                            "sort": sort,
+                            "since": since,
+                            "until": until,
+                            "cursor": cursor,
+                            "next_cursor": next_cursor(rows, limit) if sort == SORT_TIME else None,
+                            "total": page.total,
+                            "total_exact": page.total_exact,
                             "items": items,
                         },
                     },
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Iterator
+from typing import Any, TextIO
+
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class _ChunkedJsonReader:
+    """Minimal pull parser over a text stream that keeps only a small window in memory."""
+
+    def __init__(self, fp: TextIO, chunk_size: int) -> None:
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"malformed export json: expected {char!r}, found {found or 'EOF'!r}")
+        self.pos += 1
+
+    def decode_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A value that ends exactly at the window edge may be a truncated number.
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            self._fill()
+
+
+def stream_export(
+    json_path: str,
+    header: dict[str, Any],
+    chunk_size: int = 1 << 16,
+) -> Iterator[Any]:
+    """Yield the entries of the top-level ``messages`` array one at a time.
+
+    Every other top-level key is stored into ``header`` as soon as it is read, so
+    for a regular Telegram Desktop export ``id``/``name`` are available before
+    the first message is yielded.
+    """
+    with open(json_path, encoding="utf-8") as fp:
+        reader = _ChunkedJsonReader(fp, chunk_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.decode_value()
+            if not isinstance(key, str):
+                raise ValueError("malformed export json: object key is not a string")
+            reader.expect(":")
+            if key == "messages" and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.decode_value()
+                        if reader.peek() == ",":
+                            reader.pos += 1
+                            continue
+                        reader.expect("]")
+                        break
+            else:
+                header[key] = reader.decode_value()
+            if reader.peek() == ",":
+                reader.pos += 1
+                continue
+            reader.expect("}")
+            return
+
+
+def read_export_header(json_path: str, chunk_size: int = 1 << 16) -> dict[str, Any]:
+    """Read top-level fields, stopping at the first message once ``id`` is known."""
+    header: dict[str, Any] = {}
+    for _ in stream_export(json_path, header, chunk_size=chunk_size):
+        if "id" in header:
+            break
+    return header
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from app.normalize.channel_message import NormalizedMessage
+from app.search.tokenizer import Tokenizer
+
+
+_worker_tokenizer: Tokenizer | None = None
+
+
+def _init_tokenize_worker(tokenizer: Tokenizer) -> None:
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _tokenize_texts(texts: list[str]) -> tuple[list[list[str]], float]:
+    assert _worker_tokenizer is not None
+    started = time.perf_counter()
+    tokens = [_worker_tokenizer.tokenize(text) for text in texts]
+    return tokens, time.perf_counter() - started
+
+
+def _chunks(messages: Iterable[NormalizedMessage], size: int) -> Iterator[list[NormalizedMessage]]:
+    chunk: list[NormalizedMessage] = []
+    for msg in messages:
+        chunk.append(msg)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class TokenizeStage:
+    """Tokenize messages in order, inline or fanned out to a process pool.
+
+    With ``workers > 1`` at most ``2 * workers`` chunks are in flight, so memory
+    stays bounded while the single writer consumes results in input order.
+    ``tokenized`` counts messages whose tokens have come back; ``seconds`` is
+    the stage's wall-clock time (inline: time spent tokenizing; pooled: from
+    the first submit to the last result) and ``cpu_seconds`` the tokenizer
+    time summed over workers.
+    """
+
+    def __init__(self, tokenizer: Tokenizer, workers: int = 1, chunk_size: int = 256) -> None:
+        self.tokenizer = tokenizer
+        self.workers = max(workers, 1)
+        self.chunk_size = chunk_size
+        self.tokenized = 0
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def run(self, messages: Iterable[NormalizedMessage]) -> Iterator[tuple[NormalizedMessage, list[str]]]:
+        if self.workers == 1:
+            for msg in messages:
+                started = time.perf_counter()
+                tokens = self.tokenizer.tokenize(msg.text)
+                elapsed = time.perf_counter() - started
+                self.seconds += elapsed
+                self.cpu_seconds += elapsed
+                self.tokenized += 1
+                yield msg, tokens
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_tokenize_worker,
+            initargs=(self.tokenizer,),
+        ) as pool:
+            inflight: deque[tuple[list[NormalizedMessage], Future]] = deque()
+            first_submit: float | None = None
+            for chunk in _chunks(messages, self.chunk_size):
+                if first_submit is None:
+                    first_submit = time.perf_counter()
+                inflight.append((chunk, pool.submit(_tokenize_texts, [msg.text for msg in chunk])))
+                if len(inflight) >= self.workers * 2:
+                    yield from self._collect(*inflight.popleft())
+            while inflight:
+                yield from self._collect(*inflight.popleft())
+            if first_submit is not None:
+                self.seconds = time.perf_counter() - first_submit
+
+    def _collect(
+        self,
+        chunk: list[NormalizedMessage],
+        future: Future,
+    ) -> Iterator[tuple[NormalizedMessage, list[str]]]:
+        tokens_list, elapsed = future.result()
+        self.cpu_seconds += elapsed
+        self.tokenized += len(chunk)
+        yield from zip(chunk, tokens_list)
@@ -1,20 +1,43 @@
 from __future__ import annotations
 
-import json
+import time
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
-from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
 
+from app.importer.json_stream import read_export_header, stream_export
+from app.importer.pipeline import TokenizeStage
 from app.normalize.channel_message import NormalizedMessage, extract_text_field
 from app.search.tokenizer import Tokenizer
 from app.storage.repository import MessageRepository
 
 
+_T = TypeVar("_T")
+
 @dataclass(slots=True)
 class ImportStats:
     total: int = 0
     skipped: int = 0
     imported: int = 0
+    tokenized: int = 0
+    workers: int = 1
+    parse_seconds: float = 0.0
+    tokenize_seconds: float = 0.0
+    # Tokenizer time summed over workers; exceeds tokenize_seconds when pooled.
+    tokenize_cpu_seconds: float = 0.0
+    write_seconds: float = 0.0
+
+    def stage_rates(self) -> dict[str, float]:
+        """Wall-clock messages per second per stage."""
+        return {
+            "parse": _rate(self.total, self.parse_seconds),
+            "tokenize": _rate(self.tokenized, self.tokenize_seconds),
+            "write": _rate(self.imported, self.write_seconds),
+        }
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
 
 
 def _to_bot_api_chat_id(raw_chat_id: int) -> int:
@@ -52,16 +75,27 @@ def import_telegram_export(
     tokenizer: Tokenizer,
     dry_run: bool = False,
     channel_alias: str | None = None,
+    bulk: bool = False,
+    batch_size: int = 5000,
+    workers: int = 1,
 ) -> ImportStats:
-    data = json.loads(Path(json_path).read_text(encoding="utf-8"))
-    chat_id = _to_bot_api_chat_id(int(data["id"]))
-    channel_name = data.get("name", "")
-    stats = ImportStats(total=len(data.get("messages", [])))
+    if bulk and not dry_run:
+        with repo.bulk_load():
+            return _import_messages(json_path, repo, tokenizer, dry_run, channel_alias, bulk, batch_size, workers)
+    return _import_messages(json_path, repo, tokenizer, dry_run, channel_alias, bulk, batch_size, workers)
 
-    # Use provided alias or fall back to channel name from JSON
-    username = channel_alias or channel_name
 
-    for item in data.get("messages", []):
+def _parse_messages(
+    json_path: str,
+    chat_id: int,
+    username: str,
+    stats: ImportStats,
+) -> Iterator[NormalizedMessage]:
+    for item in stream_export(json_path, {}):
+        stats.total += 1
+        if not isinstance(item, dict):
+            stats.skipped += 1
+            continue
         normalized = _normalize_import_message(item, chat_id)
         if normalized is None:
             stats.skipped += 1
@@ -69,11 +103,66 @@ def import_telegram_export(
         # Set channel username if available
         if username and not normalized.channel_username:
             normalized.channel_username = username.lstrip("@") if not username.startswith("@") else username
-        tokens = tokenizer.tokenize(normalized.text)
+        yield normalized
+
+
+def _timed(items: Iterable[_T], stats: ImportStats) -> Iterator[_T]:
+    """Charge the time spent producing each item to the parse stage."""
+    iterator = iter(items)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stats.parse_seconds += time.perf_counter() - started
+            return
+        stats.parse_seconds += time.perf_counter() - started
+        yield item
+
+
+def _import_messages(
+    json_path: str,
+    repo: MessageRepository,
+    tokenizer: Tokenizer,
+    dry_run: bool,
+    channel_alias: str | None,
+    bulk: bool,
+    batch_size: int,
+    workers: int,
+) -> ImportStats:
+    # Two streaming passes: the header pass stops at the first message for regular exports.
+    header = read_export_header(json_path)
+    if "id" not in header:
+        raise ValueError("export json has no top-level id")
+    chat_id = _to_bot_api_chat_id(int(header["id"]))
+    channel_name = header.get("name", "")
+    stats = ImportStats(workers=max(workers, 1))
+
+    # Use provided alias or fall back to channel name from JSON
+    username = channel_alias or channel_name
+    pending: list[tuple[NormalizedMessage, list[str]]] = []
+    stage = TokenizeStage(tokenizer, workers=stats.workers)
+    parsed = _timed(_parse_messages(json_path, chat_id, username, stats), stats)
+
+    for normalized, tokens in stage.run(parsed):
         if not tokens:
             stats.skipped += 1
             continue
         if not dry_run:
-            repo.upsert_message(normalized, tokens)
+            started = time.perf_counter()
+            if bulk:
+                pending.append((normalized, tokens))
+                if len(pending) >= batch_size:
+                    repo.bulk_upsert_messages(pending)
+                    pending = []
+            else:
+                repo.upsert_message(normalized, tokens)
+            stats.write_seconds += time.perf_counter() - started
         stats.imported += 1
+    started = time.perf_counter()
+    repo.bulk_upsert_messages(pending)
+    stats.write_seconds += time.perf_counter() - started
+    stats.tokenized = stage.tokenized
+    stats.tokenize_seconds = stage.seconds
+    stats.tokenize_cpu_seconds = stage.cpu_seconds
     return stats
@@ -5,7 +5,7 @@ from typing import Any
 
 from app.normalize.channel_message import normalize_channel_message
 from app.search.tokenizer import Tokenizer
-from app.storage.repository import MessageRepository
+from app.storage.repository import MessageRepository, MessageWrite
 
 
 @dataclass(slots=True)
@@ -15,9 +15,11 @@ class HandleResult:
     chat_id: int | None = None
     message_id: int | None = None
     text_len: int = 0
+    write: MessageWrite | None = None
 
 
-def handle_channel_message(raw_msg: object, repo: MessageRepository, tokenizer: Tokenizer) -> HandleResult:
+def prepare_channel_message(raw_msg: object, tokenizer: Tokenizer) -> HandleResult:
+    """Normalize and tokenize a channel_post; the pending write is left on ``result.write``."""
     normalized = normalize_channel_message(raw_msg, source="live")
     if normalized is None:
         return HandleResult(ok=False, reason="normalize_failed")
@@ -30,13 +32,13 @@ def handle_channel_message(raw_msg: object, repo: MessageRepository, tokenizer:
             message_id=normalized.message_id,
             text_len=len(normalized.text),
         )
-    repo.upsert_message(normalized, tokens)
     return HandleResult(
         ok=True,
-        reason="indexed",
+        reason="pending",
         chat_id=normalized.chat_id,
         message_id=normalized.message_id,
         text_len=len(normalized.text),
+        write=MessageWrite.upsert(normalized, tokens),
     )
 
 
@@ -59,36 +61,59 @@ def _extract_message_identity(raw_msg: object) -> tuple[int | None, int | None]:
         return (None, None)
 
 
-def handle_edited_channel_message(raw_msg: object, repo: MessageRepository, tokenizer: Tokenizer) -> HandleResult:
+def prepare_edited_channel_message(raw_msg: object, tokenizer: Tokenizer) -> HandleResult:
+    """Like prepare_channel_message, but an edit that clears the text becomes a delete."""
     normalized = normalize_channel_message(raw_msg, source="live")
     if normalized is None:
         chat_id, message_id = _extract_message_identity(raw_msg)
         if chat_id is None or message_id is None:
             return HandleResult(ok=False, reason="normalize_failed")
-        deleted = repo.delete_message(chat_id=chat_id, message_id=message_id)
         return HandleResult(
-            ok=deleted,
-            reason="deindexed" if deleted else "deindex_not_found",
+            ok=True,
+            reason="pending",
             chat_id=chat_id,
             message_id=message_id,
+            write=MessageWrite.delete(chat_id, message_id),
         )
 
     tokens = tokenizer.tokenize(normalized.text)
     if not tokens:
-        deleted = repo.delete_message(chat_id=normalized.chat_id, message_id=normalized.message_id)
         return HandleResult(
-            ok=deleted,
-            reason="deindexed" if deleted else "deindex_not_found",
+            ok=True,
+            reason="pending",
             chat_id=normalized.chat_id,
             message_id=normalized.message_id,
             text_len=len(normalized.text),
+            write=MessageWrite.delete(normalized.chat_id, normalized.message_id),
         )
 
-    repo.upsert_message(normalized, tokens)
     return HandleResult(
         ok=True,
-        reason="indexed",
+        reason="pending",
         chat_id=normalized.chat_id,
         message_id=normalized.message_id,
         text_len=len(normalized.text),
+        write=MessageWrite.upsert(normalized, tokens),
     )
+
+
+def complete_write(result: HandleResult, status: str) -> HandleResult:
+    """Fold the repository write status back into a prepared result."""
+    result.ok = status != "deindex_not_found"
+    result.reason = status
+    result.write = None
+    return result
+
+
+def _apply(result: HandleResult, repo: MessageRepository) -> HandleResult:
+    if result.write is None:
+        return result
+    return complete_write(result, repo.apply_message_writes([result.write])[0])
+
+
+def handle_channel_message(raw_msg: object, repo: MessageRepository, tokenizer: Tokenizer) -> HandleResult:
+    return _apply(prepare_channel_message(raw_msg, tokenizer), repo)
+
+
+def handle_edited_channel_message(raw_msg: object, repo: MessageRepository, tokenizer: Tokenizer) -> HandleResult:
+    return _apply(prepare_edited_channel_message(raw_msg, tokenizer), repo)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+
+
+MessageKey = tuple[int, int]
+
+
+@dataclass(slots=True)
+class IngestTurn:
+    key: MessageKey
+    previous: asyncio.Future[None] | None
+    done: asyncio.Future[None]
+
+    async def wait(self) -> None:
+        """Wait until every earlier update for this message has been submitted."""
+        if self.previous is not None:
+            await asyncio.shield(self.previous)
+
+
+@dataclass(slots=True)
+class IngestOrder:
+    """Keeps writes for one channel message in update arrival order.
+
+    With concurrent updates a ``channel_post`` and a quick
+    ``edited_channel_post`` for it are tokenized side by side and could reach
+    the writer swapped, letting the older text win. Handlers ``claim`` a turn
+    before their first await (PTB starts update tasks in arrival order),
+    tokenize, ``wait`` for the earlier turn, submit, then ``release``. Only
+    submission is serialized, and only per ``(chat_id, message_id)``. All
+    methods run on the event loop.
+    """
+
+    _tails: dict[MessageKey, asyncio.Future[None]] = field(default_factory=dict, repr=False)
+
+    def claim(self, chat_id: int, message_id: int) -> IngestTurn:
+        key = (chat_id, message_id)
+        done: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        turn = IngestTurn(key=key, previous=self._tails.get(key), done=done)
+        self._tails[key] = done
+        return turn
+
+    def release(self, turn: IngestTurn) -> None:
+        if not turn.done.done():
+            turn.done.set_result(None)
+        if self._tails.get(turn.key) is turn.done:
+            del self._tails[turn.key]
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from app.storage.async_repository import run_in_executor
+from app.storage.repository import MessageRepository, MessageWrite
+
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass(slots=True)
+class IngestQueueStats:
+    enqueued: int = 0
+    committed: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    batches: int = 0
+    last_batch_size: int = 0
+    last_commit_ms: float = 0.0
+    max_commit_ms: float = 0.0
+    total_commit_ms: float = 0.0
+
+    @property
+    def avg_commit_ms(self) -> float:
+        return self.total_commit_ms / self.batches if self.batches else 0.0
+
+
+class IngestQueue:
+    """Group-commit queue for live channel writes.
+
+    Handlers ``submit`` prepared writes and get a future for the write status.
+    A single consumer task collects up to ``batch_size`` writes, or whatever
+    arrived within ``flush_interval_ms`` of the first one, and applies them in
+    one transaction on the db executor. If that transaction fails, its writes
+    are re-applied one per transaction so only the failing write gets the
+    exception. ``max_size`` bounds the queue; submit waits when it is full,
+    which pushes back on update processing.
+    """
+
+    def __init__(
+        self,
+        repo: MessageRepository,
+        executor: ThreadPoolExecutor,
+        batch_size: int = 200,
+        flush_interval_ms: int = 50,
+        max_size: int = 5000,
+    ) -> None:
+        if batch_size <= 0 or max_size <= 0:
+            raise ValueError("ingest batch_size and max_size must be positive")
+        self.repo = repo
+        self.executor = executor
+        self.batch_size = batch_size
+        self.flush_interval = max(flush_interval_ms, 0) / 1000
+        self.max_size = max_size
+        self.stats = IngestQueueStats()
+        self._queue: asyncio.Queue | None = None
+        self._consumer: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._consumer is not None and not self._consumer.done()
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._consumer = asyncio.create_task(self._consume(), name="ingest-queue")
+
+    async def stop(self) -> None:
+        """Flush everything already submitted, then stop the consumer."""
+        if not self.running or self._queue is None:
+            return
+        await self._queue.put(_STOP)
+        await self._consumer
+        self._consumer = None
+        leftover: list = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            await self._commit(leftover)
+
+    async def submit(self, write: MessageWrite) -> asyncio.Future[str]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        self.stats.enqueued += 1
+        if not self.running or self._queue is None:
+            await self._commit([(write, future)])
+            return future
+        await self._queue.put((write, future))
+        return future
+
+    async def _consume(self) -> None:
+        assert self._queue is not None
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            stopping = self._drain_into(batch)
+            if not stopping and len(batch) < self.batch_size and self.flush_interval > 0:
+                await asyncio.sleep(self.flush_interval)
+                stopping = self._drain_into(batch)
+            await self._commit(batch)
+
+    def _drain_into(self, batch: list) -> bool:
+        assert self._queue is not None
+        while len(batch) < self.batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return False
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    async def _commit(self, batch: list[tuple[MessageWrite, asyncio.Future[str]]]) -> None:
+        started = time.perf_counter()
+        try:
+            statuses = await run_in_executor(
+                self.executor, self.repo.apply_message_writes, [write for write, _ in batch]
+            )
+        except Exception as exc:
+            if len(batch) > 1:
+                # The batch rolled back as a whole; isolate the bad write(s).
+                logger.warning("ingest batch commit failed size=%s, retrying writes one by one", len(batch))
+                for item in batch:
+                    await self._commit([item])
+                return
+            write = batch[0][0]
+            logger.exception("ingest write failed chat_id=%s message_id=%s", write.chat_id, write.message_id)
+            self.stats.failed += len(batch)
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats.batches += 1
+        self.stats.committed += len(batch)
+        self.stats.unchanged += statuses.count("unchanged")
+        self.stats.last_batch_size = len(batch)
+        self.stats.last_commit_ms = elapsed_ms
+        self.stats.max_commit_ms = max(self.stats.max_commit_ms, elapsed_ms)
+        self.stats.total_commit_ms += elapsed_ms
+        for (_, future), status in zip(batch, statuses):
+            if not future.done():
+                future.set_result(status)
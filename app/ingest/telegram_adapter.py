@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import time
+from collections.abc import Callable
 from typing import cast
 
-from telegram import Update
+from telegram import Message, Update
 from telegram.ext import ContextTypes
 
 from app.context import RuntimeContext
-from app.ingest.handler import handle_channel_message, handle_edited_channel_message
+from app.ingest.handler import (
+    HandleResult,
+    complete_write,
+    prepare_channel_message,
+    prepare_edited_channel_message,
+)
+from app.search.tokenizer import Tokenizer
 
 
 logger = logging.getLogger(__name__)
@@ -21,35 +29,86 @@ def _runtime(context: ContextTypes.DEFAULT_TYPE) -> RuntimeContext:
     return cast(RuntimeContext, runtime)
 
 
-async def on_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    if update.channel_post is None:
-        return
-    runtime = _runtime(context)
-    post = update.channel_post
-    logger.info(
-        "received channel_post chat_id=%s message_id=%s has_text=%s has_caption=%s",
-        post.chat_id,
-        post.message_id,
-        bool(post.text),
-        bool(post.caption),
-    )
-    result = handle_channel_message(post, runtime.repo, runtime.tokenizer)
+def _log_result(kind: str, result: HandleResult) -> None:
     if result.ok:
         logger.info(
-            "indexed channel_post chat_id=%s message_id=%s text_len=%s",
+            "%s %s chat_id=%s message_id=%s text_len=%s",
+            result.reason,
+            kind,
             result.chat_id,
             result.message_id,
             result.text_len,
         )
         return
     logger.warning(
-        "skipped channel_post reason=%s chat_id=%s message_id=%s",
+        "skipped %s reason=%s chat_id=%s message_id=%s",
+        kind,
         result.reason,
         result.chat_id,
         result.message_id,
     )
 
 
+async def _submit(kind: str, runtime: RuntimeContext, result: HandleResult) -> None:
+    if result.write is None:
+        _log_result(kind, result)
+        return
+    if runtime.ingest_queue is None:
+        status = (await runtime.async_repo.run(runtime.repo.apply_message_writes, [result.write]))[0]
+        _log_result(kind, complete_write(result, status))
+        return
+
+    def _on_done(future: asyncio.Future[str]) -> None:
+        if future.cancelled():
+            return
+        exc = future.exception()
+        if exc is not None:
+            logger.error(
+                "failed %s chat_id=%s message_id=%s error=%r",
+                kind,
+                result.chat_id,
+                result.message_id,
+                exc,
+            )
+            return
+        _log_result(kind, complete_write(result, future.result()))
+
+    future = await runtime.ingest_queue.submit(result.write)
+    future.add_done_callback(_on_done)
+
+
+async def _ingest(
+    kind: str,
+    runtime: RuntimeContext,
+    prepare: Callable[[object, Tokenizer], HandleResult],
+    post: Message,
+) -> None:
+    # Claim the turn before tokenizing on the executor so an edit cannot
+    # overtake the post (or an earlier edit) it follows.
+    turn = runtime.ingest_order.claim(post.chat_id, post.message_id)
+    try:
+        result = await runtime.async_repo.run(prepare, post, runtime.tokenizer)
+        await turn.wait()
+        await _submit(kind, runtime, result)
+    finally:
+        runtime.ingest_order.release(turn)
+
+
+async def on_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if update.channel_post is None:
+        return
+    runtime = _runtime(context)
+    post = update.channel_post
+    logger.info(
+        "received channel_post chat_id=%s message_id=%s has_text=%s has_caption=%s",
+        post.chat_id,
+        post.message_id,
+        bool(post.text),
+        bool(post.caption),
+    )
+    await _ingest("channel_post", runtime, prepare_channel_message, post)
+
+
 async def on_edited_channel_post(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if update.edited_channel_post is None:
         return
@@ -62,21 +121,7 @@ async def on_edited_channel_post(update: Update, context: ContextTypes.DEFAULT_T
         bool(post.text),
         bool(post.caption),
     )
-    result = handle_edited_channel_message(post, runtime.repo, runtime.tokenizer)
-    if result.ok:
-        logger.info(
-            "indexed edited_channel_post chat_id=%s message_id=%s text_len=%s",
-            result.chat_id,
-            result.message_id,
-            result.text_len,
-        )
-        return
-    logger.warning(
-        "skipped edited_channel_post reason=%s chat_id=%s message_id=%s",
-        result.reason,
-        result.chat_id,
-        result.message_id,
-    )
+    await _ingest("edited_channel_post", runtime, prepare_edited_channel_message, post)
 
 
 async def on_any_update(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
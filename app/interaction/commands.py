@@ -25,25 +25,32 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     runtime = _runtime(context)
     parsed = parse_search_input(message.text, mode="command")
     if not parsed.query:
-        await message.reply_text("Usage: /search 关键词 或 /search @channel 关键词")
+        await message.reply_text("Usage: /search 关键词 或 /search @channel 关键词（可加 sort:relevance|time|hybrid、since:/until:）")
         return
     
     # Check if requested channel is allowed
-    chat_id = runtime.repo.resolve_channel(parsed.channel)
+    chat_id = await runtime.async_repo.resolve_channel(parsed.channel)
     if parsed.channel is not None and chat_id is None:
         await message.reply_text("频道不存在或未找到。")
         return
-    if chat_id is not None and not runtime.repo.is_channel_allowed(chat_id):
+    if chat_id is not None and not await runtime.async_repo.is_channel_allowed(chat_id):
         await message.reply_text("该频道不在搜索白名单中，无法搜索。")
         return
     
-    results = runtime.search_service.search(parsed.query, limit=runtime.private_page_size, channel_filter=parsed.channel)
+    results = await runtime.async_search.search(
+        parsed.query,
+        limit=runtime.private_page_size,
+        channel_filter=parsed.channel,
+        sort=parsed.sort,
+        since=parsed.since,
+        until=parsed.until,
+    )
     if not results:
         await message.reply_text("未找到匹配结果。")
         return
     keywords = extract_keywords(parsed.query)
     user = update.effective_user
-    is_admin = bool(user and runtime.admin_auth.is_authenticated(user.id))
+    is_admin = bool(user and await runtime.async_repo.run(runtime.admin_auth.is_authenticated, user.id))
     text = f"\n{runtime.private_separator}\n".join(
         render_private_result(row, keywords, include_message_ids=is_admin) for row in results
     )
@@ -68,21 +75,21 @@ async def sj_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         )
         return
 
-    chat_id = runtime.repo.resolve_channel(parsed.channel)
+    chat_id = await runtime.async_repo.resolve_channel(parsed.channel)
     if parsed.channel is not None and chat_id is None:
         await message.reply_text("频道不存在或未找到。")
         return
-    if chat_id is not None and not runtime.repo.is_channel_allowed(chat_id):
+    if chat_id is not None and not await runtime.async_repo.is_channel_allowed(chat_id):
         await message.reply_text("该频道不在搜索白名单中，无法随机。")
         return
 
-    rows = runtime.search_service.random(limit=parsed.limit, channel_filter=parsed.channel)
+    rows = await runtime.async_search.random(limit=parsed.limit, channel_filter=parsed.channel)
     if not rows:
         await message.reply_text("当前范围内没有可随机的内容。")
         return
 
     user = update.effective_user
-    is_admin = bool(user and runtime.admin_auth.is_authenticated(user.id))
+    is_admin = bool(user and await runtime.async_repo.run(runtime.admin_auth.is_authenticated, user.id))
     text = f"\n{runtime.private_separator}\n".join(
         render_private_result(row, [], include_message_ids=is_admin) for row in rows
     )
@@ -115,5 +122,9 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "6. 内联随机：@botname （空查询）\n"
         "7. 管理命令：/admin_login /admin_set /admin_get /admin_list /admin_logout /admin_apply\n"
         "8. 频道管理：/admin_channel_add /admin_channel_remove /admin_channel_disable /admin_channel_enable /admin_channel_list\n"
-        "9. 手动清理：/admin_delete_msg <chat_id> <message_id>"
+        "9. 手动清理：/admin_delete_msg <chat_id> <message_id>\n"
+        "10. 运行指标：/admin_stats\n"
+        "11. 索引维护：/admin_fts_optimize\n"
+        "12. 排序：关键词中加 sort:relevance（相关度）、sort:hybrid（相关度+时间）或 sort:time（最新优先）\n"
+        "13. 时间范围：关键词中加 since:2024-05-01 / until:2024-05（日期、月份、时间戳）或 since:7d（最近 7 天，另有 h/w/m）"
     )
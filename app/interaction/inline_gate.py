@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class InlineQueryStats:
+    received: int = 0
+    answered: int = 0
+    # Search task cancelled because the same user typed on.
+    cancelled: int = 0
+    # Superseded before any search started (during the debounce window).
+    skipped: int = 0
+    too_short: int = 0
+
+
+@dataclass(slots=True, frozen=True)
+class InlineTicket:
+    user_id: int
+    seq: int
+
+
+@dataclass(slots=True)
+class InlineQueryGate:
+    """Keeps only the newest inline query per user doing search work.
+
+    Telegram sends an inline query for nearly every keystroke. ``begin`` marks
+    a query as the user's latest and cancels the search still running for an
+    earlier one; ``settle`` waits out the optional debounce window and reports
+    whether the query is still the latest; ``run`` runs the search as a task
+    that the next ``begin`` can cancel. A cancelled search that was still
+    queued on the db executor never starts. All methods run on the event loop.
+    """
+
+    debounce_ms: int = 0
+    min_query_chars: int = 1
+    stats: InlineQueryStats = field(default_factory=InlineQueryStats)
+    _latest: dict[int, int] = field(default_factory=dict, repr=False)
+    _tasks: dict[int, asyncio.Future[Any]] = field(default_factory=dict, repr=False)
+    _seq: itertools.count = field(default_factory=lambda: itertools.count(1), repr=False)
+
+    def begin(self, user_id: int) -> InlineTicket:
+        self.stats.received += 1
+        ticket = InlineTicket(user_id=user_id, seq=next(self._seq))
+        self._latest[user_id] = ticket.seq
+        running = self._tasks.pop(user_id, None)
+        if running is not None:
+            running.cancel()
+        return ticket
+
+    def is_current(self, ticket: InlineTicket) -> bool:
+        return self._latest.get(ticket.user_id) == ticket.seq
+
+    def long_enough(self, query: str) -> bool:
+        if len(query.strip()) >= self.min_query_chars:
+            return True
+        self.stats.too_short += 1
+        return False
+
+    async def settle(self, ticket: InlineTicket) -> bool:
+        if self.debounce_ms > 0:
+            await asyncio.sleep(self.debounce_ms / 1000)
+        if self.is_current(ticket):
+            return True
+        self.stats.skipped += 1
+        return False
+
+    async def run(self, ticket: InlineTicket, search: Callable[[], Awaitable[T]]) -> T | None:
+        """Result of ``search()``, or None when a newer query cancelled it."""
+        if not self.is_current(ticket):
+            self.stats.skipped += 1
+            return None
+        task = asyncio.ensure_future(search())
+        self._tasks[ticket.user_id] = task
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled() and not self.is_current(ticket):
+                self.stats.cancelled += 1
+                return None
+            # The handler itself is being cancelled (e.g. shutdown).
+            task.cancel()
+            raise
+        finally:
+            if self._tasks.get(ticket.user_id) is task:
+                del self._tasks[ticket.user_id]
+
+    def finish(self, ticket: InlineTicket, answered: bool = True) -> None:
+        if answered:
+            self.stats.answered += 1
+        if self.is_current(ticket):
+            del self._latest[ticket.user_id]
@@ -13,13 +13,19 @@ from telegram.ext import ContextTypes
 
 from app.context import RuntimeContext
 from app.interaction.parser import extract_keywords, parse_search_input
+from app.search.cursor import decode_cursor, next_cursor
+from app.search.ranking import SORT_TIME
 from app.interaction.renderers import (
     render_inline_description,
     render_inline_message,
     render_inline_title,
 )
+from app.storage.repository import SearchRow
 from app.utils.link_builder import build_message_link
 
+# Telegram shows at most 50 results per answer.
+INLINE_MAX_PAGE_SIZE = 50
+
 
 def _runtime(context: ContextTypes.DEFAULT_TYPE) -> RuntimeContext:
     runtime = context.application.bot_data.get("runtime")
@@ -28,16 +34,59 @@ def _runtime(context: ContextTypes.DEFAULT_TYPE) -> RuntimeContext:
     return cast(RuntimeContext, runtime)
 
 
+def inline_page_position(offset: str) -> tuple[int, str | None]:
+    """(row offset, seek cursor) for Telegram's inline ``offset``.
+
+    The first page has an empty offset. Later pages carry the ``next_offset``
+    we sent: a seek cursor for time order, so pages stay put while new posts
+    arrive, or a plain row offset for ranked orders. Raises ValueError for
+    anything else.
+    """
+    offset = offset.strip()
+    if not offset:
+        return 0, None
+    if offset.isdigit():
+        return int(offset), None
+    decode_cursor(offset)
+    return 0, offset
+
+
+def inline_next_offset(rows: list[SearchRow], page_size: int, sort: str, offset: int) -> str:
+    """``next_offset`` for the answer; empty once a short page shows the end."""
+    if len(rows) < page_size:
+        return ""
+    if sort == SORT_TIME:
+        return next_cursor(rows, page_size) or ""
+    return str(offset + len(rows))
+
+
+def inline_answer_policy(runtime: RuntimeContext, user_id: int) -> tuple[int, bool]:
+    """(cache_time, is_personal) for search answers.
+
+    Search results do not depend on who asks, so ordinary users get answers
+    Telegram may cache and share for ``inline_cache_time`` seconds. Admins
+    always get fresh, personal answers.
+    """
+    admin_auth = runtime.admin_auth
+    if runtime.inline_cache_time <= 1 or (admin_auth is not None and admin_auth.is_whitelisted(user_id)):
+        return 1, True
+    return runtime.inline_cache_time, False
+
+
 async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     inline_query = update.inline_query
     if inline_query is None:
         return
     runtime = _runtime(context)
+    gate = runtime.inline_gate
+    # Supersedes (and cancels the search of) this user's previous keystroke.
+    ticket = gate.begin(inline_query.from_user.id)
     raw_query = inline_query.query.strip()
     if not raw_query:
-        random_rows = runtime.search_service.random(limit=runtime.default_random_limit)
+        random_rows = await runtime.async_search.random(limit=runtime.default_random_limit)
         if not random_rows:
             await inline_query.answer([], cache_time=1, is_personal=True)
+            gate.finish(ticket)
             return
         random_results = [
             InlineQueryResultArticle(
@@ -66,19 +115,33 @@ async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE
             for item in random_rows
         ]
         await inline_query.answer(random_results, cache_time=1, is_personal=True)
+        gate.finish(ticket)
         return
 
     parsed = parse_search_input(inline_query.query, mode="inline")
-    if not parsed.query:
+    if not parsed.query or not gate.long_enough(parsed.query):
         await inline_query.answer([], cache_time=1, is_personal=True)
+        gate.finish(ticket, answered=False)
+        return
+    try:
+        offset, cursor = inline_page_position(inline_query.offset)
+    except ValueError:
+        await inline_query.answer([], cache_time=1, is_personal=True)
+        gate.finish(ticket, answered=False)
+        return
+    sort = parsed.sort or runtime.search_service.default_sort
+    if cursor is not None and sort != SORT_TIME:
+        cursor, offset = None, 0
+    if not await gate.settle(ticket):
         return
     
     # Check if requested channel is allowed
-    chat_id = runtime.repo.resolve_channel(parsed.channel)
+    chat_id = await runtime.async_repo.resolve_channel(parsed.channel)
     if parsed.channel is not None and chat_id is None:
         await inline_query.answer([], cache_time=1, is_personal=True)
+        gate.finish(ticket)
         return
-    if chat_id is not None and not runtime.repo.is_channel_allowed(chat_id):
+    if chat_id is not None and not await runtime.async_repo.is_channel_allowed(chat_id):
         await inline_query.answer(
             [
                 InlineQueryResultArticle(
@@ -94,33 +157,73 @@ async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE
             cache_time=1,
             is_personal=True,
         )
+        gate.finish(ticket)
         return
     
-    rows = runtime.search_service.search(
-        query=parsed.query,
-        limit=min(runtime.default_search_limit, 50),
-        offset=0,
-        channel_filter=parsed.channel,
+    page_size = min(max(runtime.inline_page_size, 1), INLINE_MAX_PAGE_SIZE)
+    cache_time, is_personal = inline_answer_policy(runtime, inline_query.from_user.id)
+    chat_ids = runtime.search_service.allowed_chat_ids(parsed.channel)
+    key = (
+        runtime.tokenizer.normalize_text(parsed.query),
+        None if chat_ids is None else tuple(chat_ids),
+        sort,
+        page_size,
+        offset,
+        cursor,
+        parsed.since,
+        parsed.until,
     )
-    if not rows:
-        await inline_query.answer(
-            [
-                InlineQueryResultArticle(
-                    id="no_result",
-                    title="没有搜索结果",
-                    description=f"没有搜到 {parsed.query} 的内容",
-                    input_message_content=InputTextMessageContent(
-                        message_text=f"没有搜到 {parsed.query} 的内容",
-                        disable_web_page_preview=True,
-                    ),
-                )
-            ],
-            cache_time=1,
-            is_personal=True,
+    # Taken before searching, so ingest that lands meanwhile invalidates the entry.
+    generation = runtime.repo.search_generation(chat_ids)
+    found, cached = runtime.inline_cache.get(key, generation)
+    if found:
+        results, next_offset = cached
+    else:
+        rows = await gate.run(
+            ticket,
+            lambda: runtime.async_search.search(
+                query=parsed.query,
+                limit=page_size,
+                offset=offset,
+                channel_filter=parsed.channel,
+                cursor=cursor,
+                sort=sort,
+                since=parsed.since,
+                until=parsed.until,
+            ),
         )
-        return
-    keywords = extract_keywords(parsed.query)
-    results = [
+        if rows is None:
+            return
+        results = _build_results(rows, parsed.query, first_page=not (offset or cursor))
+        next_offset = inline_next_offset(rows, page_size, sort, offset)
+        runtime.inline_cache.put(key, generation, (results, next_offset))
+    await inline_query.answer(
+        results,
+        cache_time=cache_time,
+        is_personal=is_personal,
+        next_offset=next_offset,
+    )
+    gate.finish(ticket)
+
+
+def _build_results(rows: list[SearchRow], query: str, first_page: bool) -> list[InlineQueryResultArticle]:
+    if not rows:
+        if not first_page:
+            # Scrolled past the last page.
+            return []
+        return [
+            InlineQueryResultArticle(
+                id="no_result",
+                title="没有搜索结果",
+                description=f"没有搜到 {query} 的内容",
+                input_message_content=InputTextMessageContent(
+                    message_text=f"没有搜到 {query} 的内容",
+                    disable_web_page_preview=True,
+                ),
+            )
+        ]
+    keywords = extract_keywords(query)
+    return [
         InlineQueryResultArticle(
             id=str(item.id),
             title=render_inline_title(item, keywords),
@@ -146,4 +249,3 @@ async def handle_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE
         )
         for item in rows
     ]
-    await inline_query.answer(results, cache_time=1, is_personal=True)
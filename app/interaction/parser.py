@@ -3,14 +3,22 @@ from __future__ import annotations
 from dataclasses import dataclass
 import re
 
+from app.search.ranking import SEARCH_SORTS
+from app.search.time_window import parse_time_bound
+
 
 KEYWORD_SPLIT_RE = re.compile(r"[^\w\u4e00-\u9fff]+", re.UNICODE)
+SORT_TOKEN_RE = re.compile(rf"(?:^|\s)sort:({'|'.join(SEARCH_SORTS)})(?=\s|$)", re.IGNORECASE)
+TIME_TOKEN_RE = re.compile(r"(?:^|\s)(since|until):(\S+)(?=\s|$)", re.IGNORECASE)
 
 
 @dataclass(slots=True)
 class ParsedQuery:
     channel: str | None
     query: str
+    sort: str | None = None
+    since: int | None = None
+    until: int | None = None
 
 
 @dataclass(slots=True)
@@ -26,12 +34,36 @@ def parse_search_input(text: str, mode: str) -> ParsedQuery:
     if mode == "command" and raw.startswith("/search"):
         raw = raw[len("/search") :].strip()
 
+    # A "sort:relevance" style token anywhere in the input picks the order.
+    sorts = [value.lower() for value in SORT_TOKEN_RE.findall(raw)]
+    sort = sorts[-1] if sorts else None
+    if sorts:
+        raw = SORT_TOKEN_RE.sub(" ", raw).strip()
+
+    # "since:2024-05-01" / "until:7d" bound the time window; tokens that do not
+    # parse as a time stay in the query.
+    bounds: dict[str, int] = {}
+
+    def take_bound(match: re.Match[str]) -> str:
+        name = match.group(1).lower()
+        try:
+            value = parse_time_bound(match.group(2), end=name == "until")
+        except ValueError:
+            return match.group(0)
+        if value is None:
+            return match.group(0)
+        bounds[name] = value
+        return " "
+
+    raw = TIME_TOKEN_RE.sub(take_bound, raw).strip()
+    since, until = bounds.get("since"), bounds.get("until")
+
     first, _, rest = raw.partition(" ")
     if mode in {"private", "command"} and first.startswith("@"):
-        return ParsedQuery(channel=first, query=rest.strip())
+        return ParsedQuery(channel=first, query=rest.strip(), sort=sort, since=since, until=until)
     if mode == "inline" and first.startswith("#"):
-        return ParsedQuery(channel=first[1:], query=rest.strip())
-    return ParsedQuery(channel=None, query=raw)
+        return ParsedQuery(channel=first[1:], query=rest.strip(), sort=sort, since=since, until=until)
+    return ParsedQuery(channel=None, query=raw, sort=sort, since=since, until=until)
 
 
 def extract_keywords(query: str) -> list[str]:
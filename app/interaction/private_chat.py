@@ -10,6 +10,8 @@ from telegram.ext import ContextTypes
 from app.context import RuntimeContext
 from app.interaction.parser import extract_keywords, parse_search_input
 from app.interaction.renderers import render_private_result
+from app.search.cursor import next_cursor
+from app.search.ranking import SORT_TIME
 
 
 def _runtime(context: ContextTypes.DEFAULT_TYPE) -> RuntimeContext:
@@ -19,16 +21,24 @@ def _runtime(context: ContextTypes.DEFAULT_TYPE) -> RuntimeContext:
     return cast(RuntimeContext, runtime)
 
 
-def _build_keyboard(query_id: str, offset: int, page_size: int, total_found: int) -> InlineKeyboardMarkup | None:
+def _build_keyboard(
+    query_id: str,
+    offset: int,
+    page_size: int,
+    total_found: int,
+    total_exact: bool = True,
+) -> InlineKeyboardMarkup | None:
     buttons: list[InlineKeyboardButton] = []
     prev_offset = max(offset - page_size, 0)
     next_offset = offset + page_size
     current_page = (offset // page_size) + 1
     total_pages = max(((total_found - 1) // page_size) + 1, 1)
+    # A capped count only bounds the page total from below.
+    page_label = f"{current_page}/{total_pages}" if total_exact else f"{current_page}/{total_pages}+"
     if offset > 0:
         buttons.append(InlineKeyboardButton("上一页", callback_data=f"pg:{query_id}:{prev_offset}"))
-    buttons.append(InlineKeyboardButton(f"{current_page}/{total_pages}", callback_data="noop"))
-    if current_page < total_pages:
+    buttons.append(InlineKeyboardButton(page_label, callback_data="noop"))
+    if current_page < total_pages or not total_exact:
         buttons.append(InlineKeyboardButton("下一页", callback_data=f"pg:{query_id}:{next_offset}"))
     return InlineKeyboardMarkup([buttons])
 
@@ -46,35 +56,58 @@ async def handle_private_search(update: Update, context: ContextTypes.DEFAULT_TY
         return
     
     # Check if requested channel is allowed
-    chat_id = runtime.repo.resolve_channel(parsed.channel)
+    chat_id = await runtime.async_repo.resolve_channel(parsed.channel)
     if parsed.channel is not None and chat_id is None:
         await msg.reply_text("频道不存在或未找到。")
         return
-    if chat_id is not None and not runtime.repo.is_channel_allowed(chat_id):
+    if chat_id is not None and not await runtime.async_repo.is_channel_allowed(chat_id):
         await msg.reply_text("该频道不在搜索白名单中，无法搜索。")
         return
     
     page_size = runtime.private_page_size
-    results = runtime.search_service.search(parsed.query, limit=page_size, offset=0, channel_filter=parsed.channel)
+    sort = parsed.sort or runtime.search_service.default_sort
+    page = await runtime.async_search.search_page(
+        parsed.query,
+        limit=page_size,
+        offset=0,
+        channel_filter=parsed.channel,
+        sort=sort,
+        since=parsed.since,
+        until=parsed.until,
+    )
+    results = page.rows
     if not results:
         await msg.reply_text("未找到匹配结果。")
         return
     query_id = str(int(time.time() * 1000))
     user_data = context.user_data.setdefault("search_queries", {})
-    total_found = runtime.search_service.count(parsed.query, channel_filter=parsed.channel)
+    total_found = page.total
     user = update.effective_user
-    is_admin = bool(user and runtime.admin_auth.is_authenticated(user.id))
+    is_admin = bool(user and await runtime.async_repo.run(runtime.admin_auth.is_authenticated, user.id))
     user_data[query_id] = {
         "query": parsed.query,
         "channel": parsed.channel,
         "total_found": total_found,
+        "total_exact": page.total_exact,
         "is_admin": is_admin,
+        "sort": sort,
+        "since": parsed.since,
+        "until": parsed.until,
+        # Seek cursor for each page offset already reached; page 0 needs none.
+        # Ranked orders have no seek key and page by offset.
+        "cursors": {page_size: next_cursor(results, page_size)} if sort == SORT_TIME else {},
     }
 
     keywords = extract_keywords(parsed.query)
     chunks = [render_private_result(row, keywords, include_message_ids=is_admin) for row in results]
     text = f"\n{runtime.private_separator}\n".join(chunks)
-    keyboard = _build_keyboard(query_id, offset=0, page_size=page_size, total_found=total_found)
+    keyboard = _build_keyboard(
+        query_id,
+        offset=0,
+        page_size=page_size,
+        total_found=total_found,
+        total_exact=page.total_exact,
+    )
     await msg.reply_text(text, parse_mode=ParseMode.HTML, disable_web_page_preview=True, reply_markup=keyboard)
 
 
@@ -93,17 +126,42 @@ async def handle_private_pagination(update: Update, context: ContextTypes.DEFAUL
     q = query_state["query"]
     channel = query_state["channel"]
     total_found = int(query_state.get("total_found", 0))
+    total_exact = bool(query_state.get("total_exact", True))
     is_admin = bool(query_state.get("is_admin", False))
     page_size = runtime.private_page_size
-    results = runtime.search_service.search(q, limit=page_size, offset=offset, channel_filter=channel)
+    sort = str(query_state.get("sort", SORT_TIME))
+    cursors: dict[int, str | None] = query_state.setdefault("cursors", {})
+    cursor = cursors.get(offset)
+    results = await runtime.async_search.search(
+        q,
+        limit=page_size,
+        offset=0 if cursor else offset,
+        channel_filter=channel,
+        cursor=cursor,
+        sort=sort,
+        since=query_state.get("since"),
+        until=query_state.get("until"),
+    )
     if not results:
         await query.edit_message_text("没有更多结果。")
         return
+    if sort == SORT_TIME:
+        cursors[offset + page_size] = next_cursor(results, page_size)
     keywords = extract_keywords(q)
     text = f"\n{runtime.private_separator}\n".join(
         render_private_result(row, keywords, include_message_ids=is_admin) for row in results
     )
-    keyboard = _build_keyboard(query_id, offset=offset, page_size=page_size, total_found=total_found)
+    if len(results) < page_size and not total_exact:
+        # Reached the real end of a capped result set.
+        total_found, total_exact = offset + len(results), True
+        query_state.update(total_found=total_found, total_exact=True)
+    keyboard = _build_keyboard(
+        query_id,
+        offset=offset,
+        page_size=page_size,
+        total_found=total_found,
+        total_exact=total_exact,
+    )
     await query.edit_message_text(
         text=text,
         parse_mode=ParseMode.HTML,
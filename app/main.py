@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import argparse
 import logging
+import sqlite3
 import threading
 import time
 
@@ -28,19 +29,23 @@ from app.admin.commands import (
     admin_channel_list,
     admin_channel_remove,
     admin_delete_msg,
+    admin_fts_optimize,
     admin_get,
     admin_list,
     admin_login,
     admin_logout,
     admin_set,
+    admin_stats,
 )
 from app.admin.config_store import ConfigStore
 from app.config import Settings, load_settings
 from app.context import RuntimeContext
 from app.http_api import ExternalSearchApiServer
 from app.importer.telegram_json import import_telegram_export
+from app.ingest.queue import IngestQueue
 from app.ingest.telegram_adapter import on_any_update
 from app.interaction.commands import help_command, search_command, sj_command, start_command
+from app.interaction.inline_gate import InlineQueryGate
 from app.interaction.inline_mode import handle_inline_query
 from app.interaction.private_chat import (
     handle_noop_pagination,
@@ -48,9 +53,15 @@ from app.interaction.private_chat import (
     handle_private_search,
 )
 from app.network.proxy import apply_proxy
+from app.search.async_service import AsyncSearchService
+from app.search.cache import SearchCache
+from app.search.ranking import HybridRanking, parse_sort
 from app.search.service import SearchService
 from app.search.tokenizer import default_tokenizer
-from app.storage.db import connect_db, init_db
+from app.storage.async_repository import AsyncMessageRepository, create_db_executor
+from app.storage.db import ReadConnectionPool, connect_db, init_db
+from app.storage.fts import fts_index_bytes
+from app.storage.maintenance import FTS_MAINTENANCE_DEFAULTS, FTS_OPTION_KEYS
 from app.storage.repository import MessageRepository
 
 
@@ -73,10 +84,21 @@ def _seed_dynamic_config(config_store: ConfigStore, settings: Settings) -> None:
         "webhook_listen_host": settings.webhook_listen_host,
         "webhook_listen_port": str(settings.webhook_listen_port),
         "default_search_limit": str(settings.default_search_limit),
+        "search_count_limit": str(settings.search_count_limit),
+        "search_default_sort": settings.search_default_sort,
+        "search_hybrid_half_life_days": str(settings.search_hybrid_half_life_days),
+        "search_hybrid_recency_weight": str(settings.search_hybrid_recency_weight),
+        "search_cache_size": str(settings.search_cache_size),
+        "search_cache_ttl_seconds": str(settings.search_cache_ttl_seconds),
         "default_random_limit": str(settings.default_random_limit),
         "max_random_limit": str(settings.max_random_limit),
         "private_page_size": str(settings.private_page_size),
         "private_separator": settings.private_separator,
+        "inline_page_size": str(settings.inline_page_size),
+        "inline_min_query_chars": str(settings.inline_min_query_chars),
+        "inline_debounce_ms": str(settings.inline_debounce_ms),
+        "inline_cache_time": str(settings.inline_cache_time),
+        "inline_result_cache_size": str(settings.inline_result_cache_size),
         "polling_idle_restart_seconds": str(settings.polling_idle_restart_seconds),
         "external_api_enabled": str(settings.external_api_enabled).lower(),
         "external_api_host": settings.external_api_host,
@@ -96,9 +118,22 @@ def _resolve_runtime_value(config_store: ConfigStore, key: str, fallback: str) -
 
 
 def create_runtime(settings: Settings) -> tuple[RuntimeContext, Settings]:
-    conn = connect_db(settings.sqlite_path)
-    init_db(conn)
-    repo = MessageRepository(conn)
+    conn = connect_db(
+        settings.sqlite_path,
+        busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+        pragmas=settings.sqlite_pragmas,
+    )
+    tokenizer = default_tokenizer()
+    init_db(conn, fts_mode=settings.fts_mode, tokenizer=tokenizer)
+    read_pool = None
+    if settings.sqlite_read_pool_size > 0 and settings.sqlite_path != ":memory:":
+        read_pool = ReadConnectionPool(
+            settings.sqlite_path,
+            size=settings.sqlite_read_pool_size,
+            busy_timeout_ms=settings.sqlite_busy_timeout_ms,
+            pragmas=settings.sqlite_pragmas,
+        )
+    repo = MessageRepository(conn, read_pool=read_pool, tokenizer=tokenizer)
     config_store = ConfigStore(repo=repo, fernet=Fernet(settings.config_encryption_key.encode("utf-8")))
     _seed_dynamic_config(config_store, settings)
 
@@ -112,6 +147,28 @@ def create_runtime(settings: Settings) -> tuple[RuntimeContext, Settings]:
     settings.default_search_limit = int(
         _resolve_runtime_value(config_store, "default_search_limit", str(settings.default_search_limit))
     )
+    settings.search_count_limit = int(
+        _resolve_runtime_value(config_store, "search_count_limit", str(settings.search_count_limit))
+    )
+    settings.search_default_sort = parse_sort(
+        _resolve_runtime_value(config_store, "search_default_sort", settings.search_default_sort)
+    )
+    settings.search_hybrid_half_life_days = float(
+        _resolve_runtime_value(
+            config_store, "search_hybrid_half_life_days", str(settings.search_hybrid_half_life_days)
+        )
+    )
+    settings.search_hybrid_recency_weight = float(
+        _resolve_runtime_value(
+            config_store, "search_hybrid_recency_weight", str(settings.search_hybrid_recency_weight)
+        )
+    )
+    settings.search_cache_size = int(
+        _resolve_runtime_value(config_store, "search_cache_size", str(settings.search_cache_size))
+    )
+    settings.search_cache_ttl_seconds = float(
+        _resolve_runtime_value(config_store, "search_cache_ttl_seconds", str(settings.search_cache_ttl_seconds))
+    )
     settings.default_random_limit = int(
         _resolve_runtime_value(config_store, "default_random_limit", str(settings.default_random_limit))
     )
@@ -124,6 +181,21 @@ def create_runtime(settings: Settings) -> tuple[RuntimeContext, Settings]:
     settings.private_separator = _resolve_runtime_value(
         config_store, "private_separator", settings.private_separator
     )
+    settings.inline_page_size = int(
+        _resolve_runtime_value(config_store, "inline_page_size", str(settings.inline_page_size))
+    )
+    settings.inline_min_query_chars = int(
+        _resolve_runtime_value(config_store, "inline_min_query_chars", str(settings.inline_min_query_chars))
+    )
+    settings.inline_debounce_ms = int(
+        _resolve_runtime_value(config_store, "inline_debounce_ms", str(settings.inline_debounce_ms))
+    )
+    settings.inline_cache_time = int(
+        _resolve_runtime_value(config_store, "inline_cache_time", str(settings.inline_cache_time))
+    )
+    settings.inline_result_cache_size = int(
+        _resolve_runtime_value(config_store, "inline_result_cache_size", str(settings.inline_result_cache_size))
+    )
     settings.polling_idle_restart_seconds = int(
         _resolve_runtime_value(
             config_store, "polling_idle_restart_seconds", str(settings.polling_idle_restart_seconds)
@@ -150,8 +222,20 @@ def create_runtime(settings: Settings) -> tuple[RuntimeContext, Settings]:
         _resolve_runtime_value(config_store, "webhook_listen_port", str(settings.webhook_listen_port))
     )
 
-    tokenizer = default_tokenizer()
-    search_service = SearchService(repo=repo, tokenizer=tokenizer)
+    search_service = SearchService(
+        repo=repo,
+        tokenizer=tokenizer,
+        count_limit=settings.search_count_limit,
+        default_sort=settings.search_default_sort,
+        ranking=HybridRanking(
+            half_life_seconds=max(settings.search_hybrid_half_life_days, 0.01) * 86400,
+            recency_weight=max(settings.search_hybrid_recency_weight, 0.0),
+        ),
+        cache=SearchCache(
+            max_entries=max(settings.search_cache_size, 0),
+            ttl_seconds=settings.search_cache_ttl_seconds,
+        ),
+    )
     admin_auth = AdminAuthService(
         repo=repo,
         admin_ids=settings.admin_ids,
@@ -160,6 +244,7 @@ def create_runtime(settings: Settings) -> tuple[RuntimeContext, Settings]:
         max_failed_attempts=settings.admin_max_failed_attempts,
         lockout_seconds=settings.admin_lockout_seconds,
     )
+    db_executor = create_db_executor(settings.db_executor_workers)
     runtime = RuntimeContext(
         repo=repo,
         tokenizer=tokenizer,
@@ -173,6 +258,25 @@ def create_runtime(settings: Settings) -> tuple[RuntimeContext, Settings]:
         private_separator=settings.private_separator,
         proxy_fail_open=settings.proxy_fail_open,
         polling_idle_restart_seconds=settings.polling_idle_restart_seconds,
+        async_repo=AsyncMessageRepository(repo, db_executor),
+        async_search=AsyncSearchService(search_service, db_executor),
+        ingest_queue=IngestQueue(
+            repo,
+            db_executor,
+            batch_size=settings.ingest_batch_size,
+            flush_interval_ms=settings.ingest_flush_ms,
+            max_size=settings.ingest_queue_max_size,
+        ),
+        inline_gate=InlineQueryGate(
+            debounce_ms=max(settings.inline_debounce_ms, 0),
+            min_query_chars=max(settings.inline_min_query_chars, 1),
+        ),
+        inline_page_size=settings.inline_page_size,
+        inline_cache_time=max(settings.inline_cache_time, 1),
+        inline_cache=SearchCache(
+            max_entries=max(settings.inline_result_cache_size, 0),
+            ttl_seconds=settings.search_cache_ttl_seconds,
+        ),
     )
     return runtime, settings
 
@@ -192,6 +296,8 @@ def _register_handlers(app: Application) -> None:
     app.add_handler(CommandHandler("admin_channel_enable", admin_channel_enable))
     app.add_handler(CommandHandler("admin_channel_list", admin_channel_list))
     app.add_handler(CommandHandler("admin_delete_msg", admin_delete_msg))
+    app.add_handler(CommandHandler("admin_stats", admin_stats))
+    app.add_handler(CommandHandler("admin_fts_optimize", admin_fts_optimize))
 
     app.add_handler(CommandHandler("start", start_command))
     app.add_handler(CommandHandler("help", help_command))
@@ -252,8 +358,51 @@ async def _api_probe_job(context: ContextTypes.DEFAULT_TYPE) -> None:
         return
 
 
+def _load_fts_maintenance_settings(config_store: ConfigStore) -> dict[str, int]:
+    return {key: config_store.get_int(key, default) for key, default in FTS_MAINTENANCE_DEFAULTS.items()}
+
+
+async def _fts_maintenance_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    runtime = context.application.bot_data.get("runtime")
+    if runtime is None:
+        return
+    state = context.job.data
+    options = await runtime.async_repo.run(_load_fts_maintenance_settings, runtime.config_store)
+    fts_options = tuple(options[key] for key in FTS_OPTION_KEYS)
+    if state.get("fts_options") != fts_options:
+        await runtime.async_repo.run(runtime.repo.fts_configure, *fts_options)
+        state["fts_options"] = fts_options
+        logger.info("fts maintenance: automerge=%s crisismerge=%s usermerge=%s", *fts_options)
+
+    idle_seconds = time.time() - runtime.last_update_ts if runtime.last_update_ts > 0 else float("inf")
+    queue_depth = runtime.ingest_queue.depth if runtime.ingest_queue is not None else 0
+    if idle_seconds < options["fts_maintenance_idle_seconds"] or queue_depth > 0:
+        logger.debug("fts maintenance skipped: idle=%.0fs queue_depth=%s", idle_seconds, queue_depth)
+        return
+    result = await runtime.async_repo.run(
+        runtime.repo.fts_merge_slice,
+        options["fts_merge_pages"],
+        options["fts_merge_budget_ms"],
+    )
+    if result.steps:
+        state["optimized"] = False
+        logger.info(
+            "fts maintenance: merge steps=%s finished=%s elapsed_ms=%.1f",
+            result.steps,
+            result.finished,
+            result.elapsed_ms,
+        )
+    if result.finished and not state.get("optimized"):
+        await runtime.async_repo.run(runtime.repo.pragma_optimize)
+        state["optimized"] = True
+        logger.info("fts maintenance: segments merged, ran PRAGMA optimize")
+
+
 async def _post_init(app: Application) -> None:
     mode = str(app.bot_data.get("app_mode", "polling"))
+    runtime = app.bot_data.get("runtime")
+    if runtime is not None and runtime.ingest_queue is not None:
+        await runtime.ingest_queue.start()
     try:
         me = await app.bot.get_me(
             connect_timeout=10,
@@ -309,11 +458,19 @@ async def _post_init(app: Application) -> None:
         logger.warning("webhook probe failed error=%r", exc)
 
 
+async def _post_shutdown(app: Application) -> None:
+    runtime = app.bot_data.get("runtime")
+    if runtime is not None and runtime.ingest_queue is not None:
+        await runtime.ingest_queue.stop()
+        logger.info("ingest queue flushed on shutdown committed=%s", runtime.ingest_queue.stats.committed)
+
+
 def _build_application(settings: Settings, runtime: RuntimeContext) -> Application:
     builder = (
         ApplicationBuilder()
         .token(settings.bot_token)
         .post_init(_post_init)
+        .post_shutdown(_post_shutdown)
         .connect_timeout(10)
         .read_timeout(30)
         .write_timeout(30)
@@ -322,6 +479,7 @@ def _build_application(settings: Settings, runtime: RuntimeContext) -> Applicati
         .get_updates_read_timeout(30)
         .get_updates_write_timeout(30)
         .get_updates_pool_timeout(10)
+        .concurrent_updates(settings.concurrent_updates)
     )
     apply_proxy(builder, settings.telegram_proxy_enabled, settings.telegram_proxy_url)
     app = builder.build()
@@ -342,9 +500,28 @@ def _build_application(settings: Settings, runtime: RuntimeContext) -> Applicati
                 "misfire_grace_time": 30,
             },
         )
+        app.job_queue.run_repeating(
+            _fts_maintenance_job,
+            interval=max(
+                runtime.config_store.get_int(
+                    "fts_maintenance_interval_seconds",
+                    FTS_MAINTENANCE_DEFAULTS["fts_maintenance_interval_seconds"],
+                ),
+                10,
+            ),
+            first=60,
+            name="fts_maintenance",
+            data={},
+            job_kwargs={
+                "max_instances": 1,
+                "coalesce": True,
+                "misfire_grace_time": 60,
+            },
+        )
     else:
         logger.warning(
-            "JobQueue not available; api probe scheduler disabled. Install python-telegram-bot[job-queue] to enable it."
+            "JobQueue not available; api probe and fts maintenance schedulers disabled. "
+            "Install python-telegram-bot[job-queue] to enable them."
         )
     return app
 
@@ -371,6 +548,45 @@ def _start_heartbeat(runtime: RuntimeContext) -> threading.Event:
                     up_sec,
                     api_stale,
                 )
+            queue = runtime.ingest_queue
+            if queue is not None:
+                logger.info(
+                    "heartbeat: ingest_queue depth=%s committed=%s unchanged=%s failed=%s batches=%s "
+                    "last_commit_ms=%.1f avg_commit_ms=%.1f max_commit_ms=%.1f",
+                    queue.depth,
+                    queue.stats.committed,
+                    queue.stats.unchanged,
+                    queue.stats.failed,
+                    queue.stats.batches,
+                    queue.stats.last_commit_ms,
+                    queue.stats.avg_commit_ms,
+                    queue.stats.max_commit_ms,
+                )
+            inline = runtime.inline_gate.stats
+            logger.info(
+                "heartbeat: inline received=%s answered=%s cancelled=%s skipped=%s too_short=%s",
+                inline.received,
+                inline.answered,
+                inline.cancelled,
+                inline.skipped,
+                inline.too_short,
+            )
+            for name, cache in (("search_cache", runtime.search_service.cache), ("inline_cache", runtime.inline_cache)):
+                if cache.enabled:
+                    logger.info(
+                        "heartbeat: %s entries=%s hits=%s misses=%s stale=%s hit_rate=%.1f%%",
+                        name,
+                        len(cache),
+                        cache.stats.hits,
+                        cache.stats.misses,
+                        cache.stats.stale,
+                        cache.stats.hit_rate * 100,
+                    )
+            try:
+                # Aliases written by another process (e.g. a separate import).
+                runtime.repo.reload_channel_directory()
+            except sqlite3.Error:
+                logger.exception("heartbeat: channel directory reload failed")
             stop_event.wait(60)
 
     thread = threading.Thread(target=_worker, daemon=True, name="bot-heartbeat")
@@ -442,6 +658,10 @@ def run_bot(settings: Settings, runtime: RuntimeContext) -> None:
     finally:
         api_server.stop()
         heartbeat_stop.set()
+        # Not in _post_shutdown: the loop above rebuilds the application and
+        # reuses the executor. The last _post_shutdown already flushed the queue.
+        runtime.async_repo.executor.shutdown(wait=True)
+        logger.info("db executor shut down")
 
 
 def run_import(
@@ -450,6 +670,9 @@ def run_import(
     json_path: str,
     dry_run: bool,
     channel_alias: str | None = None,
+    bulk: bool = False,
+    batch_size: int = 5000,
+    workers: int = 1,
 ) -> None:
     stats = import_telegram_export(
         json_path=json_path,
@@ -457,16 +680,56 @@ def run_import(
         tokenizer=runtime.tokenizer,
         dry_run=dry_run,
         channel_alias=channel_alias,
+        bulk=bulk,
+        batch_size=batch_size,
+        workers=workers,
     )
     logger.info(
-        "import done total=%s imported=%s skipped=%s dry_run=%s",
+        "import done total=%s imported=%s skipped=%s dry_run=%s bulk=%s workers=%s",
         stats.total,
         stats.imported,
         stats.skipped,
         dry_run,
+        bulk,
+        stats.workers,
+    )
+    rates = stats.stage_rates()
+    logger.info(
+        "import stages parse=%.0f msg/s (%.2fs) tokenize=%.0f msg/s (%.2fs, %.2fs cpu) write=%.0f msg/s (%.2fs)",
+        rates["parse"],
+        stats.parse_seconds,
+        rates["tokenize"],
+        stats.tokenize_seconds,
+        stats.tokenize_cpu_seconds,
+        rates["write"],
+        stats.write_seconds,
+    )
+
+
+def run_reindex(runtime: RuntimeContext, batch_size: int = 2000) -> None:
+    before = fts_index_bytes(runtime.repo.conn)
+    started = time.perf_counter()
+    changed = runtime.repo.reindex_tokens(batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+    runtime.repo.fts_optimize()
+    after = fts_index_bytes(runtime.repo.conn)
+    logger.info(
+        "reindex done tokenizer=%s changed=%s elapsed=%.1fs fts_bytes_before=%s fts_bytes_after=%s",
+        runtime.tokenizer.version,
+        changed,
+        elapsed,
+        before,
+        after,
     )
 
 
+def run_reorder_ids(runtime: RuntimeContext) -> None:
+    started = time.perf_counter()
+    moved = runtime.repo.reorder_ids()
+    logger.info("reorder-ids done moved=%s elapsed=%.1fs", moved, time.perf_counter() - started)
+    runtime.repo.fts_optimize()
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Telegram Chinese search bot")
     sub = parser.add_subparsers(dest="command")
@@ -476,6 +739,21 @@ def parse_args() -> argparse.Namespace:
     import_parser.add_argument("--json", required=True, help="Path to result.json")
     import_parser.add_argument("--dry-run", action="store_true")
     import_parser.add_argument("--channel-alias", help="Channel alias, e.g. @mychannel")
+    import_parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="Batch writes and defer FTS maintenance to one rebuild at the end",
+    )
+    import_parser.add_argument("--batch-size", type=int, default=5000, help="Rows per transaction in --bulk mode")
+    import_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Tokenizer processes; 1 tokenizes inline in the import process",
+    )
+    reindex_parser = sub.add_parser("reindex", help="Re-tokenize stored messages with the current tokenizer")
+    reindex_parser.add_argument("--batch-size", type=int, default=2000, help="Rows per transaction")
+    sub.add_parser("reorder-ids", help="Renumber messages to time-aligned ids for streaming newest-first search")
     return parser.parse_args()
 
 
@@ -490,8 +768,17 @@ def main() -> None:
             json_path=args.json,
             dry_run=args.dry_run,
             channel_alias=args.channel_alias,
+            bulk=args.bulk,
+            batch_size=args.batch_size,
+            workers=args.workers,
         )
         return
+    if args.command == "reindex":
+        run_reindex(runtime, batch_size=args.batch_size)
+        return
+    if args.command == "reorder-ids":
+        run_reorder_ids(runtime)
+        return
     run_bot(settings, runtime)
 
 
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.search.service import SearchService
+from app.storage.async_repository import run_in_executor
+from app.storage.repository import ChannelFilter, SearchPage, SearchRow
+
+
+class AsyncSearchService:
+    """Awaitable view of SearchService so handlers never run SQLite on the event loop."""
+
+    def __init__(self, service: SearchService, executor: ThreadPoolExecutor) -> None:
+        self.service = service
+        self.executor = executor
+
+    async def search(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        channel_filter: ChannelFilter = None,
+        cursor: str | None = None,
+        sort: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> list[SearchRow]:
+        return await run_in_executor(
+            self.executor,
+            self.service.search,
+            query,
+            limit=limit,
+            offset=offset,
+            channel_filter=channel_filter,
+            cursor=cursor,
+            sort=sort,
+            since=since,
+            until=until,
+        )
+
+    async def search_page(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        channel_filter: ChannelFilter = None,
+        cursor: str | None = None,
+        sort: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> SearchPage:
+        return await run_in_executor(
+            self.executor,
+            self.service.search_page,
+            query,
+            limit=limit,
+            offset=offset,
+            channel_filter=channel_filter,
+            cursor=cursor,
+            sort=sort,
+            since=since,
+            until=until,
+        )
+
+    async def count(
+        self,
+        query: str,
+        channel_filter: ChannelFilter = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> int:
+        return await run_in_executor(
+            self.executor,
+            self.service.count,
+            query,
+            channel_filter=channel_filter,
+            since=since,
+            until=until,
+        )
+
+    async def random(self, limit: int, channel_filter: ChannelFilter = None) -> list[SearchRow]:
+        return await run_in_executor(self.executor, self.service.random, limit, channel_filter=channel_filter)
+
+    async def random_count(self, channel_filter: ChannelFilter = None) -> int:
+        return await run_in_executor(self.executor, self.service.random_count, channel_filter=channel_filter)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass(slots=True)
+class SearchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Entries found but written under an older generation.
+    stale: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass(slots=True)
+class SearchCache:
+    """Bounded LRU of search results with a TTL and generation check.
+
+    Each entry stores the repository's ``search_generation`` token taken before
+    the search ran; a lookup whose current token differs is a miss, so results
+    never outlive a committed write to the channels they cover. The TTL bounds
+    staleness from writers outside this process (e.g. a separate import).
+    ``max_entries`` 0 disables caching.
+    """
+
+    max_entries: int = 1024
+    ttl_seconds: float = 60.0
+    stats: SearchCacheStats = field(default_factory=SearchCacheStats)
+    _entries: OrderedDict[Hashable, tuple[float, tuple[int, ...], Any]] = field(
+        default_factory=OrderedDict, repr=False
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, generation: tuple[int, ...]) -> tuple[bool, Any]:
+        """``(True, value)`` for a current entry, ``(False, None)`` otherwise."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return False, None
+            stored_at, stored_generation, value = entry
+            if stored_generation != generation or now - stored_at >= self.ttl_seconds:
+                del self._entries[key]
+                self.stats.misses += 1
+                self.stats.stale += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return True, value
+
+    def put(self, key: Hashable, generation: tuple[int, ...], value: Any) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import base64
+import binascii
+
+from app.storage.repository import SearchRow
+
+
+CURSOR_VERSION = "v1"
+
+
+def encode_cursor(timestamp: int, row_id: int) -> str:
+    raw = f"{CURSOR_VERSION}:{int(timestamp)}:{int(row_id)}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[int, int]:
+    """Return the (timestamp, id) seek key; raises ValueError for malformed cursors."""
+    padded = cursor.strip() + "=" * (-len(cursor.strip()) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+        version, timestamp, row_id = raw.split(":")
+        if version != CURSOR_VERSION:
+            raise ValueError
+        return int(timestamp), int(row_id)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("invalid cursor") from None
+
+
+def next_cursor(rows: list[SearchRow], limit: int) -> str | None:
+    """Cursor for the page after ``rows``; None once a short page shows the end."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(last.timestamp, last.id)
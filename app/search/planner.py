@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from app.search.tokenizer import CJK_RUN_RE, Tokenizer
+
+
+DocFreqLookup = Callable[[list[str]], dict[str, int]]
+
+
+@dataclass(slots=True, frozen=True)
+class QueryTerm:
+    text: str
+    prefix: bool
+    doc_freq: int
+
+    def fts(self) -> str:
+        return f'"{self.text}"*' if self.prefix else f'"{self.text}"'
+
+
+@dataclass(slots=True, frozen=True)
+class QueryPlan:
+    terms: tuple[QueryTerm, ...]
+    # Some required term has no postings at all, so the AND cannot match.
+    impossible: bool = False
+
+    @property
+    def fts_query(self) -> str:
+        if self.impossible:
+            return ""
+        return " AND ".join(term.fts() for term in self.terms)
+
+
+@dataclass(slots=True)
+class QueryPlanner:
+    """Turns a query into a small FTS5 AND expression.
+
+    Every CJK run in the query becomes its distinct character bigrams as exact
+    terms (the index stores every bigram of every run), so the prefix ``*`` on
+    bigrams and the one- and two-character jieba words inside a run are
+    dropped. Longer in-run words keep their prefix ``*`` to preserve adjacency,
+    as do the remaining words (Latin, digits, lone CJK characters). Document frequencies come from the fts5vocab table,
+    cached for ``cache_ttl`` seconds; terms are emitted rarest-first.
+    """
+
+    tokenizer: Tokenizer
+    doc_freqs: DocFreqLookup
+    cache_size: int = 4096
+    cache_ttl: float = 600.0
+    _cache: OrderedDict[str, tuple[float, int]] = field(default_factory=OrderedDict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def plan(self, query: str) -> QueryPlan:
+        normalized = self.tokenizer.normalize_text(query)
+        if not normalized:
+            return QueryPlan(terms=())
+        runs = CJK_RUN_RE.findall(normalized)
+        # Bigrams alone lose adjacency past two characters (计算 AND 算机 also
+        # matches 算机计算), so longer in-run words stay as required terms.
+        words = [
+            token
+            for token in self.tokenizer.tokenize(normalized)
+            if len(token) > 2 or not any(token in run for run in runs)
+        ]
+        bigrams = list(dict.fromkeys(run[i : i + 2] for run in runs for i in range(len(run) - 1)))
+        freqs = self._lookup(bigrams)
+        # A document containing the run contains every one of its bigrams.
+        if any(freqs[bigram] == 0 for bigram in bigrams):
+            return QueryPlan(terms=(), impossible=True)
+
+        chosen = [QueryTerm(text=bigram, prefix=False, doc_freq=freqs[bigram]) for bigram in bigrams]
+        # Prefix terms have no single vocab row; rank them after the exact ones.
+        for word in words:
+            cleaned = word.replace('"', "").strip()
+            if cleaned:
+                chosen.append(QueryTerm(text=cleaned, prefix=True, doc_freq=-1))
+        unique = {term.fts(): term for term in chosen}
+        ordered = sorted(unique.values(), key=lambda term: (term.prefix, term.doc_freq))
+        return QueryPlan(terms=tuple(ordered))
+
+    def _lookup(self, terms: list[str]) -> dict[str, int]:
+        now = time.monotonic()
+        found: dict[str, int] = {}
+        missing: list[str] = []
+        with self._lock:
+            for term in terms:
+                cached = self._cache.get(term)
+                if cached is not None and now - cached[0] < self.cache_ttl:
+                    self._cache.move_to_end(term)
+                    found[term] = cached[1]
+                else:
+                    missing.append(term)
+        if not missing:
+            return found
+        fresh = self.doc_freqs(missing)
+        with self._lock:
+            for term in missing:
+                count = fresh.get(term, 0)
+                found[term] = count
+                # A zero may stop being true with the next write, so only
+                # positive counts are cached.
+                if count > 0:
+                    self._cache[term] = (now, count)
+                    self._cache.move_to_end(term)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return found
+
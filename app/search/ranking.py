@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+SORT_TIME = "time"
+SORT_RELEVANCE = "relevance"
+SORT_HYBRID = "hybrid"
+SEARCH_SORTS = (SORT_TIME, SORT_RELEVANCE, SORT_HYBRID)
+
+
+@dataclass(slots=True, frozen=True)
+class HybridRanking:
+    """Blend of FTS5 bm25 and message age for ``sort=hybrid``.
+
+    A match scores ``bm25 * (1 + recency_weight * decay)`` where ``decay`` is
+    ``half_life / (half_life + age)``: 1 for a brand-new message, 0.5 at one
+    half-life, approaching 0 for old ones. Pure arithmetic, so it needs no
+    SQLite math functions, and the boost is bounded by ``1 + recency_weight``.
+    """
+
+    half_life_seconds: float = 30 * 86400
+    recency_weight: float = 1.0
+
+    def factor(self, age_seconds: float) -> float:
+        decay = self.half_life_seconds / (self.half_life_seconds + max(age_seconds, 0.0))
+        return 1.0 + self.recency_weight * decay
+
+
+def parse_sort(value: str | None, default: str = SORT_TIME) -> str:
+    if value is None or not value.strip():
+        return default
+    sort = value.strip().lower()
+    if sort not in SEARCH_SORTS:
+        raise ValueError(f"sort must be one of: {', '.join(SEARCH_SORTS)}")
+    return sort
@@ -1,16 +1,61 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass, field
+from typing import TypeVar
 
-from app.search.query_builder import build_fts_query
+from app.search.cache import SearchCache
+from app.search.cursor import decode_cursor
+from app.search.planner import QueryPlanner
+from app.search.ranking import SORT_TIME, HybridRanking, parse_sort
 from app.search.tokenizer import Tokenizer
-from app.storage.repository import MessageRepository, SearchRow
+from app.storage.repository import ChannelFilter, MessageRepository, SearchPage, SearchRow
+
+
+T = TypeVar("T")
 
 
 @dataclass(slots=True)
 class SearchService:
     repo: MessageRepository
     tokenizer: Tokenizer
+    # Totals in search_page stop counting past this many matches; 0 counts exactly.
+    count_limit: int = 0
+    planner: QueryPlanner | None = None
+    # Order used when a caller does not pass ``sort``: time, relevance or hybrid.
+    default_sort: str = SORT_TIME
+    ranking: HybridRanking = HybridRanking()
+    # Results of search / search_page / count, checked against write generations.
+    cache: SearchCache = field(default_factory=SearchCache)
+
+    def _fts_query(self, query: str) -> str:
+        if self.planner is None:
+            self.planner = QueryPlanner(tokenizer=self.tokenizer, doc_freqs=self.repo.term_doc_counts)
+        return self.planner.plan(query).fts_query
+
+    def _cache_query(self, query: str) -> str:
+        return " ".join(self.tokenizer.normalize_text(query).split())
+
+    def _cached(self, key: Hashable, chat_ids: list[int] | None, compute: Callable[[], T]) -> T:
+        """``compute()``, served from the cache while the channels saw no writes."""
+        if not self.cache.enabled:
+            return compute()
+        # Taken before the query runs, so a write that lands meanwhile makes
+        # the stored result stale rather than being missed.
+        generation = self.repo.search_generation(chat_ids)
+        found, value = self.cache.get(key, generation)
+        if found:
+            return value
+        value = compute()
+        self.cache.put(key, generation, value)
+        return value
+
+    def _sort_and_after(self, sort: str | None, cursor: str | None) -> tuple[str, tuple[int, int] | None]:
+        sort = parse_sort(sort, default=self.default_sort)
+        after = decode_cursor(cursor) if cursor else None
+        if after is not None and sort != SORT_TIME:
+            raise ValueError("cursor requires sort=time")
+        return sort, after
 
     def _check_channel_allowed(self, chat_id: int | None) -> bool:
         """Check if a channel is allowed for search. Returns True if allowed."""
@@ -18,68 +63,166 @@ class SearchService:
             return True
         return self.repo.is_channel_allowed(chat_id)
 
+    def allowed_chat_ids(self, channel_filter: ChannelFilter) -> list[int] | None:
+        """Resolved, permitted chat ids for a search filter; None means all channels.
+
+        Without a filter the enabled whitelist (if any) becomes the filter, so
+        it is applied inside the query and limits, offsets and totals stay
+        right. Unknown or disallowed channels in a multi-channel filter are
+        dropped; an empty list means nothing may be searched.
+        """
+        chat_ids = self.repo.resolve_channels(channel_filter)
+        if chat_ids is None:
+            return self.repo.channels.allowed_chat_ids()
+        return [chat_id for chat_id in chat_ids if self._check_channel_allowed(chat_id)]
+
     def search(
         self,
         query: str,
         limit: int,
         offset: int = 0,
-        channel_filter: str | int | None = None,
+        channel_filter: ChannelFilter = None,
+        cursor: str | None = None,
+        sort: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
     ) -> list[SearchRow]:
         query = query.strip()
         if not query:
             return []
-        
+        sort, after = self._sort_and_after(sort, cursor)
+
         # Check channel permission
-        chat_id = self.repo.resolve_channel(channel_filter)
-        if channel_filter is not None and chat_id is None:
+        chat_ids = self.allowed_chat_ids(channel_filter)
+        if chat_ids == []:
             return []
-        if chat_id is not None and not self._check_channel_allowed(chat_id):
-            return []
-        
-        tokens = self.tokenizer.tokenize(query)
-        fts_query = build_fts_query(tokens)
-        if not fts_query:
-            return []
-        return self.repo.search(fts_query=fts_query, limit=limit, offset=offset, channel=channel_filter)
 
-    def count(self, query: str, channel_filter: str | int | None = None) -> int:
+        def compute() -> list[SearchRow]:
+            fts_query = self._fts_query(query)
+            if not fts_query:
+                return []
+            return self.repo.search(
+                fts_query=fts_query,
+                limit=limit,
+                offset=offset,
+                channel=chat_ids,
+                after=after,
+                sort=sort,
+                ranking=self.ranking,
+                since=since,
+                until=until,
+            )
+
+        key = (
+            "search",
+            self._cache_query(query),
+            None if chat_ids is None else tuple(chat_ids),
+            sort,
+            limit,
+            0 if after is not None else offset,
+            after,
+            since,
+            until,
+        )
+        return self._cached(key, chat_ids, compute)
+
+    def search_page(
+        self,
+        query: str,
+        limit: int,
+        offset: int = 0,
+        channel_filter: ChannelFilter = None,
+        cursor: str | None = None,
+        exact: bool = False,
+        sort: str | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> SearchPage:
+        """Rows and total for one page, tokenizing and resolving the channel once."""
+        empty = SearchPage(rows=[], total=0, total_exact=True)
+        query = query.strip()
+        if not query:
+            return empty
+        sort, after = self._sort_and_after(sort, cursor)
+
+        chat_ids = self.allowed_chat_ids(channel_filter)
+        if chat_ids == []:
+            return empty
+
+        count_limit = None if exact or self.count_limit <= 0 else self.count_limit
+
+        def compute() -> SearchPage:
+            fts_query = self._fts_query(query)
+            if not fts_query:
+                return empty
+            return self.repo.search_page(
+                fts_query=fts_query,
+                limit=limit,
+                offset=offset,
+                channel=chat_ids,
+                after=after,
+                count_limit=count_limit,
+                sort=sort,
+                ranking=self.ranking,
+                since=since,
+                until=until,
+            )
+
+        key = (
+            "page",
+            self._cache_query(query),
+            None if chat_ids is None else tuple(chat_ids),
+            sort,
+            limit,
+            0 if after is not None else offset,
+            after,
+            count_limit,
+            since,
+            until,
+        )
+        return self._cached(key, chat_ids, compute)
+
+    def count(
+        self,
+        query: str,
+        channel_filter: ChannelFilter = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> int:
         query = query.strip()
         if not query:
             return 0
-        
+
         # Check channel permission
-        chat_id = self.repo.resolve_channel(channel_filter)
-        if channel_filter is not None and chat_id is None:
-            return 0
-        if chat_id is not None and not self._check_channel_allowed(chat_id):
-            return 0
-        
-        tokens = self.tokenizer.tokenize(query)
-        fts_query = build_fts_query(tokens)
-        if not fts_query:
+        chat_ids = self.allowed_chat_ids(channel_filter)
+        if chat_ids == []:
             return 0
-        return self.repo.search_count(fts_query=fts_query, channel=channel_filter)
+
+        def compute() -> int:
+            fts_query = self._fts_query(query)
+            if not fts_query:
+                return 0
+            return self.repo.search_count(fts_query=fts_query, channel=chat_ids, since=since, until=until)
+
+        key = ("count", self._cache_query(query), None if chat_ids is None else tuple(chat_ids), since, until)
+        return self._cached(key, chat_ids, compute)
 
     def random(
         self,
         limit: int,
-        channel_filter: str | int | None = None,
+        channel_filter: ChannelFilter = None,
     ) -> list[SearchRow]:
         if limit <= 0:
             return []
 
-        chat_id = self.repo.resolve_channel(channel_filter)
-        if channel_filter is not None and chat_id is None:
-            return []
-        if chat_id is not None and not self._check_channel_allowed(chat_id):
+        chat_ids = self.allowed_chat_ids(channel_filter)
+        if chat_ids == []:
             return []
 
-        return self.repo.random_messages(limit=limit, channel=channel_filter)
+        return self.repo.random_messages(limit=limit, channel=chat_ids)
 
-    def random_count(self, channel_filter: str | int | None = None) -> int:
-        chat_id = self.repo.resolve_channel(channel_filter)
-        if channel_filter is not None and chat_id is None:
-            return 0
-        if chat_id is not None and not self._check_channel_allowed(chat_id):
+    def random_count(self, channel_filter: ChannelFilter = None) -> int:
+        chat_ids = self.allowed_chat_ids(channel_filter)
+        if chat_ids == []:
             return 0
-        return self.repo.random_count(channel=channel_filter)
+        return self.repo.random_count(channel=chat_ids)
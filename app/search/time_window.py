@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import calendar
+import datetime as dt
+import re
+import time
+
+
+RELATIVE_RE = re.compile(r"^(\d+)([hdwm])$", re.IGNORECASE)
+DATE_RE = re.compile(r"^(\d{4})-(\d{1,2})(?:-(\d{1,2}))?$")
+RELATIVE_SECONDS = {"h": 3600, "d": 86400, "w": 7 * 86400, "m": 30 * 86400}
+
+
+def parse_time_bound(value: str | None, *, end: bool = False, now: float | None = None) -> int | None:
+    """Unix timestamp for a ``since`` / ``until`` value.
+
+    Accepts a unix timestamp, a local date ``2024-05-01`` or month ``2024-05``,
+    or an age such as ``12h`` / ``7d`` / ``2w`` / ``3m`` (30-day months). With
+    ``end`` a date or month means its last second, so ``until:2024-05`` covers
+    all of May. Raises ValueError for anything else.
+    """
+    if value is None or not value.strip():
+        return None
+    raw = value.strip()
+    if raw.isdigit():
+        return int(raw)
+    relative = RELATIVE_RE.match(raw)
+    if relative:
+        current = time.time() if now is None else now
+        return int(current) - int(relative.group(1)) * RELATIVE_SECONDS[relative.group(2).lower()]
+    date = DATE_RE.match(raw)
+    if date:
+        year, month = int(date.group(1)), int(date.group(2))
+        try:
+            if date.group(3) is None:
+                first = dt.datetime(year, month, 1)
+                days = calendar.monthrange(year, month)[1]
+            else:
+                first = dt.datetime(year, month, int(date.group(3)))
+                days = 1
+        except ValueError:
+            raise ValueError(f"invalid date: {raw}") from None
+        start = int(first.timestamp())
+        if not end:
+            return start
+        return int((first + dt.timedelta(days=days)).timestamp()) - 1
+    raise ValueError(f"invalid time: {raw} (use a unix timestamp, YYYY-MM-DD, YYYY-MM or 7d/12h/2w/3m)")
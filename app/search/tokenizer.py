@@ -6,13 +6,25 @@ from dataclasses import dataclass
 import jieba
 
 
-TOKEN_SPLIT_RE = re.compile(r"\s+")
 NON_TOKEN_RE = re.compile(r"[^\w\u4e00-\u9fff]+", re.UNICODE)
+# Contiguous Han / Kana / Hangul runs; only these get character bigrams, while
+# Latin words and numbers are indexed as the whole words jieba already yields.
+CJK_RUN_RE = re.compile(
+    "["
+    "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"  # Han
+    "\u3040-\u30ff\u31f0-\u31ff"  # Hiragana / Katakana
+    "\u1100-\u11ff\u3130-\u318f\uac00-\ud7af"  # Hangul
+    "]{2,}"
+)
+# Bump whenever tokenize() output changes for the same text; a contentless index
+# built by another version has to be re-derived before old entries can be removed.
+TOKENIZER_VERSION = "2"
 
 
 @dataclass(slots=True)
 class Tokenizer:
     stopwords: set[str]
+    version: str = TOKENIZER_VERSION
 
     def normalize_text(self, text: str) -> str:
         lowered = text.lower().strip()
@@ -24,10 +36,7 @@ class Tokenizer:
             return []
         base_tokens = [t.strip() for t in jieba.cut(normalized) if t.strip()]
         filtered = [t for t in base_tokens if t not in self.stopwords]
-        ngrams: list[str] = []
-        compact = TOKEN_SPLIT_RE.sub("", normalized)
-        if len(compact) >= 2:
-            ngrams.extend(compact[i : i + 2] for i in range(len(compact) - 1))
+        ngrams = [run[i : i + 2] for run in CJK_RUN_RE.findall(normalized) for i in range(len(run) - 1)]
         return list(dict.fromkeys(filtered + ngrams))
 
 
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from app.normalize.channel_message import NormalizedMessage
+from app.storage.repository import MessageRepository
+
+
+T = TypeVar("T")
+
+
+def create_db_executor(max_workers: int = 4) -> ThreadPoolExecutor:
+    if max_workers <= 0:
+        raise ValueError("db executor needs at least one worker")
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+
+class AsyncMessageRepository:
+    """Awaitable view of MessageRepository; SQLite calls run on the bounded db executor.
+
+    Channel resolution and whitelist checks are answered from the in-memory
+    channel directory, so they return without an executor hop.
+    """
+
+    def __init__(self, repo: MessageRepository, executor: ThreadPoolExecutor) -> None:
+        self.repo = repo
+        self.executor = executor
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        return await run_in_executor(self.executor, fn, *args, **kwargs)
+
+    async def resolve_channel(self, channel: str | int | None) -> int | None:
+        return self.repo.resolve_channel(channel)
+
+    async def is_channel_allowed(self, chat_id: int) -> bool:
+        return self.repo.is_channel_allowed(chat_id)
+
+    async def upsert_message(self, msg: NormalizedMessage, tokens: list[str]) -> int:
+        return await self.run(self.repo.upsert_message, msg, tokens)
+
+    async def delete_message(self, chat_id: int, message_id: int) -> bool:
+        return await self.run(self.repo.delete_message, chat_id, message_id)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+
+@dataclass(slots=True)
+class ChannelDirectory:
+    """In-memory copy of ``channel_alias`` and ``allowed_channels``.
+
+    Channel resolution and whitelist checks run on every search, so they read
+    these dicts instead of SQLite. MessageRepository updates the directory after
+    each committed alias or whitelist write; ``reload`` picks up rows written by
+    other processes (e.g. a separate ``import``).
+    """
+
+    _chat_by_username: dict[str, int] = field(default_factory=dict)
+    _username_by_chat: dict[int, str] = field(default_factory=dict)
+    # chat_id -> enabled; an empty whitelist allows every channel.
+    _allowed: dict[int, bool] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection) -> ChannelDirectory:
+        directory = cls()
+        directory.reload(conn)
+        return directory
+
+    def reload(self, conn: sqlite3.Connection) -> None:
+        aliases = {
+            int(row[0]): str(row[1])
+            for row in conn.execute("SELECT chat_id, username FROM channel_alias")
+            if row[1]
+        }
+        allowed = {int(row[0]): bool(row[1]) for row in conn.execute("SELECT chat_id, enabled FROM allowed_channels")}
+        with self._lock:
+            # Swap whole dicts so lock-free readers never see a half-loaded state.
+            self._username_by_chat = aliases
+            self._chat_by_username = {username: chat_id for chat_id, username in aliases.items()}
+            self._allowed = allowed
+
+    def resolve(self, username: str) -> int | None:
+        return self._chat_by_username.get(username)
+
+    def set_aliases(self, aliases: Mapping[int, str | None]) -> None:
+        """Mirror committed ``channel_alias`` upserts (usernames without ``@``)."""
+        with self._lock:
+            for chat_id, username in aliases.items():
+                if not username:
+                    continue
+                previous = self._username_by_chat.get(chat_id)
+                if previous is not None and previous != username:
+                    self._chat_by_username.pop(previous, None)
+                self._username_by_chat[chat_id] = username
+                self._chat_by_username[username] = chat_id
+
+    @property
+    def has_whitelist(self) -> bool:
+        return bool(self._allowed)
+
+    def is_allowed(self, chat_id: int) -> bool:
+        allowed = self._allowed
+        if not allowed:
+            return True
+        return allowed.get(chat_id, False)
+
+    def allowed_chat_ids(self) -> list[int] | None:
+        """Enabled whitelist entries in id order, or None when there is no whitelist."""
+        allowed = self._allowed
+        if not allowed:
+            return None
+        return sorted(chat_id for chat_id, enabled in allowed.items() if enabled)
+
+    def set_allowed(self, chat_id: int, enabled: bool) -> None:
+        with self._lock:
+            allowed = dict(self._allowed)
+            allowed[chat_id] = enabled
+            self._allowed = allowed
+
+    def remove_allowed(self, chat_id: int) -> None:
+        with self._lock:
+            allowed = dict(self._allowed)
+            allowed.pop(chat_id, None)
+            self._allowed = allowed
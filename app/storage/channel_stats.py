@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+from app.storage.meta import get_meta, set_meta
+
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_STATS_VERSION_KEY = "channel_stats_version"
+CHANNEL_STATS_VERSION = "1"
+
+# Per-channel message count and time range, kept in step with channel_messages
+# so counts never need a scan. Boundary timestamps are re-read through
+# idx_channel_messages_chat_time only when the changed row was on the boundary.
+CHANNEL_STATS_TRIGGERS: dict[str, str] = {
+    "channel_stats_ai": """
+        CREATE TRIGGER IF NOT EXISTS channel_stats_ai AFTER INSERT ON channel_messages BEGIN
+            INSERT INTO channel_stats(chat_id, message_count, first_timestamp, last_timestamp)
+            VALUES (new.chat_id, 1, new.timestamp, new.timestamp)
+            ON CONFLICT(chat_id) DO UPDATE SET
+                message_count = message_count + 1,
+                first_timestamp = MIN(first_timestamp, excluded.first_timestamp),
+                last_timestamp = MAX(last_timestamp, excluded.last_timestamp);
+        END
+    """,
+    "channel_stats_ad": """
+        CREATE TRIGGER IF NOT EXISTS channel_stats_ad AFTER DELETE ON channel_messages BEGIN
+            UPDATE channel_stats SET
+                message_count = message_count - 1,
+                first_timestamp = CASE WHEN old.timestamp <= first_timestamp
+                    THEN COALESCE((SELECT MIN(timestamp) FROM channel_messages WHERE chat_id = old.chat_id), 0)
+                    ELSE first_timestamp END,
+                last_timestamp = CASE WHEN old.timestamp >= last_timestamp
+                    THEN COALESCE((SELECT MAX(timestamp) FROM channel_messages WHERE chat_id = old.chat_id), 0)
+                    ELSE last_timestamp END
+            WHERE chat_id = old.chat_id;
+            DELETE FROM channel_stats WHERE chat_id = old.chat_id AND message_count <= 0;
+        END
+    """,
+    "channel_stats_au": """
+        CREATE TRIGGER IF NOT EXISTS channel_stats_au AFTER UPDATE OF timestamp ON channel_messages
+        WHEN old.timestamp IS NOT new.timestamp BEGIN
+            UPDATE channel_stats SET
+                first_timestamp = (SELECT MIN(timestamp) FROM channel_messages WHERE chat_id = new.chat_id),
+                last_timestamp = (SELECT MAX(timestamp) FROM channel_messages WHERE chat_id = new.chat_id)
+            WHERE chat_id = new.chat_id;
+        END
+    """,
+}
+
+
+def rebuild_channel_stats(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("DELETE FROM channel_stats")
+        conn.execute(
+            """
+            INSERT INTO channel_stats(chat_id, message_count, first_timestamp, last_timestamp)
+            SELECT chat_id, COUNT(1), MIN(timestamp), MAX(timestamp)
+            FROM channel_messages
+            GROUP BY chat_id
+            """
+        )
+        for ddl in CHANNEL_STATS_TRIGGERS.values():
+            conn.execute(ddl)
+        set_meta(conn, CHANNEL_STATS_VERSION_KEY, CHANNEL_STATS_VERSION)
+
+
+def ensure_channel_stats(conn: sqlite3.Connection) -> None:
+    """Install the stats triggers, backfilling counts for rows written before they existed."""
+    if get_meta(conn, CHANNEL_STATS_VERSION_KEY) != CHANNEL_STATS_VERSION:
+        logger.info("building channel_stats counters")
+        rebuild_channel_stats(conn)
+        return
+    for ddl in CHANNEL_STATS_TRIGGERS.values():
+        conn.execute(ddl)
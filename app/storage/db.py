@@ -1,27 +1,191 @@
 from __future__ import annotations
 
+import logging
+import re
 import sqlite3
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
 
+from app.search.tokenizer import Tokenizer
+from app.storage.channel_stats import ensure_channel_stats
+from app.storage.fts import (
+    CHAT_TERM_SQL,
+    FTS_MODE_CONTENTLESS,
+    FTS_TOKENIZER_VERSION_KEY,
+    ensure_fts_consistent,
+    ensure_fts_table,
+    get_fts_mode,
+    migrate_fts_mode,
+    reindex_contentless,
+    uses_contentless_delete,
+)
+from app.storage.meta import get_meta, set_meta
+from app.storage.random_index import ensure_random_index
+from app.storage.rowid_order import ensure_rowid_order
 
-def connect_db(sqlite_path: str) -> sqlite3.Connection:
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+PRAGMA_NAME_RE = re.compile(r"^[a-z_]+$")
+PRAGMA_VALUE_RE = re.compile(r"^[\w\-.]+$")
+
+
+def connect_db(
+    sqlite_path: str,
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+    pragmas: dict[str, str] | None = None,
+) -> sqlite3.Connection:
     path = Path(sqlite_path)
     path.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(path, check_same_thread=False)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys=ON;")
+    _apply_pragmas(conn, busy_timeout_ms, pragmas)
+    return conn
+
+
+def connect_read_only(
+    sqlite_path: str,
+    busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+    pragmas: dict[str, str] | None = None,
+) -> sqlite3.Connection:
+    uri = f"{Path(sqlite_path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only=ON;")
+    _apply_pragmas(conn, busy_timeout_ms, pragmas)
     return conn
 
 
-def init_db(conn: sqlite3.Connection, schema_path: str = "app/storage/schema.sql") -> None:
+def _apply_pragmas(
+    conn: sqlite3.Connection,
+    busy_timeout_ms: int,
+    pragmas: dict[str, str] | None,
+) -> None:
+    conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)};")
+    for name, value in (pragmas or {}).items():
+        if not PRAGMA_NAME_RE.match(name) or not PRAGMA_VALUE_RE.match(value):
+            raise ValueError(f"invalid sqlite pragma: {name}={value}")
+        conn.execute(f"PRAGMA {name}={value};")
+
+
+class ReadConnectionPool:
+    """Bounded pool of read-only WAL connections.
+
+    A thread borrows one connection for the duration of a read and keeps it for
+    nested reads, so concurrent readers never share a connection mutex with each
+    other or with the writer connection.
+    """
+
+    def __init__(
+        self,
+        sqlite_path: str,
+        size: int = 4,
+        busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+        pragmas: dict[str, str] | None = None,
+    ) -> None:
+        if size <= 0:
+            raise ValueError("read pool size must be positive")
+        self.sqlite_path = sqlite_path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.pragmas = dict(pragmas or {})
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle: list[sqlite3.Connection] = []
+        self._all: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            yield held
+            return
+        self._slots.acquire()
+        try:
+            conn = self._checkout()
+            self._local.conn = conn
+            try:
+                yield conn
+            finally:
+                self._local.conn = None
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        conn = connect_read_only(self.sqlite_path, self.busy_timeout_ms, self.pragmas)
+        with self._lock:
+            self._all.append(conn)
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            conns, self._all, self._idle = self._all, [], []
+        for conn in conns:
+            conn.close()
+
+
+def init_db(
+    conn: sqlite3.Connection,
+    schema_path: str = "app/storage/schema.sql",
+    fts_mode: str | None = None,
+    tokenizer: Tokenizer | None = None,
+) -> None:
+    """Create or upgrade the schema.
+
+    ``fts_mode`` switches the FTS storage mode online when it differs from the
+    one recorded in storage_meta; None keeps whatever the database uses.
+    """
     schema_sql = Path(schema_path).read_text(encoding="utf-8")
     conn.executescript(schema_sql)
     _ensure_columns(conn)
+    ensure_fts_table(conn, tokenizer.tokenize if tokenizer is not None else None)
+    _ensure_fts_mode(conn, fts_mode, tokenizer)
+    ensure_fts_consistent(conn)
+    ensure_random_index(conn)
+    ensure_channel_stats(conn)
+    ensure_rowid_order(conn)
     conn.commit()
 
 
+def _ensure_fts_mode(conn: sqlite3.Connection, fts_mode: str | None, tokenizer: Tokenizer | None) -> None:
+    if fts_mode is not None and fts_mode != get_fts_mode(conn):
+        if tokenizer is None:
+            raise ValueError("switching fts mode needs a tokenizer to re-derive tokens")
+        migrate_fts_mode(conn, fts_mode, tokenizer.tokenize, tokenizer.version)
+        return
+    if tokenizer is None or get_meta(conn, FTS_TOKENIZER_VERSION_KEY) == tokenizer.version:
+        return
+    if conn.execute("SELECT 1 FROM channel_messages LIMIT 1").fetchone() is None:
+        with conn:
+            set_meta(conn, FTS_TOKENIZER_VERSION_KEY, tokenizer.version)
+        return
+    if get_fts_mode(conn) == FTS_MODE_CONTENTLESS and not uses_contentless_delete(conn):
+        # Deletes re-derive old tokens, so the index must match the current tokenizer.
+        reindex_contentless(conn, tokenizer.tokenize, tokenizer.version)
+        return
+    logger.warning(
+        "index was built with tokenizer %s, current is %s; run `python -m app.main reindex` to re-tokenize",
+        get_meta(conn, FTS_TOKENIZER_VERSION_KEY) or "unknown",
+        tokenizer.version,
+    )
+
+
 def _ensure_columns(conn: sqlite3.Connection) -> None:
-    table_info = conn.execute("PRAGMA table_info(channel_messages)").fetchall()
+    table_info = conn.execute("PRAGMA table_xinfo(channel_messages)").fetchall()
     existing = {row[1] for row in table_info}
     if "source_link" not in existing:
         conn.execute("ALTER TABLE channel_messages ADD COLUMN source_link TEXT")
+    if "chat_term" not in existing:
+        conn.execute(
+            f"ALTER TABLE channel_messages ADD COLUMN chat_term TEXT GENERATED ALWAYS AS ({CHAT_TERM_SQL}) VIRTUAL"
+        )
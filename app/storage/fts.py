@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from collections.abc import Callable, Iterator
+
+from app.storage.meta import delete_meta, get_meta, set_meta
+
+
+logger = logging.getLogger(__name__)
+
+FTS_REBUILD_PENDING_KEY = "fts_rebuild_pending"
+FTS_MODE_KEY = "fts_mode"
+FTS_CONTENTLESS_DELETE_KEY = "fts_contentless_delete"
+# Tokenizer version the indexed tokens were derived with, in either mode.
+FTS_TOKENIZER_VERSION_KEY = "fts_tokenizer_version"
+
+# external: channel_messages.tokens is the FTS content and triggers keep the index in sync.
+# contentless: tokens are not stored; the repository writes the index itself and
+# re-derives a row's old tokens from its text when the row is edited or deleted.
+FTS_MODE_EXTERNAL = "external"
+FTS_MODE_CONTENTLESS = "contentless"
+FTS_MODES = (FTS_MODE_EXTERNAL, FTS_MODE_CONTENTLESS)
+
+_MIGRATION_BATCH_SIZE = 2000
+
+# Besides the tokens, every row indexes one chat term ("cn100123" for chat
+# -100123) in a second column, so a channel filter is intersected inside FTS5
+# as `chat_term : (...)` instead of joining every global match to check chat_id.
+# channel_messages.chat_term is a virtual generated column with the same value.
+CHAT_TERM_SQL = "'c' || replace(CAST(chat_id AS TEXT), '-', 'n')"
+# bm25 weights per column: the chat term must not influence relevance.
+FTS_RANK = "bm25(1.0, 0.0)"
+
+FTS_TRIGGERS: dict[str, str] = {
+    "channel_messages_ai": """
+        CREATE TRIGGER IF NOT EXISTS channel_messages_ai AFTER INSERT ON channel_messages BEGIN
+            INSERT INTO channel_messages_fts(rowid, tokens, chat_term)
+            VALUES (new.id, new.tokens, new.chat_term);
+        END
+    """,
+    "channel_messages_ad": """
+        CREATE TRIGGER IF NOT EXISTS channel_messages_ad AFTER DELETE ON channel_messages BEGIN
+            INSERT INTO channel_messages_fts(channel_messages_fts, rowid, tokens, chat_term)
+            VALUES('delete', old.id, old.tokens, old.chat_term);
+        END
+    """,
+    "channel_messages_au": """
+        CREATE TRIGGER IF NOT EXISTS channel_messages_au AFTER UPDATE OF tokens ON channel_messages
+        WHEN old.tokens IS NOT new.tokens BEGIN
+            INSERT INTO channel_messages_fts(channel_messages_fts, rowid, tokens, chat_term)
+            VALUES('delete', old.id, old.tokens, old.chat_term);
+            INSERT INTO channel_messages_fts(rowid, tokens, chat_term)
+            VALUES (new.id, new.tokens, new.chat_term);
+        END
+    """,
+}
+
+
+def chat_term(chat_id: int) -> str:
+    return "c" + str(chat_id).replace("-", "n")
+
+
+def index_contentless_row(conn: sqlite3.Connection, row_id: int, tokens: str, chat_id: int) -> None:
+    conn.execute(
+        "INSERT INTO channel_messages_fts(rowid, tokens, chat_term) VALUES (?, ?, ?)",
+        (row_id, tokens, chat_term(chat_id)),
+    )
+
+
+def unindex_contentless_row(conn: sqlite3.Connection, row_id: int, tokens: str, chat_id: int) -> None:
+    """The 'delete' command needs exactly the values that were indexed."""
+    conn.execute(
+        "INSERT INTO channel_messages_fts(channel_messages_fts, rowid, tokens, chat_term) VALUES('delete', ?, ?, ?)",
+        (row_id, tokens, chat_term(chat_id)),
+    )
+
+
+def create_fts_triggers(conn: sqlite3.Connection) -> None:
+    """(Re)install the sync triggers, replacing definitions left by older versions."""
+    for name, ddl in FTS_TRIGGERS.items():
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute(ddl)
+
+
+def get_fts_mode(conn: sqlite3.Connection) -> str:
+    return get_meta(conn, FTS_MODE_KEY) or FTS_MODE_EXTERNAL
+
+
+def uses_contentless_delete(conn: sqlite3.Connection) -> bool:
+    return get_meta(conn, FTS_CONTENTLESS_DELETE_KEY) == "1"
+
+
+def sqlite_supports_contentless_delete() -> bool:
+    return sqlite3.sqlite_version_info >= (3, 43, 0)
+
+
+def suspend_fts_triggers(conn: sqlite3.Connection) -> None:
+    """Drop the FTS sync triggers for a bulk load.
+
+    The pending-rebuild marker is committed in the same transaction, so an
+    interrupted load is repaired by the next ``resume_fts_triggers`` (which
+    ``init_db`` runs on startup). Contentless mode has no triggers to suspend.
+    """
+    if get_fts_mode(conn) == FTS_MODE_CONTENTLESS:
+        return
+    with conn:
+        set_meta(conn, FTS_REBUILD_PENDING_KEY, "1")
+        for name in FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def resume_fts_triggers(conn: sqlite3.Connection) -> None:
+    """Rebuild channel_messages_fts from its content table and reinstall the triggers."""
+    if get_fts_mode(conn) == FTS_MODE_CONTENTLESS:
+        return
+    with conn:
+        conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('rebuild')")
+        create_fts_triggers(conn)
+        delete_meta(conn, FTS_REBUILD_PENDING_KEY)
+
+
+def ensure_fts_consistent(conn: sqlite3.Connection) -> None:
+    if get_fts_mode(conn) == FTS_MODE_CONTENTLESS:
+        return
+    if get_meta(conn, FTS_REBUILD_PENDING_KEY) is not None:
+        logger.warning("previous bulk load did not finish; rebuilding channel_messages_fts")
+        resume_fts_triggers(conn)
+        return
+    create_fts_triggers(conn)
+
+
+def iter_message_texts(conn: sqlite3.Connection) -> Iterator[tuple[int, int, str]]:
+    """(id, chat_id, text) of every message in id order, read in batches."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, chat_id, text FROM channel_messages WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, _MIGRATION_BATCH_SIZE),
+        ).fetchall()
+        if not rows:
+            return
+        yield from ((int(row[0]), int(row[1]), row[2]) for row in rows)
+        last_id = int(rows[-1][0])
+
+
+def _create_fts_table(conn: sqlite3.Connection, mode: str, tokenize: Callable[[str], list[str]] | None) -> None:
+    """Drop and rebuild channel_messages_fts for ``mode``; runs inside the caller's transaction."""
+    for name in FTS_TRIGGERS:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute("DROP TABLE IF EXISTS channel_messages_fts")
+    if mode == FTS_MODE_CONTENTLESS:
+        if tokenize is None:
+            raise ValueError("building a contentless fts index needs a tokenizer")
+        contentless_delete = sqlite_supports_contentless_delete()
+        options = ", contentless_delete=1" if contentless_delete else ""
+        conn.execute(f"CREATE VIRTUAL TABLE channel_messages_fts USING fts5(tokens, chat_term, content=''{options})")
+        conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts, rank) VALUES('rank', ?)", (FTS_RANK,))
+        for row_id, chat_id, text in iter_message_texts(conn):
+            index_contentless_row(conn, row_id, " ".join(tokenize(text)), chat_id)
+        set_meta(conn, FTS_CONTENTLESS_DELETE_KEY, "1" if contentless_delete else "0")
+    else:
+        conn.execute(
+            "CREATE VIRTUAL TABLE channel_messages_fts USING fts5("
+            "tokens, chat_term, content='channel_messages', content_rowid='id')"
+        )
+        conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts, rank) VALUES('rank', ?)", (FTS_RANK,))
+        conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('rebuild')")
+        create_fts_triggers(conn)
+        delete_meta(conn, FTS_CONTENTLESS_DELETE_KEY)
+
+
+def ensure_fts_table(conn: sqlite3.Connection, tokenize: Callable[[str], list[str]] | None) -> None:
+    """Create channel_messages_fts, or rebuild one from before the chat_term column."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(channel_messages_fts)").fetchall()}
+    if "chat_term" in columns:
+        return
+    if columns:
+        logger.info("rebuilding channel_messages_fts with the chat_term filter column")
+    with conn:
+        # DML first so the following DDL runs inside the same implicit transaction.
+        set_meta(conn, FTS_MODE_KEY, get_fts_mode(conn))
+        _create_fts_table(conn, get_fts_mode(conn), tokenize)
+
+
+def migrate_fts_mode(
+    conn: sqlite3.Connection,
+    mode: str,
+    tokenize: Callable[[str], list[str]],
+    tokenizer_version: str,
+) -> None:
+    """Switch channel_messages_fts between external-content and contentless storage.
+
+    Runs as one transaction. The new index is built from tokens re-derived from
+    ``text``, which is exactly what later edits and deletes will re-derive, so
+    the contentless 'delete' command always matches what was indexed.
+    """
+    if mode not in FTS_MODES:
+        raise ValueError(f"unknown fts mode: {mode}")
+    if get_fts_mode(conn) == mode:
+        return
+    logger.info("migrating channel_messages_fts to %s mode", mode)
+    with conn:
+        # DML first so the following DDL runs inside the same implicit transaction.
+        set_meta(conn, FTS_MODE_KEY, mode)
+        if mode == FTS_MODE_EXTERNAL:
+            for name in FTS_TRIGGERS:
+                conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+            for row_id, _, text in iter_message_texts(conn):
+                conn.execute(
+                    "UPDATE channel_messages SET tokens = ? WHERE id = ?",
+                    (" ".join(tokenize(text)), row_id),
+                )
+        _create_fts_table(conn, mode, tokenize)
+        if mode == FTS_MODE_CONTENTLESS:
+            conn.execute("UPDATE channel_messages SET tokens = '' WHERE tokens != ''")
+        set_meta(conn, FTS_TOKENIZER_VERSION_KEY, tokenizer_version)
+
+
+def reindex_contentless(
+    conn: sqlite3.Connection,
+    tokenize: Callable[[str], list[str]],
+    tokenizer_version: str,
+) -> None:
+    """Re-derive every contentless index entry, e.g. after a tokenizer change."""
+    logger.info("reindexing contentless channel_messages_fts for tokenizer %s", tokenizer_version)
+    with conn:
+        set_meta(conn, FTS_TOKENIZER_VERSION_KEY, tokenizer_version)
+        conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('delete-all')")
+        for row_id, chat_id, text in iter_message_texts(conn):
+            index_contentless_row(conn, row_id, " ".join(tokenize(text)), chat_id)
+
+
+def reindex_external_batch(
+    conn: sqlite3.Connection,
+    tokenize: Callable[[str], list[str]],
+    after_id: int,
+    batch_size: int,
+) -> tuple[int, int]:
+    """Re-derive ``tokens`` for one id batch; the sync trigger re-indexes changed rows.
+
+    Returns (last id seen, rows changed); a last id of ``after_id`` means done.
+    """
+    rows = conn.execute(
+        "SELECT id, text, tokens FROM channel_messages WHERE id > ? ORDER BY id LIMIT ?",
+        (after_id, batch_size),
+    ).fetchall()
+    changed = 0
+    for row in rows:
+        tokens = " ".join(tokenize(row[1]))
+        if tokens != row[2]:
+            conn.execute("UPDATE channel_messages SET tokens = ? WHERE id = ?", (tokens, row[0]))
+            changed += 1
+    return (int(rows[-1][0]) if rows else after_id), changed
+
+
+def fts_index_bytes(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT COALESCE(SUM(LENGTH(block)), 0) FROM channel_messages_fts_data").fetchone()
+    return int(row[0])
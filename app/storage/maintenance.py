@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+
+# Dynamic config keys (app_config) for FTS upkeep, with their defaults.
+FTS_MAINTENANCE_DEFAULTS: dict[str, int] = {
+    # FTS5 options, see https://sqlite.org/fts5.html#fts5_options
+    "fts_automerge": 4,
+    "fts_crisismerge": 16,
+    "fts_usermerge": 4,
+    # Pages merged per 'merge' step and the wall-clock budget of one slice.
+    "fts_merge_pages": 64,
+    "fts_merge_budget_ms": 200,
+    # Only merge when no update arrived for this long.
+    "fts_maintenance_idle_seconds": 10,
+    "fts_maintenance_interval_seconds": 300,
+}
+
+FTS_OPTION_KEYS = ("fts_automerge", "fts_crisismerge", "fts_usermerge")
+
+
+@dataclass(slots=True)
+class MergeSlice:
+    steps: int = 0
+    finished: bool = False
+    elapsed_ms: float = 0.0
+
+
+def configure_fts(conn: sqlite3.Connection, automerge: int, crisismerge: int, usermerge: int) -> None:
+    """Persist the merge options in channel_messages_fts' own config table."""
+    for option, value in (("automerge", automerge), ("crisismerge", crisismerge), ("usermerge", usermerge)):
+        conn.execute(
+            "INSERT INTO channel_messages_fts(channel_messages_fts, rank) VALUES (?, ?)",
+            (option, int(value)),
+        )
+
+
+def merge_step(conn: sqlite3.Connection, pages: int) -> bool:
+    """Run one incremental 'merge'; False once there was nothing left to merge.
+
+    FTS5 documents that a total_changes delta below 2 means the command was a no-op.
+    """
+    before = conn.total_changes
+    conn.execute(
+        "INSERT INTO channel_messages_fts(channel_messages_fts, rank) VALUES ('merge', ?)",
+        (int(pages),),
+    )
+    return conn.total_changes - before >= 2
+
+
+def optimize_fts(conn: sqlite3.Connection) -> None:
+    """Merge every segment into one b-tree; expensive, meant for admin use."""
+    conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES ('optimize')")
+
+
+def pragma_optimize(conn: sqlite3.Connection) -> None:
+    conn.execute("PRAGMA optimize")
+
+
+def run_merge_slice(step: Callable[[], bool], budget_ms: int) -> MergeSlice:
+    """Call ``step`` until it reports no more work or ``budget_ms`` runs out."""
+    started = time.perf_counter()
+    result = MergeSlice()
+    deadline = started + max(budget_ms, 0) / 1000
+    while True:
+        if not step():
+            result.finished = True
+            break
+        result.steps += 1
+        if time.perf_counter() >= deadline:
+            break
+    result.elapsed_ms = (time.perf_counter() - started) * 1000
+    return result
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+from app.storage.meta import get_meta, set_meta
+
+
+logger = logging.getLogger(__name__)
+
+RANDOM_INDEX_VERSION_KEY = "random_index_version"
+RANDOM_INDEX_VERSION = "1"
+
+# channel_message_slots numbers each channel's messages densely as 0..n-1, so a
+# uniform sample is "pick slot k" instead of ORDER BY RANDOM() over the table.
+# Deletes swap the channel's highest slot into the freed one to keep it dense.
+RANDOM_INDEX_TRIGGERS: dict[str, str] = {
+    "channel_message_slots_ai": """
+        CREATE TRIGGER IF NOT EXISTS channel_message_slots_ai AFTER INSERT ON channel_messages BEGIN
+            INSERT INTO channel_message_slots(chat_id, slot, message_row_id)
+            VALUES (
+                new.chat_id,
+                COALESCE((SELECT MAX(slot) + 1 FROM channel_message_slots WHERE chat_id = new.chat_id), 0),
+                new.id
+            );
+        END
+    """,
+    "channel_message_slots_ad": """
+        CREATE TRIGGER IF NOT EXISTS channel_message_slots_ad AFTER DELETE ON channel_messages BEGIN
+            UPDATE channel_message_slots SET slot = -1 - slot WHERE message_row_id = old.id;
+            UPDATE channel_message_slots
+            SET slot = (SELECT -1 - slot FROM channel_message_slots WHERE message_row_id = old.id)
+            WHERE chat_id = old.chat_id
+              AND slot = (SELECT MAX(slot) FROM channel_message_slots WHERE chat_id = old.chat_id)
+              AND slot > (SELECT -1 - slot FROM channel_message_slots WHERE message_row_id = old.id);
+            DELETE FROM channel_message_slots WHERE message_row_id = old.id;
+        END
+    """,
+}
+
+
+def rebuild_random_index(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute("DELETE FROM channel_message_slots")
+        conn.execute(
+            """
+            INSERT INTO channel_message_slots(chat_id, slot, message_row_id)
+            SELECT chat_id, ROW_NUMBER() OVER (PARTITION BY chat_id ORDER BY id) - 1, id
+            FROM channel_messages
+            """
+        )
+        for ddl in RANDOM_INDEX_TRIGGERS.values():
+            conn.execute(ddl)
+        set_meta(conn, RANDOM_INDEX_VERSION_KEY, RANDOM_INDEX_VERSION)
+
+
+def ensure_random_index(conn: sqlite3.Connection) -> None:
+    """Install the slot triggers, backfilling slots for rows written before they existed."""
+    if get_meta(conn, RANDOM_INDEX_VERSION_KEY) != RANDOM_INDEX_VERSION:
+        logger.info("building channel_message_slots random sampling index")
+        rebuild_random_index(conn)
+        return
+    for ddl in RANDOM_INDEX_TRIGGERS.values():
+        conn.execute(ddl)
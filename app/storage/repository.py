@@ -1,10 +1,43 @@
 from __future__ import annotations
 
+import bisect
+import itertools
+import random
 import sqlite3
+import threading
 import time
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from dataclasses import dataclass
 
 from app.normalize.channel_message import NormalizedMessage
+from app.search.ranking import SORT_HYBRID, SORT_TIME, HybridRanking
+from app.search.tokenizer import Tokenizer
+from app.storage.channel_directory import ChannelDirectory
+from app.storage.db import ReadConnectionPool
+from app.storage.fts import (
+    FTS_MODE_CONTENTLESS,
+    FTS_TOKENIZER_VERSION_KEY,
+    chat_term,
+    get_fts_mode,
+    index_contentless_row,
+    reindex_contentless,
+    reindex_external_batch,
+    resume_fts_triggers,
+    suspend_fts_triggers,
+    unindex_contentless_row,
+    uses_contentless_delete,
+)
+from app.storage.maintenance import (
+    MergeSlice,
+    configure_fts,
+    merge_step,
+    optimize_fts,
+    pragma_optimize,
+    run_merge_slice,
+)
+from app.storage.meta import set_meta
+from app.storage.rowid_order import TIME_ID_SHIFT, reorder_rowids, time_aligned_id_sql, uses_time_ids
 
 
 @dataclass(slots=True)
@@ -18,65 +51,449 @@ class SearchRow:
     timestamp: int
 
 
+@dataclass(slots=True)
+class SearchPage:
+    rows: list[SearchRow]
+    total: int
+    total_exact: bool = True
+
+
+@dataclass(slots=True)
+class ChannelStats:
+    chat_id: int
+    message_count: int
+    first_timestamp: int
+    last_timestamp: int
+
+
+# One channel, a comma-separated list of channels, or a sequence of them.
+ChannelFilter = str | int | Sequence[str | int] | None
+
+SEARCH_COLUMNS = "m.id, m.chat_id, m.message_id, m.channel_username, m.source_link, m.text, m.timestamp"
+
+BULK_LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "cache_size": "-262144",
+    "temp_store": "MEMORY",
+}
+
+UPSERT_MESSAGE_SQL = """
+    INSERT INTO channel_messages (
+        chat_id, message_id, channel_username, source_link, text, tokens,
+        timestamp, edited_timestamp, source, created_at, updated_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(chat_id, message_id) DO UPDATE SET
+        channel_username=excluded.channel_username,
+        source_link=COALESCE(excluded.source_link, channel_messages.source_link),
+        text=excluded.text,
+        tokens=excluded.tokens,
+        timestamp=excluded.timestamp,
+        edited_timestamp=excluded.edited_timestamp,
+        source=excluded.source,
+        updated_at=excluded.updated_at
+"""
+
+# Same upsert with an explicit time-aligned id for new rows (?7 is timestamp);
+# on conflict the existing id is kept.
+UPSERT_MESSAGE_TIME_ID_SQL = f"""
+    INSERT INTO channel_messages (
+        id, chat_id, message_id, channel_username, source_link, text, tokens,
+        timestamp, edited_timestamp, source, created_at, updated_at
+    ) VALUES ({time_aligned_id_sql("?7")}, ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10, ?11)
+    ON CONFLICT(chat_id, message_id) DO UPDATE SET
+        channel_username=excluded.channel_username,
+        source_link=COALESCE(excluded.source_link, channel_messages.source_link),
+        text=excluded.text,
+        tokens=excluded.tokens,
+        timestamp=excluded.timestamp,
+        edited_timestamp=excluded.edited_timestamp,
+        source=excluded.source,
+        updated_at=excluded.updated_at
+"""
+
+UPDATE_MESSAGE_METADATA_SQL = """
+    UPDATE channel_messages SET
+        channel_username=?,
+        source_link=COALESCE(?, source_link),
+        timestamp=?,
+        edited_timestamp=?,
+        source=?,
+        updated_at=?
+    WHERE id=?
+"""
+
+
+@dataclass(slots=True)
+class MessageWrite:
+    """A pending change to one channel message; ``message=None`` means delete."""
+
+    chat_id: int
+    message_id: int
+    message: NormalizedMessage | None = None
+    tokens: list[str] | None = None
+
+    @classmethod
+    def upsert(cls, message: NormalizedMessage, tokens: list[str]) -> MessageWrite:
+        return cls(chat_id=message.chat_id, message_id=message.message_id, message=message, tokens=tokens)
+
+    @classmethod
+    def delete(cls, chat_id: int, message_id: int) -> MessageWrite:
+        return cls(chat_id=chat_id, message_id=message_id)
+
+
 class MessageRepository:
-    def __init__(self, conn: sqlite3.Connection) -> None:
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        read_pool: ReadConnectionPool | None = None,
+        tokenizer: Tokenizer | None = None,
+    ) -> None:
         self.conn = conn
+        self.read_pool = read_pool
+        self.write_lock = threading.RLock()
+        # Only contentless FTS mode needs the tokenizer, to re-derive old tokens.
+        self.tokenizer = tokenizer
+        # Write generations for search result caches: ``_generation`` moves on
+        # every committed message write, ``_channel_generations`` per channel
+        # and ``_epoch`` on changes that can affect any result (reindexing,
+        # renumbering, whitelist edits).
+        self._generation_lock = threading.Lock()
+        self._generation = 0
+        self._channel_generations: dict[int, int] = {}
+        self._epoch = 0
+        # Aliases and whitelist, so resolving and permission checks skip SQLite.
+        self.channels = ChannelDirectory.load(conn)
+        self.refresh_fts_mode()
+
+    def refresh_fts_mode(self) -> None:
+        """Re-read the FTS storage and id modes; call after init_db or reorder_ids switch them."""
+        self.contentless = get_fts_mode(self.conn) == FTS_MODE_CONTENTLESS
+        self.contentless_delete = self.contentless and uses_contentless_delete(self.conn)
+        # With time-aligned ids, rowid order is newest-first order.
+        self.time_ids = uses_time_ids(self.conn)
+        self.upsert_sql = UPSERT_MESSAGE_TIME_ID_SQL if self.time_ids else UPSERT_MESSAGE_SQL
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Yield a connection for reads; pooled read-only when a pool is configured."""
+        if self.read_pool is None:
+            yield self.conn
+            return
+        with self.read_pool.connection() as conn:
+            yield conn
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Yield the single writer connection inside a serialized transaction."""
+        with self.write_lock, self.conn:
+            yield self.conn
+
+    def search_generation(self, chat_ids: list[int] | None) -> tuple[int, ...]:
+        """Token that changes whenever results for these channels (None: all) may have.
+
+        Snapshot it before running a search; a cached result is current while
+        the token still matches. Writes bump it only after their commit.
+        """
+        with self._generation_lock:
+            if chat_ids is None:
+                return (self._epoch, self._generation)
+            return (self._epoch, *(self._channel_generations.get(chat_id, 0) for chat_id in chat_ids))
+
+    def bump_generation(self, chat_ids: Iterable[int] | None = None) -> None:
+        """Invalidate cached searches over ``chat_ids``, or over everything when None."""
+        with self._generation_lock:
+            if chat_ids is None:
+                self._epoch += 1
+                return
+            self._generation += 1
+            for chat_id in chat_ids:
+                self._channel_generations[chat_id] = self._channel_generations.get(chat_id, 0) + 1
 
     def upsert_message(self, msg: NormalizedMessage, tokens: list[str]) -> int:
+        with self.writer() as conn:
+            row_id, _ = self._upsert_in_tx(conn, msg, tokens, int(time.time()))
+            aliases = self._upsert_aliases_in_tx(conn, {msg.chat_id: msg.channel_username})
+        self.channels.set_aliases(aliases)
+        self.bump_generation([msg.chat_id])
+        return row_id
+
+    def delete_message(self, chat_id: int, message_id: int) -> bool:
+        with self.writer() as conn:
+            deleted = self._delete_in_tx(conn, chat_id, message_id)
+        if deleted:
+            self.bump_generation([chat_id])
+        return deleted
+
+    def apply_message_writes(self, writes: list[MessageWrite]) -> list[str]:
+        """Apply a batch of upserts/deletes in one transaction, in order.
+
+        Returns one status per write: "indexed", "unchanged" (text and tokens
+        already stored, only metadata updated), "deindexed" or "deindex_not_found".
+        """
+        if not writes:
+            return []
         now = int(time.time())
-        token_text = " ".join(tokens)
-        with self.conn:
-            self.conn.execute(
-                """
-                INSERT INTO channel_messages (
-                    chat_id, message_id, channel_username, source_link, text, tokens,
-                    timestamp, edited_timestamp, source, created_at, updated_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(chat_id, message_id) DO UPDATE SET
-                    channel_username=excluded.channel_username,
-                    source_link=COALESCE(excluded.source_link, channel_messages.source_link),
-                    text=excluded.text,
-                    tokens=excluded.tokens,
-                    timestamp=excluded.timestamp,
-                    edited_timestamp=excluded.edited_timestamp,
-                    source=excluded.source,
-                    updated_at=excluded.updated_at
-                """,
-                (
-                    msg.chat_id,
-                    msg.message_id,
-                    msg.channel_username,
-                    msg.source_link,
-                    msg.text,
-                    token_text,
-                    msg.timestamp,
-                    msg.edited_timestamp,
-                    msg.source,
-                    now,
-                    now,
-                ),
-            )
-            if msg.channel_username:
-                self.conn.execute(
-                    """
-                    INSERT INTO channel_alias(chat_id, username) VALUES (?, ?)
-                    ON CONFLICT(chat_id) DO UPDATE SET username=excluded.username
-                    """,
-                    (msg.chat_id, msg.channel_username.lstrip("@")),
+        statuses: list[str] = []
+        aliases: dict[int, str | None] = {}
+        with self.writer() as conn:
+            for write in writes:
+                if write.message is None:
+                    deleted = self._delete_in_tx(conn, write.chat_id, write.message_id)
+                    statuses.append("deindexed" if deleted else "deindex_not_found")
+                    continue
+                _, changed = self._upsert_in_tx(conn, write.message, write.tokens or [], now)
+                if write.message.channel_username:
+                    aliases[write.chat_id] = write.message.channel_username
+                statuses.append("indexed" if changed else "unchanged")
+            aliases = self._upsert_aliases_in_tx(conn, aliases)
+        self.channels.set_aliases(aliases)
+        self.bump_generation({write.chat_id for write in writes})
+        return statuses
+
+    @contextmanager
+    def bulk_load(self) -> Iterator[None]:
+        """Hold the writer for a bulk import with FTS maintenance deferred.
+
+        The FTS triggers are dropped for the duration and channel_messages_fts is
+        rebuilt once on exit, including on KeyboardInterrupt. If the process is
+        killed outright, the committed rebuild marker makes the next init_db
+        finish the job, so the index never stays out of sync. In contentless
+        mode there is nothing to rebuild from, so rows are indexed as written.
+        """
+        with self.write_lock:
+            previous = {
+                name: self.conn.execute(f"PRAGMA {name}").fetchone()[0] for name in BULK_LOAD_PRAGMAS
+            }
+            for name, value in BULK_LOAD_PRAGMAS.items():
+                self.conn.execute(f"PRAGMA {name}={value}")
+            suspend_fts_triggers(self.conn)
+            try:
+                yield
+            finally:
+                resume_fts_triggers(self.conn)
+                for name, value in previous.items():
+                    self.conn.execute(f"PRAGMA {name}={value}")
+                self.bump_generation()
+
+    def bulk_upsert_messages(self, items: list[tuple[NormalizedMessage, list[str]]]) -> None:
+        """Upsert a batch with executemany in one transaction (used inside bulk_load)."""
+        if not items:
+            return
+        now = int(time.time())
+        aliases: dict[int, str | None] = {
+            msg.chat_id: msg.channel_username for msg, _ in items if msg.channel_username
+        }
+        with self.writer() as conn:
+            if self.contentless:
+                # The index is written per row here, so executemany cannot cover it.
+                for msg, tokens in items:
+                    self._upsert_in_tx(conn, msg, tokens, now)
+            else:
+                # Time-aligned ids encode the timestamp, so re-dated messages go
+                # through _upsert_in_tx, which re-inserts them under a new id.
+                moved = self._moved_message_keys(conn, items) if self.time_ids else set()
+                conn.executemany(
+                    self.upsert_sql,
+                    [
+                        (
+                            msg.chat_id,
+                            msg.message_id,
+                            msg.channel_username,
+                            msg.source_link,
+                            msg.text,
+                            " ".join(tokens),
+                            msg.timestamp,
+                            msg.edited_timestamp,
+                            msg.source,
+                            now,
+                            now,
+                        )
+                        for msg, tokens in items
+                        if (msg.chat_id, msg.message_id) not in moved
+                    ],
                 )
-            row = self.conn.execute(
-                "SELECT id FROM channel_messages WHERE chat_id=? AND message_id=?",
-                (msg.chat_id, msg.message_id),
-            ).fetchone()
-            return int(row["id"])
+                for msg, tokens in items:
+                    if (msg.chat_id, msg.message_id) in moved:
+                        self._upsert_in_tx(conn, msg, tokens, now)
+            aliases = self._upsert_aliases_in_tx(conn, aliases)
+        self.channels.set_aliases(aliases)
+        self.bump_generation({msg.chat_id for msg, _ in items})
 
-    def delete_message(self, chat_id: int, message_id: int) -> bool:
-        with self.conn:
-            cursor = self.conn.execute(
-                "DELETE FROM channel_messages WHERE chat_id=? AND message_id=?",
+    def _moved_message_keys(
+        self, conn: sqlite3.Connection, items: list[tuple[NormalizedMessage, list[str]]]
+    ) -> set[tuple[int, int]]:
+        """(chat_id, message_id) of stored messages whose timestamp differs from ``items``."""
+        moved: set[tuple[int, int]] = set()
+        for start in range(0, len(items), 300):
+            chunk = items[start : start + 300]
+            values = ", ".join("(?, ?, ?)" for _ in chunk)
+            params = [value for msg, _ in chunk for value in (msg.chat_id, msg.message_id, msg.timestamp)]
+            rows = conn.execute(
+                f"""
+                WITH incoming(chat_id, message_id, timestamp) AS (VALUES {values})
+                SELECT m.chat_id, m.message_id FROM incoming i
+                JOIN channel_messages m ON m.chat_id = i.chat_id AND m.message_id = i.message_id
+                WHERE m.timestamp != i.timestamp
+                """,
+                params,
+            ).fetchall()
+            moved.update((int(row[0]), int(row[1])) for row in rows)
+        return moved
+
+    def reindex_tokens(self, batch_size: int = 2000) -> int:
+        """Re-tokenize every stored message with the current tokenizer.
+
+        External mode rewrites ``tokens`` in short id-range transactions and lets
+        the sync trigger re-index only rows whose tokens changed; contentless
+        mode re-derives the whole index in one transaction. Returns the number of
+        rows whose tokens changed (every row in contentless mode).
+        """
+        if self.tokenizer is None:
+            raise RuntimeError("reindex needs a tokenizer")
+        if self.contentless:
+            with self.write_lock:
+                reindex_contentless(self.conn, self.tokenizer.tokenize, self.tokenizer.version)
+            self.bump_generation()
+            return self.get_all_messages_count()
+        last_id, changed = 0, 0
+        while True:
+            with self.writer() as conn:
+                next_id, batch_changed = reindex_external_batch(conn, self.tokenizer.tokenize, last_id, batch_size)
+            changed += batch_changed
+            if next_id == last_id:
+                break
+            last_id = next_id
+        with self.writer() as conn:
+            set_meta(conn, FTS_TOKENIZER_VERSION_KEY, self.tokenizer.version)
+        self.bump_generation()
+        return changed
+
+    def reorder_ids(self) -> int:
+        """Renumber all messages to time-aligned ids and switch inserts to them."""
+        if self.contentless and self.tokenizer is None:
+            raise RuntimeError("contentless fts mode needs a tokenizer to rebuild the index")
+        tokenize = self.tokenizer.tokenize if self.tokenizer is not None else str.split
+        with self.write_lock:
+            moved = reorder_rowids(self.conn, tokenize)
+            self.refresh_fts_mode()
+        self.bump_generation()
+        return moved
+
+    def fts_merge_slice(self, pages: int, budget_ms: int) -> MergeSlice:
+        """Incrementally merge FTS segments for about ``budget_ms``.
+
+        Each merge step is its own short write transaction, so live ingest can
+        interleave with a slice instead of waiting for all of it.
+        """
+
+        def _step() -> bool:
+            with self.writer() as conn:
+                return merge_step(conn, pages)
+
+        return run_merge_slice(_step, budget_ms)
+
+    def fts_configure(self, automerge: int, crisismerge: int, usermerge: int) -> None:
+        with self.writer() as conn:
+            configure_fts(conn, automerge, crisismerge, usermerge)
+
+    def fts_optimize(self) -> None:
+        with self.writer() as conn:
+            optimize_fts(conn)
+        self.pragma_optimize()
+
+    def pragma_optimize(self) -> None:
+        with self.write_lock:
+            pragma_optimize(self.conn)
+
+    def _upsert_in_tx(
+        self,
+        conn: sqlite3.Connection,
+        msg: NormalizedMessage,
+        tokens: list[str],
+        now: int,
+    ) -> tuple[int, bool]:
+        """Insert or update one message; returns (row id, whether the indexed text changed).
+
+        When the stored text and tokens already match, only metadata columns are
+        updated, so neither the FTS triggers nor the contentless index are touched.
+        """
+        token_text = " ".join(tokens)
+        previous = conn.execute(
+            "SELECT id, text, tokens, timestamp FROM channel_messages WHERE chat_id=? AND message_id=?",
+            (msg.chat_id, msg.message_id),
+        ).fetchone()
+        if previous is not None and self.time_ids and int(previous["timestamp"]) != msg.timestamp:
+            # The id encodes the timestamp, so a moved message is re-inserted under a new id.
+            self._delete_in_tx(conn, msg.chat_id, msg.message_id)
+            previous = None
+        if previous is not None and previous["text"] == msg.text and (
+            self.contentless or previous["tokens"] == token_text
+        ):
+            conn.execute(UPDATE_MESSAGE_METADATA_SQL, (*_metadata_params(msg, now), previous["id"]))
+            return int(previous["id"]), False
+        row = conn.execute(
+            self.upsert_sql + " RETURNING id",
+            (
+                msg.chat_id,
+                msg.message_id,
+                msg.channel_username,
+                msg.source_link,
+                msg.text,
+                "" if self.contentless else token_text,
+                msg.timestamp,
+                msg.edited_timestamp,
+                msg.source,
+                now,
+                now,
+            ),
+        ).fetchone()
+        row_id = int(row["id"])
+        if self.contentless:
+            if previous is not None:
+                self._fts_delete_in_tx(conn, row_id, previous["text"], msg.chat_id)
+            index_contentless_row(conn, row_id, token_text, msg.chat_id)
+        return row_id, True
+
+    def _delete_in_tx(self, conn: sqlite3.Connection, chat_id: int, message_id: int) -> bool:
+        if self.contentless:
+            previous = conn.execute(
+                "SELECT id, text FROM channel_messages WHERE chat_id=? AND message_id=?",
                 (chat_id, message_id),
+            ).fetchone()
+            if previous is None:
+                return False
+            self._fts_delete_in_tx(conn, int(previous["id"]), previous["text"], chat_id)
+        cursor = conn.execute(
+            "DELETE FROM channel_messages WHERE chat_id=? AND message_id=?",
+            (chat_id, message_id),
+        )
+        return cursor.rowcount > 0
+
+    def _fts_delete_in_tx(self, conn: sqlite3.Connection, row_id: int, text: str, chat_id: int) -> None:
+        """Remove a row from a contentless index; without contentless_delete this
+        needs the exact tokens that were indexed, re-derived from ``text``."""
+        if self.contentless_delete:
+            conn.execute("DELETE FROM channel_messages_fts WHERE rowid = ?", (row_id,))
+            return
+        if self.tokenizer is None:
+            raise RuntimeError("contentless fts mode needs a tokenizer to remove index entries")
+        unindex_contentless_row(conn, row_id, " ".join(self.tokenizer.tokenize(text)), chat_id)
+
+    def _upsert_aliases_in_tx(self, conn: sqlite3.Connection, aliases: dict[int, str | None]) -> dict[int, str]:
+        """Upsert aliases; returns the stored usernames for the channel directory."""
+        written: dict[int, str] = {}
+        for chat_id, username in aliases.items():
+            if not username:
+                continue
+            written[chat_id] = username.lstrip("@")
+            conn.execute(
+                """
+                INSERT INTO channel_alias(chat_id, username) VALUES (?, ?)
+                ON CONFLICT(chat_id) DO UPDATE SET username=excluded.username
+                """,
+                (chat_id, written[chat_id]),
             )
-            return cursor.rowcount > 0
+        return written
 
     def resolve_channel(self, channel: str | int | None) -> int | None:
         if channel is None:
@@ -90,108 +507,382 @@ class MessageRepository:
             stripped = stripped[1:]
         if stripped.lstrip("-").isdigit():
             return int(stripped)
-        row = self.conn.execute(
-            "SELECT chat_id FROM channel_alias WHERE username=?",
-            (stripped,),
-        ).fetchone()
-        return int(row["chat_id"]) if row else None
+        return self.channels.resolve(stripped)
+
+    def reload_channel_directory(self) -> None:
+        """Re-read aliases and the whitelist, e.g. after another process wrote them."""
+        with self.reader() as conn:
+            self.channels.reload(conn)
+
+    def resolve_channels(self, channel: ChannelFilter) -> list[int] | None:
+        """Chat ids for a channel filter; None means unfiltered.
+
+        ``channel`` is one channel (as for ``resolve_channel``), a
+        comma-separated string of them, or a sequence. Unknown channels are
+        dropped, so an empty list means nothing can match.
+        """
+        if channel is None:
+            return None
+        if isinstance(channel, str):
+            items: Sequence[str | int] = [item for item in channel.split(",") if item.strip()]
+        elif isinstance(channel, int):
+            items = [channel]
+        else:
+            items = channel
+        chat_ids: list[int] = []
+        for item in items:
+            chat_id = self.resolve_channel(item)
+            if chat_id is not None and chat_id not in chat_ids:
+                chat_ids.append(chat_id)
+        return chat_ids
 
     def search(
         self,
         fts_query: str,
         limit: int,
         offset: int = 0,
-        channel: str | int | None = None,
+        channel: ChannelFilter = None,
+        after: tuple[int, int] | None = None,
+        sort: str = SORT_TIME,
+        ranking: HybridRanking | None = None,
+        since: int | None = None,
+        until: int | None = None,
     ) -> list[SearchRow]:
-        chat_id = self.resolve_channel(channel)
-        if channel is not None and chat_id is None:
+        """Newest-first matches, or best-first for ``sort`` relevance / hybrid.
+
+        ``after`` is a (timestamp, id) seek key from the last row of the previous
+        page; with it the page starts right after that row and ``offset`` is
+        ignored, so deep pages cost the same as the first one. It only applies
+        to the time order. ``since`` / ``until`` keep matches whose timestamp
+        lies in that inclusive range.
+        """
+        if sort != SORT_TIME and after is not None:
+            raise ValueError("cursor requires sort=time")
+        chat_ids = self.resolve_channels(channel)
+        if chat_ids == []:
             return []
-        sql = """
-            SELECT m.id, m.chat_id, m.message_id, m.channel_username, m.source_link, m.text, m.timestamp
-            FROM channel_messages_fts f
-            JOIN channel_messages m ON m.id = f.rowid
-            WHERE channel_messages_fts MATCH ?
+        with self.reader() as conn:
+            match = self._match(conn, fts_query, chat_ids, since, until)
+            if match is None:
+                return []
+            match_sql, params = match
+            if sort != SORT_TIME:
+                return self._ranked_rows(conn, match_sql, params, limit, offset, sort, ranking)
+            sql = f"SELECT {SEARCH_COLUMNS} {match_sql}"
+            seek_sql, order_sql = self._time_order("m.timestamp", "f.rowid")
+            if after is not None:
+                sql += f" AND {seek_sql}"
+                params.extend(self._seek_params(after))
+                offset = 0
+            sql += f" ORDER BY {order_sql} LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+            rows = conn.execute(sql, tuple(params)).fetchall()
+        return [_search_row(row) for row in rows]
+
+    def _match(
+        self,
+        conn: sqlite3.Connection,
+        fts_query: str,
+        chat_ids: list[int] | None,
+        since: int | None,
+        until: int | None,
+    ) -> tuple[str, list[object]] | None:
+        """``_match_clause`` narrowed to ``since <= timestamp <= until``.
+
+        With time-aligned ids the window is exactly a rowid range, which FTS5
+        applies while walking the postings. Otherwise the id range of the
+        window is read from ``idx_channel_messages_time`` to prune the FTS scan
+        and the timestamp check only runs on rows inside it. Returns None when
+        no message can fall in the window.
         """
-        params: list[object] = [fts_query]
-        if chat_id is not None:
-            sql += " AND m.chat_id = ?"
-            params.append(chat_id)
-        sql += " ORDER BY m.timestamp DESC LIMIT ? OFFSET ?"
+        match_sql, params = _match_clause(fts_query, chat_ids)
+        if since is None and until is None:
+            return match_sql, params
+        if since is not None and until is not None and since > until:
+            return None
+        if self.time_ids:
+            if until is not None and until < 0:
+                return None
+            match_sql += " AND f.rowid >= ?"
+            params.append(max(since, 0) << TIME_ID_SHIFT if since is not None else 0)
+            if until is not None:
+                match_sql += " AND f.rowid <= ?"
+                params.append(((until + 1) << TIME_ID_SHIFT) - 1)
+            return match_sql, params
+        ts_low = since if since is not None else -(1 << 62)
+        ts_high = until if until is not None else 1 << 62
+        row = conn.execute(
+            """
+            SELECT MIN(id) AS low, MAX(id) AS high
+            FROM channel_messages INDEXED BY idx_channel_messages_time
+            WHERE timestamp BETWEEN ? AND ?
+            """,
+            (ts_low, ts_high),
+        ).fetchone()
+        if row is None or row["low"] is None:
+            return None
+        match_sql += " AND f.rowid BETWEEN ? AND ? AND m.timestamp BETWEEN ? AND ?"
+        params.extend([int(row["low"]), int(row["high"]), ts_low, ts_high])
+        return match_sql, params
+
+    def _time_order(self, ts_col: str, id_col: str) -> tuple[str, str]:
+        """Seek predicate and ORDER BY for newest-first pages.
+
+        With time-aligned ids the id alone orders by time; ordering by the FTS
+        rowid lets SQLite read the index newest-first and stop after the page
+        instead of sorting every match.
+        """
+        if self.time_ids:
+            return f"{id_col} < ?", f"{id_col} DESC"
+        return f"({ts_col}, {id_col}) < (?, ?)", f"{ts_col} DESC, {id_col} DESC"
+
+    def _seek_params(self, after: tuple[int, int]) -> list[object]:
+        return [after[1]] if self.time_ids else list(after)
+
+    def search_page(
+        self,
+        fts_query: str,
+        limit: int,
+        offset: int = 0,
+        channel: ChannelFilter = None,
+        after: tuple[int, int] | None = None,
+        count_limit: int | None = None,
+        sort: str = SORT_TIME,
+        ranking: HybridRanking | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> SearchPage:
+        """One page of ``search`` plus the total number of matches in one statement.
+
+        Without ``count_limit`` the total is exact, taken from a window count over
+        the match set that also feeds the page. With ``count_limit`` the total is
+        counted only up to that many matches and ``total_exact`` is False when
+        the cap was hit, which keeps common terms from scanning every posting.
+        Ranked sorts take the page from a top-k query and count separately.
+        """
+        if sort != SORT_TIME and after is not None:
+            raise ValueError("cursor requires sort=time")
+        empty = SearchPage(rows=[], total=0, total_exact=True)
+        chat_ids = self.resolve_channels(channel)
+        if chat_ids == []:
+            return empty
+        with self.reader() as conn:
+            match = self._match(conn, fts_query, chat_ids, since, until)
+        if match is None:
+            return empty
+        match_sql, match_params = match
+        if sort != SORT_TIME:
+            with self.reader() as conn:
+                rows = self._ranked_rows(conn, match_sql, list(match_params), limit, offset, sort, ranking)
+                total = self._count_matches(conn, match_sql, match_params, count_limit)
+            if count_limit is not None and total > count_limit:
+                return SearchPage(rows=rows, total=count_limit, total_exact=False)
+            return SearchPage(rows=rows, total=total, total_exact=True)
+        params: list[object] = []
+        if count_limit is None:
+            sql = f"""
+                SELECT {SEARCH_COLUMNS}, h.total AS total
+                FROM (
+                    SELECT m.id AS id, m.timestamp AS ts, COUNT(*) OVER () AS total {match_sql}
+                ) h
+                JOIN channel_messages m ON m.id = h.id
+            """
+            params.extend(match_params)
+            seek_sql, order_sql = self._time_order("h.ts", "h.id")
+            if after is not None:
+                sql += f" WHERE {seek_sql}"
+                params.extend(self._seek_params(after))
+                offset = 0
+            sql += f" ORDER BY {order_sql} LIMIT ? OFFSET ?"
+        else:
+            sql = f"""
+                SELECT {SEARCH_COLUMNS}, (SELECT COUNT(*) FROM (SELECT 1 {match_sql} LIMIT ?)) AS total
+                {match_sql}
+            """
+            params.extend([*match_params, count_limit + 1, *match_params])
+            seek_sql, order_sql = self._time_order("m.timestamp", "f.rowid")
+            if after is not None:
+                sql += f" AND {seek_sql}"
+                params.extend(self._seek_params(after))
+                offset = 0
+            sql += f" ORDER BY {order_sql} LIMIT ? OFFSET ?"
         params.extend([limit, offset])
-        rows = self.conn.execute(sql, tuple(params)).fetchall()
-        return [
-            SearchRow(
-                id=int(row["id"]),
-                chat_id=int(row["chat_id"]),
-                message_id=int(row["message_id"]),
-                channel_username=row["channel_username"],
-                source_link=row["source_link"],
-                text=row["text"],
-                timestamp=int(row["timestamp"]),
-            )
-            for row in rows
-        ]
+        with self.reader() as conn:
+            rows = conn.execute(sql, tuple(params)).fetchall()
+            if rows:
+                total = int(rows[0]["total"])
+            else:
+                # Past the last page the statement yields no row to carry the total.
+                total = self._count_matches(conn, match_sql, match_params, count_limit)
+        if count_limit is not None and total > count_limit:
+            return SearchPage(rows=[_search_row(row) for row in rows], total=count_limit, total_exact=False)
+        return SearchPage(rows=[_search_row(row) for row in rows], total=total, total_exact=True)
 
-    def search_count(self, fts_query: str, channel: str | int | None = None) -> int:
-        chat_id = self.resolve_channel(channel)
-        if channel is not None and chat_id is None:
+    def search_count(
+        self,
+        fts_query: str,
+        channel: ChannelFilter = None,
+        count_limit: int | None = None,
+        since: int | None = None,
+        until: int | None = None,
+    ) -> int:
+        chat_ids = self.resolve_channels(channel)
+        if chat_ids == []:
             return 0
-        sql = """
-            SELECT COUNT(1) AS c
-            FROM channel_messages_fts f
-            JOIN channel_messages m ON m.id = f.rowid
-            WHERE channel_messages_fts MATCH ?
+        with self.reader() as conn:
+            match = self._match(conn, fts_query, chat_ids, since, until)
+            if match is None:
+                return 0
+            match_sql, params = match
+            total = self._count_matches(conn, match_sql, params, count_limit)
+        return min(total, count_limit) if count_limit is not None else total
+
+    @staticmethod
+    def _ranked_rows(
+        conn: sqlite3.Connection,
+        match_sql: str,
+        params: list[object],
+        limit: int,
+        offset: int,
+        sort: str,
+        ranking: HybridRanking | None,
+    ) -> list[SearchRow]:
+        """Top ``offset + limit`` matches by bm25, optionally blended with recency.
+
+        Only the ids of the best-ranked matches are pulled from the index, never
+        the whole match set. For hybrid order the recency blend is part of the
+        ORDER BY, so the top-k is found in the same single pass as relevance.
         """
-        params: list[object] = [fts_query]
-        if chat_id is not None:
-            sql += " AND m.chat_id = ?"
-            params.append(chat_id)
-        row = self.conn.execute(sql, tuple(params)).fetchone()
+        want = offset + limit
+        if want <= 0:
+            return []
+        if sort == SORT_HYBRID:
+            ranking = ranking or HybridRanking()
+            # Same arithmetic as HybridRanking.factor, evaluated per match.
+            order_sql = "f.rank * (1.0 + ? * (? / (? + MAX(? - m.timestamp, 0.0))))"
+            half_life = float(ranking.half_life_seconds)
+            order_params: list[object] = [float(ranking.recency_weight), half_life, half_life, int(time.time())]
+        else:
+            order_sql, order_params = "f.rank", []
+        sql = f"SELECT m.id AS id {match_sql} ORDER BY {order_sql}, m.id DESC LIMIT ? OFFSET ?"
+        ids = [int(row["id"]) for row in conn.execute(sql, (*params, *order_params, limit, offset)).fetchall()]
+        if not ids:
+            return []
+        placeholders = ",".join("?" for _ in ids)
+        rows = conn.execute(
+            f"SELECT {SEARCH_COLUMNS} FROM channel_messages m WHERE m.id IN ({placeholders})",
+            ids,
+        ).fetchall()
+        by_id = {int(row["id"]): _search_row(row) for row in rows}
+        return [by_id[row_id] for row_id in ids if row_id in by_id]
+
+    @staticmethod
+    def _count_matches(
+        conn: sqlite3.Connection,
+        match_sql: str,
+        params: list[object],
+        count_limit: int | None,
+    ) -> int:
+        if count_limit is None:
+            row = conn.execute(f"SELECT COUNT(1) AS c {match_sql}", tuple(params)).fetchone()
+        else:
+            row = conn.execute(
+                f"SELECT COUNT(1) AS c FROM (SELECT 1 {match_sql} LIMIT ?)",
+                (*params, count_limit + 1),
+            ).fetchone()
         return int(row["c"]) if row else 0
 
-    def random_messages(self, limit: int, channel: str | int | None = None) -> list[SearchRow]:
-        chat_id = self.resolve_channel(channel)
-        if channel is not None and chat_id is None:
-            return []
-        sql = """
-            SELECT m.id, m.chat_id, m.message_id, m.channel_username, m.source_link, m.text, m.timestamp
-            FROM channel_messages m
+    def random_messages(self, limit: int, channel: ChannelFilter = None) -> list[SearchRow]:
+        """Uniform sample without replacement via the per-channel slot directory.
+
+        Each pick is a primary-key lookup on channel_message_slots, so the cost
+        depends on ``limit`` and the number of channels, not on table size.
         """
+        chat_ids = self.resolve_channels(channel)
+        if chat_ids == []:
+            return []
+        with self.reader() as conn:
+            counts = self._slot_counts(conn, chat_ids)
+            total = sum(count for _, count in counts)
+            if total <= 0 or limit <= 0:
+                return []
+            picks: list[tuple[int, int]] = []
+            bounds = list(itertools.accumulate(count for _, count in counts))
+            for k in random.sample(range(total), min(limit, total)):
+                i = bisect.bisect_right(bounds, k)
+                picks.append((counts[i][0], k - (bounds[i] - counts[i][1])))
+            placeholders = ", ".join("(?, ?)" for _ in picks)
+            rows = conn.execute(
+                f"""
+                SELECT {SEARCH_COLUMNS}, s.chat_id AS slot_chat_id, s.slot AS slot
+                FROM channel_message_slots s
+                JOIN channel_messages m ON m.id = s.message_row_id
+                WHERE (s.chat_id, s.slot) IN (VALUES {placeholders})
+                """,
+                tuple(value for pick in picks for value in pick),
+            ).fetchall()
+        by_slot = {(int(row["slot_chat_id"]), int(row["slot"])): row for row in rows}
+        # A concurrent delete may have vacated a slot; return what is still there.
+        return [_search_row(by_slot[pick]) for pick in picks if pick in by_slot]
+
+    @staticmethod
+    def _slot_counts(conn: sqlite3.Connection, chat_ids: list[int] | None) -> list[tuple[int, int]]:
+        # channel_stats.message_count is maintained alongside the slot directory,
+        # so it is also the number of slots in each channel.
+        sql = "SELECT chat_id, message_count FROM channel_stats WHERE message_count > 0"
+        params: tuple[object, ...] = ()
+        if chat_ids is not None:
+            sql += f" AND chat_id IN ({','.join('?' for _ in chat_ids)})"
+            params = tuple(chat_ids)
+        rows = conn.execute(sql + " ORDER BY chat_id", params).fetchall()
+        return [(int(row["chat_id"]), int(row["message_count"])) for row in rows]
+
+    def random_count(self, channel: ChannelFilter = None) -> int:
+        chat_ids = self.resolve_channels(channel)
+        if chat_ids == []:
+            return 0
+        sql = "SELECT COALESCE(SUM(message_count), 0) AS c FROM channel_stats"
         params: list[object] = []
+        if chat_ids is not None:
+            sql += f" WHERE chat_id IN ({','.join('?' for _ in chat_ids)})"
+            params.extend(chat_ids)
+        with self.reader() as conn:
+            row = conn.execute(sql, tuple(params)).fetchone()
+        return int(row["c"]) if row else 0
+
+    def term_doc_counts(self, terms: list[str]) -> dict[str, int]:
+        """Number of indexed messages containing each exact term; absent terms map to 0."""
+        counts: dict[str, int] = {}
+        with self.reader() as conn:
+            for term in terms:
+                row = conn.execute(
+                    "SELECT doc FROM channel_messages_fts_vocab WHERE term = ?",
+                    (term,),
+                ).fetchone()
+                counts[term] = int(row["doc"]) if row else 0
+        return counts
+
+    def get_channel_stats(self, chat_id: int | None = None) -> list[ChannelStats]:
+        sql = "SELECT chat_id, message_count, first_timestamp, last_timestamp FROM channel_stats"
+        params: tuple[object, ...] = ()
         if chat_id is not None:
-            sql += " WHERE m.chat_id = ?"
-            params.append(chat_id)
-        sql += " ORDER BY RANDOM() LIMIT ?"
-        params.append(limit)
-        rows = self.conn.execute(sql, tuple(params)).fetchall()
+            sql += " WHERE chat_id = ?"
+            params = (chat_id,)
+        with self.reader() as conn:
+            rows = conn.execute(sql + " ORDER BY message_count DESC", params).fetchall()
         return [
-            SearchRow(
-                id=int(row["id"]),
+            ChannelStats(
                 chat_id=int(row["chat_id"]),
-                message_id=int(row["message_id"]),
-                channel_username=row["channel_username"],
-                source_link=row["source_link"],
-                text=row["text"],
-                timestamp=int(row["timestamp"]),
+                message_count=int(row["message_count"]),
+                first_timestamp=int(row["first_timestamp"]),
+                last_timestamp=int(row["last_timestamp"]),
             )
             for row in rows
         ]
 
-    def random_count(self, channel: str | int | None = None) -> int:
-        chat_id = self.resolve_channel(channel)
-        if channel is not None and chat_id is None:
-            return 0
-        sql = "SELECT COUNT(1) AS c FROM channel_messages"
-        params: list[object] = []
-        if chat_id is not None:
-            sql += " WHERE chat_id = ?"
-            params.append(chat_id)
-        row = self.conn.execute(sql, tuple(params)).fetchone()
-        return int(row["c"]) if row else 0
-
     def set_config(self, key: str, value: str, is_sensitive: bool) -> None:
-        with self.conn:
-            self.conn.execute(
+        with self.writer() as conn:
+            conn.execute(
                 """
                 INSERT INTO app_config(key, value, is_sensitive, updated_at)
                 VALUES (?, ?, ?, ?)
@@ -204,15 +895,17 @@ class MessageRepository:
             )
 
     def get_config(self, key: str) -> sqlite3.Row | None:
-        return self.conn.execute(
-            "SELECT key, value, is_sensitive, updated_at FROM app_config WHERE key=?",
-            (key,),
-        ).fetchone()
+        with self.reader() as conn:
+            return conn.execute(
+                "SELECT key, value, is_sensitive, updated_at FROM app_config WHERE key=?",
+                (key,),
+            ).fetchone()
 
     def list_config(self) -> list[sqlite3.Row]:
-        return self.conn.execute(
-            "SELECT key, value, is_sensitive, updated_at FROM app_config ORDER BY key ASC"
-        ).fetchall()
+        with self.reader() as conn:
+            return conn.execute(
+                "SELECT key, value, is_sensitive, updated_at FROM app_config ORDER BY key ASC"
+            ).fetchall()
 
     def insert_admin_audit(
         self,
@@ -222,8 +915,8 @@ class MessageRepository:
         masked_value: str | None = None,
         detail: str | None = None,
     ) -> None:
-        with self.conn:
-            self.conn.execute(
+        with self.writer() as conn:
+            conn.execute(
                 """
                 INSERT INTO admin_audit_log(admin_user_id, action, key, masked_value, detail, created_at)
                 VALUES (?, ?, ?, ?, ?, ?)
@@ -232,13 +925,15 @@ class MessageRepository:
             )
 
     def get_all_messages_count(self) -> int:
-        row = self.conn.execute("SELECT COUNT(1) AS c FROM channel_messages").fetchone()
+        with self.reader() as conn:
+            row = conn.execute("SELECT COALESCE(SUM(message_count), 0) AS c FROM channel_stats").fetchone()
         return int(row["c"])
+
     def add_allowed_channel(self, chat_id: int, channel_name: str, description: str = "") -> None:
         """Add a channel to the whitelist"""
         now = int(time.time())
-        with self.conn:
-            self.conn.execute(
+        with self.writer() as conn:
+            conn.execute(
                 """
                 INSERT INTO allowed_channels(chat_id, channel_name, enabled, description, created_at, updated_at)
                 VALUES (?, ?, 1, ?, ?, ?)
@@ -250,57 +945,61 @@ class MessageRepository:
                 """,
                 (chat_id, channel_name, description, now, now),
             )
+        self.channels.set_allowed(chat_id, True)
+        self.bump_generation()
 
     def remove_allowed_channel(self, chat_id: int) -> bool:
         """Remove a channel from the whitelist"""
-        with self.conn:
-            cursor = self.conn.execute(
+        with self.writer() as conn:
+            cursor = conn.execute(
                 "DELETE FROM allowed_channels WHERE chat_id=?",
                 (chat_id,),
             )
-            return cursor.rowcount > 0
+        if cursor.rowcount <= 0:
+            return False
+        self.channels.remove_allowed(chat_id)
+        self.bump_generation()
+        return True
 
     def disable_allowed_channel(self, chat_id: int) -> bool:
         """Disable a channel in the whitelist"""
         now = int(time.time())
-        with self.conn:
-            cursor = self.conn.execute(
+        with self.writer() as conn:
+            cursor = conn.execute(
                 "UPDATE allowed_channels SET enabled=0, updated_at=? WHERE chat_id=?",
                 (now, chat_id),
             )
-            return cursor.rowcount > 0
+        if cursor.rowcount <= 0:
+            return False
+        self.channels.set_allowed(chat_id, False)
+        self.bump_generation()
+        return True
 
     def enable_allowed_channel(self, chat_id: int) -> bool:
         """Enable a channel in the whitelist"""
         now = int(time.time())
-        with self.conn:
-            cursor = self.conn.execute(
+        with self.writer() as conn:
+            cursor = conn.execute(
                 "UPDATE allowed_channels SET enabled=1, updated_at=? WHERE chat_id=?",
                 (now, chat_id),
             )
-            return cursor.rowcount > 0
+        if cursor.rowcount <= 0:
+            return False
+        self.channels.set_allowed(chat_id, True)
+        self.bump_generation()
+        return True
 
     def is_channel_allowed(self, chat_id: int) -> bool:
         """Check if a channel is in the whitelist and enabled"""
         # If no whitelist exists (empty allowed_channels table), allow all channels by default
-        has_whitelist = self.conn.execute(
-            "SELECT 1 FROM allowed_channels LIMIT 1"
-        ).fetchone() is not None
-
-        if not has_whitelist:
-            return True
-
-        row = self.conn.execute(
-            "SELECT enabled FROM allowed_channels WHERE chat_id=?",
-            (chat_id,),
-        ).fetchone()
-        return bool(row and row["enabled"])
+        return self.channels.is_allowed(chat_id)
 
     def get_allowed_channels(self) -> list[dict]:
         """Get all allowed channels"""
-        rows = self.conn.execute(
-            "SELECT chat_id, channel_name, enabled, description, created_at, updated_at FROM allowed_channels ORDER BY channel_name ASC"
-        ).fetchall()
+        with self.reader() as conn:
+            rows = conn.execute(
+                "SELECT chat_id, channel_name, enabled, description, created_at, updated_at FROM allowed_channels ORDER BY channel_name ASC"
+            ).fetchall()
         return [
             {
                 "chat_id": int(row["chat_id"]),
@@ -311,4 +1010,38 @@ class MessageRepository:
                 "updated_at": int(row["updated_at"]),
             }
             for row in rows
-        ]
\ No newline at end of file
+        ]
+
+
+def _match_clause(fts_query: str, chat_ids: list[int] | None) -> tuple[str, list[object]]:
+    """FROM/WHERE for matches of ``fts_query`` in the tokens column.
+
+    A channel filter becomes a chat_term column filter in the same MATCH, so
+    FTS5 intersects it with the query terms rather than SQLite checking
+    ``m.chat_id`` on every global match.
+    """
+    match = f"{{tokens}} : ({fts_query})"
+    if chat_ids:
+        match += " AND chat_term : (" + " OR ".join(f'"{chat_term(chat_id)}"' for chat_id in chat_ids) + ")"
+    sql = """
+        FROM channel_messages_fts f
+        JOIN channel_messages m ON m.id = f.rowid
+        WHERE channel_messages_fts MATCH ?
+    """
+    return sql, [match]
+
+
+def _search_row(row: sqlite3.Row) -> SearchRow:
+    return SearchRow(
+        id=int(row["id"]),
+        chat_id=int(row["chat_id"]),
+        message_id=int(row["message_id"]),
+        channel_username=row["channel_username"],
+        source_link=row["source_link"],
+        text=row["text"],
+        timestamp=int(row["timestamp"]),
+    )
+
+
+def _metadata_params(msg: NormalizedMessage, now: int) -> tuple[object, ...]:
+    return (msg.channel_username, msg.source_link, msg.timestamp, msg.edited_timestamp, msg.source, now)
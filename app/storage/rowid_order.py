@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from collections.abc import Callable
+
+from app.storage.fts import FTS_MODE_CONTENTLESS, get_fts_mode, index_contentless_row, iter_message_texts
+from app.storage.meta import get_meta, set_meta
+
+
+logger = logging.getLogger(__name__)
+
+ROWID_ORDER_KEY = "rowid_order"
+ROWID_ORDER_TIME = "time"
+# Time-aligned ids are (timestamp << TIME_ID_SHIFT) + seq, leaving room for
+# ~4M messages per second; id order is then (timestamp, arrival) order and the
+# FTS index, keyed by the same rowid, can be read newest-first without sorting.
+TIME_ID_SHIFT = 22
+TIME_ID_SEQ_MASK = (1 << TIME_ID_SHIFT) - 1
+
+
+def time_aligned_id_sql(timestamp: str) -> str:
+    """Scalar subquery yielding the next free time-aligned id for ``timestamp``."""
+    base = f"(MAX({timestamp}, 0) << {TIME_ID_SHIFT})"
+    return (
+        f"(SELECT COALESCE(MAX(id) + 1, {base}) FROM channel_messages "
+        f"WHERE id BETWEEN {base} AND {base} + {TIME_ID_SEQ_MASK})"
+    )
+
+
+def uses_time_ids(conn: sqlite3.Connection) -> bool:
+    return get_meta(conn, ROWID_ORDER_KEY) == ROWID_ORDER_TIME
+
+
+def ensure_rowid_order(conn: sqlite3.Connection) -> None:
+    """Start empty databases with time-aligned ids; older ones need ``reorder-ids``."""
+    if uses_time_ids(conn):
+        return
+    if conn.execute("SELECT 1 FROM channel_messages LIMIT 1").fetchone() is None:
+        with conn:
+            set_meta(conn, ROWID_ORDER_KEY, ROWID_ORDER_TIME)
+        return
+    logger.info(
+        "channel_messages ids are not time-aligned; run `python -m app.main reorder-ids` "
+        "so newest-first search can stream from the index"
+    )
+
+
+def reorder_rowids(conn: sqlite3.Connection, tokenize: Callable[[str], list[str]]) -> int:
+    """Renumber every message to its time-aligned id in one transaction.
+
+    The random-sampling slots are remapped in place and the FTS index is rebuilt
+    under the new rowids (re-tokenized from ``text`` in contentless mode).
+    Returns the number of messages renumbered. Search cursors issued before the
+    renumbering stop being valid.
+    """
+    with conn:
+        # DML first so the temp table DDL joins the same implicit transaction.
+        set_meta(conn, ROWID_ORDER_KEY, ROWID_ORDER_TIME)
+        conn.execute("DROP TABLE IF EXISTS temp.rowid_remap")
+        conn.execute("CREATE TEMP TABLE rowid_remap (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)")
+        conn.execute(
+            f"""
+            INSERT INTO temp.rowid_remap(old_id, new_id)
+            SELECT id,
+                   (MAX(timestamp, 0) << {TIME_ID_SHIFT})
+                   + ROW_NUMBER() OVER (PARTITION BY MAX(timestamp, 0) ORDER BY id) - 1
+            FROM channel_messages
+            """
+        )
+        moved = int(conn.execute("SELECT COUNT(1) FROM temp.rowid_remap WHERE old_id != new_id").fetchone()[0])
+        # Two passes through negative ids so no intermediate id collides; the
+        # slots' unique message_row_id needs the same treatment.
+        conn.execute("UPDATE channel_messages SET id = -id - 1")
+        conn.execute(
+            "UPDATE channel_messages SET id = (SELECT new_id FROM temp.rowid_remap WHERE old_id = -channel_messages.id - 1)"
+        )
+        conn.execute("UPDATE channel_message_slots SET message_row_id = -message_row_id - 1")
+        conn.execute(
+            """
+            UPDATE channel_message_slots
+            SET message_row_id = (SELECT new_id FROM temp.rowid_remap WHERE old_id = -message_row_id - 1)
+            """
+        )
+        if get_fts_mode(conn) == FTS_MODE_CONTENTLESS:
+            conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('delete-all')")
+            for row_id, chat_id, text in iter_message_texts(conn):
+                index_contentless_row(conn, row_id, " ".join(tokenize(text)), chat_id)
+        else:
+            conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('rebuild')")
+        conn.execute("DROP TABLE temp.rowid_remap")
+    logger.info("renumbered %s channel_messages rows to time-aligned ids", moved)
+    return moved
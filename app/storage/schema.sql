@@ -15,6 +15,7 @@ CREATE TABLE IF NOT EXISTS channel_messages (
     source TEXT NOT NULL,
     created_at INTEGER NOT NULL,
     updated_at INTEGER NOT NULL,
+    chat_term TEXT GENERATED ALWAYS AS ('c' || replace(CAST(chat_id AS TEXT), '-', 'n')) VIRTUAL,
     UNIQUE(chat_id, message_id)
 );
 
@@ -24,6 +25,23 @@ CREATE INDEX IF NOT EXISTS idx_channel_messages_chat_time
 CREATE INDEX IF NOT EXISTS idx_channel_messages_time
     ON channel_messages(timestamp DESC);
 
+CREATE TABLE IF NOT EXISTS channel_message_slots (
+    chat_id INTEGER NOT NULL,
+    slot INTEGER NOT NULL,
+    message_row_id INTEGER NOT NULL,
+    PRIMARY KEY (chat_id, slot)
+) WITHOUT ROWID;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_channel_message_slots_row
+    ON channel_message_slots(message_row_id);
+
+CREATE TABLE IF NOT EXISTS channel_stats (
+    chat_id INTEGER PRIMARY KEY,
+    message_count INTEGER NOT NULL,
+    first_timestamp INTEGER NOT NULL,
+    last_timestamp INTEGER NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS app_config (
     key TEXT PRIMARY KEY,
     value TEXT NOT NULL,
@@ -58,6 +76,11 @@ CREATE TABLE IF NOT EXISTS channel_alias (
     username TEXT UNIQUE
 );
 
+CREATE TABLE IF NOT EXISTS storage_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS allowed_channels (
     chat_id INTEGER PRIMARY KEY,
     channel_name TEXT,
@@ -67,25 +90,11 @@ CREATE TABLE IF NOT EXISTS allowed_channels (
     updated_at INTEGER NOT NULL
 );
 
-CREATE VIRTUAL TABLE IF NOT EXISTS channel_messages_fts USING fts5(
-    tokens,
-    content='channel_messages',
-    content_rowid='id'
-);
-
-CREATE TRIGGER IF NOT EXISTS channel_messages_ai AFTER INSERT ON channel_messages BEGIN
-    INSERT INTO channel_messages_fts(rowid, tokens)
-    VALUES (new.id, new.tokens);
-END;
-
-CREATE TRIGGER IF NOT EXISTS channel_messages_ad AFTER DELETE ON channel_messages BEGIN
-    INSERT INTO channel_messages_fts(channel_messages_fts, rowid, tokens)
-    VALUES('delete', old.id, old.tokens);
-END;
+-- channel_messages_fts (tokens, chat_term) is created by init_db in the
+-- configured storage mode, see app/storage/fts.py.
 
-CREATE TRIGGER IF NOT EXISTS channel_messages_au AFTER UPDATE ON channel_messages BEGIN
-    INSERT INTO channel_messages_fts(channel_messages_fts, rowid, tokens)
-    VALUES('delete', old.id, old.tokens);
-    INSERT INTO channel_messages_fts(rowid, tokens)
-    VALUES (new.id, new.tokens);
-END;
+-- Per-term document counts of channel_messages_fts, read by the query planner.
+CREATE VIRTUAL TABLE IF NOT EXISTS channel_messages_fts_vocab USING fts5vocab(
+    'channel_messages_fts',
+    'row'
+);
@@ -0,0 +1,93 @@
+"""Compare search latency of the legacy MATCH expression and the query planner.
+
+Queries are substrings cut from the synthetic corpus of bench_tokenizer.py (so
+they have matches), optionally followed by an English word, the way users paste
+fragments of a remembered message.
+
+    python scripts/bench_query_planner.py --docs 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.search.planner import QueryPlanner  # noqa: E402
+from app.search.query_builder import build_fts_query  # noqa: E402
+from app.search.tokenizer import CJK_RUN_RE, default_tokenizer  # noqa: E402
+from bench_tokenizer import LATIN_WORDS, _build, _load_words, _make_doc  # noqa: E402
+
+
+def _queries(rng: random.Random, docs: list[str], count: int) -> list[str]:
+    queries: list[str] = []
+    while len(queries) < count:
+        runs = [run for run in CJK_RUN_RE.findall(rng.choice(docs)) if len(run) >= 4]
+        if not runs:
+            continue
+        run = rng.choice(runs)
+        size = rng.randint(2, min(10, len(run)))
+        start = rng.randint(0, len(run) - size)
+        query = run[start : start + size]
+        if rng.random() < 0.3:
+            query += " " + rng.choice(LATIN_WORDS)
+        queries.append(query)
+    return queries
+
+
+def _measure(repo, fts_queries: list[str]) -> list[float]:
+    timings: list[float] = []
+    for fts_query in fts_queries:
+        started = time.perf_counter()
+        if fts_query:
+            repo.search_page(fts_query, limit=10, count_limit=1000)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list[float], terms: float) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(f"{label:16s} avg={statistics.mean(timings):6.2f}ms p50={statistics.median(timings):6.2f}ms p95={p95:6.2f}ms terms/query={terms:.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = _load_words(20000)
+    docs = [_make_doc(rng, words) for _ in range(args.docs)]
+    queries = _queries(rng, docs, args.queries)
+    tokenizer = default_tokenizer()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = _build(Path(tmp) / "bench.db", tokenizer, docs)
+        legacy = [build_fts_query(tokenizer.tokenize(q)) for q in queries]
+        _measure(repo, legacy)  # warm the page cache
+        _report("legacy", _measure(repo, legacy), statistics.mean(q.count(" AND ") + 1 for q in legacy))
+
+        planner = QueryPlanner(tokenizer=tokenizer, doc_freqs=repo.term_doc_counts)
+        started = time.perf_counter()
+        planned = [planner.plan(q).fts_query for q in queries]
+        cold_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        started = time.perf_counter()
+        planned = [planner.plan(q).fts_query for q in queries]
+        warm_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        terms = statistics.mean(q.count(" AND ") + 1 for q in planned if q)
+        _report("planner", _measure(repo, planned), terms)
+        print(f"planning cost: cold={cold_ms:.2f}ms/query (vocab lookups) warm={warm_ms:.2f}ms/query (cached)")
+        repo.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Compare index size and query latency of the legacy and current tokenizers.
+
+Builds the same synthetic corpus (jieba dictionary words mixed with English
+words, URLs and numbers) into two temporary databases and prints the FTS index
+size and average search latency for each.
+
+    python scripts/bench_tokenizer.py --docs 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import jieba
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.normalize.channel_message import NormalizedMessage  # noqa: E402
+from app.search.query_builder import build_fts_query  # noqa: E402
+from app.search.tokenizer import Tokenizer, default_tokenizer  # noqa: E402
+from app.storage.db import init_db  # noqa: E402
+from app.storage.fts import fts_index_bytes  # noqa: E402
+from app.storage.repository import MessageRepository  # noqa: E402
+
+
+LATIN_WORDS = [
+    "telegram", "channel", "update", "release", "python", "search", "index", "bot",
+    "server", "docker", "github", "android", "iphone", "video", "music", "news",
+]
+
+
+@dataclass(slots=True)
+class LegacyTokenizer(Tokenizer):
+    """Bigrams over the whole whitespace-stripped string, as before CJK-run awareness."""
+
+    def tokenize(self, text: str) -> list[str]:
+        normalized = self.normalize_text(text)
+        if not normalized:
+            return []
+        base_tokens = [t.strip() for t in jieba.cut(normalized) if t.strip()]
+        filtered = [t for t in base_tokens if t not in self.stopwords]
+        compact = re.sub(r"\s+", "", normalized)
+        ngrams = [compact[i : i + 2] for i in range(len(compact) - 1)]
+        return list(dict.fromkeys(filtered + ngrams))
+
+
+def _load_words(limit: int) -> list[str]:
+    words: list[tuple[int, str]] = []
+    with jieba.get_dict_file() as fp:
+        for raw in fp:
+            parts = raw.decode("utf-8").split()
+            if len(parts) >= 2 and len(parts[0]) >= 2:
+                words.append((int(parts[1]), parts[0]))
+    words.sort(reverse=True)
+    return [word for _, word in words[:limit]]
+
+
+def _make_doc(rng: random.Random, words: list[str]) -> str:
+    pieces: list[str] = []
+    for _ in range(rng.randint(8, 40)):
+        roll = rng.random()
+        if roll < 0.6:
+            pieces.append("".join(rng.choices(words, k=rng.randint(1, 4))))
+        elif roll < 0.85:
+            pieces.append(" ".join(rng.choices(LATIN_WORDS, k=rng.randint(1, 3))))
+        elif roll < 0.95:
+            pieces.append(str(rng.randint(1, 99999)))
+        else:
+            pieces.append(f"https://t.me/{rng.choice(LATIN_WORDS)}/{rng.randint(1, 9999)}")
+    return "，".join(pieces)
+
+
+def _build(path: Path, tokenizer: Tokenizer, docs: list[str]) -> MessageRepository:
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn, tokenizer=tokenizer)
+    items = [
+        (
+            NormalizedMessage(
+                message_id=i,
+                chat_id=-100,
+                text=text,
+                timestamp=1_700_000_000 + i,
+                edited_timestamp=None,
+                source="bench",
+                channel_username=None,
+                source_link=None,
+            ),
+            tokenizer.tokenize(text),
+        )
+        for i, text in enumerate(docs, start=1)
+    ]
+    with repo.bulk_load():
+        for start in range(0, len(items), 5000):
+            repo.bulk_upsert_messages(items[start : start + 5000])
+    repo.fts_optimize()
+    return repo
+
+
+def _latency_ms(repo: MessageRepository, tokenizer: Tokenizer, queries: list[str], rounds: int) -> float:
+    fts_queries = [build_fts_query(tokenizer.tokenize(q)) for q in queries]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for fts_query in fts_queries:
+            repo.search_page(fts_query, limit=10)
+    return (time.perf_counter() - started) * 1000 / (rounds * len(fts_queries))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = _load_words(20000)
+    docs = [_make_doc(rng, words) for _ in range(args.docs)]
+    queries = rng.sample(words[:2000], 10) + rng.sample(LATIN_WORDS, 5) + ["telegram update", "https"]
+    stopwords = default_tokenizer().stopwords
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, tokenizer in (
+            ("legacy", LegacyTokenizer(stopwords=stopwords, version="1")),
+            ("cjk-run", default_tokenizer()),
+        ):
+            path = Path(tmp) / f"{label}.db"
+            started = time.perf_counter()
+            repo = _build(path, tokenizer, docs)
+            build_s = time.perf_counter() - started
+            repo.conn.execute("VACUUM")
+            latency = _latency_ms(repo, tokenizer, queries, args.rounds)
+            print(
+                f"{label:8s} docs={args.docs} build={build_s:.1f}s "
+                f"fts_index={fts_index_bytes(repo.conn) / 1e6:.1f}MB db_file={path.stat().st_size / 1e6:.1f}MB "
+                f"query_avg={latency:.2f}ms"
+            )
+            repo.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+
+from app.normalize.channel_message import NormalizedMessage
+from app.search.async_service import AsyncSearchService
+from app.search.service import SearchService
+from app.search.tokenizer import default_tokenizer
+from app.storage.async_repository import AsyncMessageRepository, create_db_executor
+from app.storage.db import init_db
+from app.storage.repository import MessageRepository
+
+
+def _repo() -> MessageRepository:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    return MessageRepository(conn)
+
+
+def test_async_facades_run_off_the_event_loop_thread() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    executor = create_db_executor(2)
+    async_repo = AsyncMessageRepository(repo, executor)
+    async_search = AsyncSearchService(SearchService(repo=repo, tokenizer=tokenizer), executor)
+    msg = NormalizedMessage(
+        message_id=1,
+        chat_id=100,
+        text="异步搜索测试",
+        timestamp=1000,
+        edited_timestamp=None,
+        source="live",
+        channel_username="a_channel",
+        source_link=None,
+    )
+    seen_threads: list[str] = []
+
+    def _probe() -> str:
+        return threading.current_thread().name
+
+    async def _scenario() -> tuple[list, int, int | None]:
+        await async_repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+        seen_threads.append(await async_repo.run(_probe))
+        rows, total = await asyncio.gather(
+            async_search.search("搜索", limit=10),
+            async_search.count("搜索"),
+        )
+        return rows, total, await async_repo.resolve_channel("@a_channel")
+
+    try:
+        rows, total, chat_id = asyncio.run(_scenario())
+    finally:
+        executor.shutdown(wait=True)
+
+    assert len(rows) == 1
+    assert total == 1
+    assert chat_id == 100
+    assert seen_threads[0].startswith("db")
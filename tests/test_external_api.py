@@ -169,3 +169,60 @@ def test_external_random_api_rejects_non_positive_limit(tmp_path: Path) -> None:
 
     assert status == 400
     assert payload["code"] == "invalid_params"
+
+
+def test_external_api_rejects_malformed_cursor(tmp_path: Path) -> None:
+    runtime = _build_runtime(tmp_path=tmp_path, enabled=True, token="")
+    server = ExternalSearchApiServer(runtime=runtime, host="127.0.0.1", port=0)
+    server.start()
+    try:
+        status, payload = _request_json(
+            f"http://127.0.0.1:{server.bound_port}/api/search?q=telegram&cursor=%25%25"
+        )
+        ok_status, ok_payload = _request_json(f"http://127.0.0.1:{server.bound_port}/api/search?q=telegram&limit=1")
+    finally:
+        server.stop()
+
+    assert status == 400
+    assert payload["code"] == "invalid_params"
+    assert ok_status == 200
+    assert ok_payload["data"]["next_cursor"] is not None
+
+
+def test_external_api_sort_parameter(tmp_path: Path) -> None:
+    runtime = _build_runtime(tmp_path=tmp_path, enabled=True, token="")
+    server = ExternalSearchApiServer(runtime=runtime, host="127.0.0.1", port=0)
+    server.start()
+    try:
+        status, payload = _request_json(
+            f"http://127.0.0.1:{server.bound_port}/api/search?q=telegram&limit=1&sort=relevance"
+        )
+        bad_status, bad_payload = _request_json(f"http://127.0.0.1:{server.bound_port}/api/search?q=telegram&sort=best")
+    finally:
+        server.stop()
+
+    assert status == 200
+    assert payload["data"]["sort"] == "relevance"
+    assert payload["data"]["total"] == 1
+    # Ranked orders page by offset only.
+    assert payload["data"]["next_cursor"] is None
+    assert bad_status == 400
+    assert bad_payload["code"] == "invalid_params"
+
+
+def test_external_api_time_window(tmp_path: Path) -> None:
+    runtime = _build_runtime(tmp_path=tmp_path, enabled=True, token="")
+    server = ExternalSearchApiServer(runtime=runtime, host="127.0.0.1", port=0)
+    server.start()
+    base = f"http://127.0.0.1:{server.bound_port}/api/search?q=telegram"
+    try:
+        _, inside = _request_json(f"{base}&since=1729999999&until=1730000000")
+        _, outside = _request_json(f"{base}&since=1730000001")
+        bad_status, _ = _request_json(f"{base}&until=yesterday")
+    finally:
+        server.stop()
+
+    assert inside["data"]["total"] == 1
+    assert inside["data"]["since"] == 1729999999
+    assert outside["data"]["total"] == 0
+    assert bad_status == 400
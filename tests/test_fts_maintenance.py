@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import sqlite3
+
+from app.normalize.channel_message import NormalizedMessage
+from app.search.tokenizer import default_tokenizer
+from app.storage.db import init_db
+from app.storage.maintenance import run_merge_slice
+from app.storage.repository import MessageRepository
+
+
+def _repo_with_segments(count: int) -> MessageRepository:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn)
+    # Keep FTS5 from merging on its own so every commit leaves a segment behind.
+    repo.fts_configure(automerge=0, crisismerge=64, usermerge=2)
+    tokenizer = default_tokenizer()
+    for i in range(1, count + 1):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=f"段合并 测试 {i}",
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="test",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    return repo
+
+
+def test_merge_slice_runs_until_done_and_keeps_results() -> None:
+    repo = _repo_with_segments(20)
+
+    first = repo.fts_merge_slice(pages=1, budget_ms=0)
+    assert first.steps == 1 and first.finished is False
+
+    done = repo.fts_merge_slice(pages=1000, budget_ms=5000)
+    assert done.finished is True
+    assert repo.fts_merge_slice(pages=1000, budget_ms=5000).steps == 0
+    assert len(repo.search('"合并"*', limit=50)) == 20
+
+    repo.fts_optimize()
+    assert len(repo.search('"合并"*', limit=50)) == 20
+
+
+def test_run_merge_slice_stops_when_step_reports_no_work() -> None:
+    remaining = [True, True, False]
+    result = run_merge_slice(lambda: remaining.pop(0), budget_ms=10_000)
+    assert (result.steps, result.finished) == (2, True)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import sqlite3
+
+from app.normalize.channel_message import NormalizedMessage
+from app.search.query_builder import build_fts_query
+from app.search.tokenizer import default_tokenizer
+from app.storage.db import init_db
+from app.storage.fts import FTS_MODE_CONTENTLESS, FTS_MODE_EXTERNAL, get_fts_mode
+from app.storage.repository import MessageRepository, MessageWrite
+
+
+def _msg(message_id: int, text: str) -> NormalizedMessage:
+    return NormalizedMessage(
+        message_id=message_id,
+        chat_id=100,
+        text=text,
+        timestamp=1000 + message_id,
+        edited_timestamp=None,
+        source="test",
+        channel_username="a_channel",
+        source_link=None,
+    )
+
+
+def _search(repo: MessageRepository, query: str) -> list[int]:
+    fts_query = build_fts_query(default_tokenizer().tokenize(query))
+    return sorted(row.message_id for row in repo.search(fts_query, limit=50))
+
+
+def test_migrate_to_contentless_and_back_keeps_search_results() -> None:
+    tokenizer = default_tokenizer()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn, tokenizer=tokenizer)
+    for i, text in enumerate(["你好世界", "世界和平", "今天天气不错"], start=1):
+        repo.upsert_message(_msg(i, text), tokenizer.tokenize(text))
+
+    init_db(conn, fts_mode=FTS_MODE_CONTENTLESS, tokenizer=tokenizer)
+    repo.refresh_fts_mode()
+    assert get_fts_mode(conn) == FTS_MODE_CONTENTLESS
+    assert conn.execute("SELECT COUNT(1) FROM channel_messages WHERE tokens != ''").fetchone()[0] == 0
+    assert _search(repo, "世界") == [1, 2]
+
+    # Edits and deletes re-derive the old tokens from text.
+    repo.upsert_message(_msg(1, "晚安月亮"), tokenizer.tokenize("晚安月亮"))
+    repo.apply_message_writes(
+        [MessageWrite.delete(100, 2), MessageWrite.upsert(_msg(4, "世界杯"), tokenizer.tokenize("世界杯"))]
+    )
+    assert _search(repo, "世界") == [4]
+    assert _search(repo, "月亮") == [1]
+    assert [row.message_id for row in repo.search('"世界"*', limit=10, channel=100)] == [4]
+    conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts, rank) VALUES('integrity-check', 0)")
+
+    init_db(conn, fts_mode=FTS_MODE_EXTERNAL, tokenizer=tokenizer)
+    repo.refresh_fts_mode()
+    assert get_fts_mode(conn) == FTS_MODE_EXTERNAL
+    assert _search(repo, "世界") == [4]
+    assert _search(repo, "天气") == [3]
+    conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('integrity-check')")
+
+
+def test_tokenizer_emits_bigrams_only_inside_cjk_runs() -> None:
+    tokens = default_tokenizer().tokenize("hello world 你好世界 2024年")
+    assert "hello" in tokens and "world" in tokens
+    assert {"你好", "好世", "世界"} <= set(tokens)
+    # No bigrams spanning Latin letters, digits or the gap between scripts.
+    assert not {"he", "ow", "d你", "20", "4年"} & set(tokens)
+
+
+def test_reindex_tokens_rebuilds_stale_index_in_both_modes() -> None:
+    tokenizer = default_tokenizer()
+    for mode in (FTS_MODE_EXTERNAL, FTS_MODE_CONTENTLESS):
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        init_db(conn, fts_mode=mode, tokenizer=tokenizer)
+        repo = MessageRepository(conn, tokenizer=tokenizer)
+        # Simulate rows indexed by an older tokenizer that bigrammed across words.
+        for i, text in enumerate(["release notes 发布说明", "世界和平"], start=1):
+            repo.upsert_message(_msg(i, text), tokenizer.tokenize(text) + ["se"])
+        conn.execute("UPDATE storage_meta SET value = '1' WHERE key = 'fts_tokenizer_version'")
+        conn.commit()
+
+        repo.reindex_tokens(batch_size=1)
+
+        assert repo.search('"se"', limit=10) == []
+        assert _search(repo, "发布") == [1]
+        assert _search(repo, "世界") == [2]
+        meta = conn.execute("SELECT value FROM storage_meta WHERE key = 'fts_tokenizer_version'").fetchone()
+        assert meta[0] == tokenizer.version
+
+
+def test_init_db_upgrades_single_column_fts_to_chat_term() -> None:
+    tokenizer = default_tokenizer()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn, tokenizer=tokenizer)
+    repo.upsert_message(_msg(1, "你好世界"), tokenizer.tokenize("你好世界"))
+    # Recreate the pre-chat_term index layout.
+    conn.executescript(
+        """
+        DROP TABLE channel_messages_fts;
+        CREATE VIRTUAL TABLE channel_messages_fts USING fts5(
+            tokens, content='channel_messages', content_rowid='id', tokenize='unicode61'
+        );
+        INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('rebuild');
+        """
+    )
+
+    init_db(conn, tokenizer=tokenizer)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(channel_messages_fts)")]
+    assert columns == ["tokens", "chat_term"]
+    assert [row.message_id for row in repo.search('"世界"', limit=10, channel=100)] == [1]
+    assert repo.search('"世界"', limit=10, channel=200) == []
+    conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('integrity-check')")
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from pathlib import Path
+
+from app.importer.pipeline import TokenizeStage
+from app.importer.telegram_json import import_telegram_export
+from app.normalize.channel_message import NormalizedMessage
+from app.search.tokenizer import default_tokenizer
+from app.storage.db import init_db
+from app.storage.fts import FTS_TRIGGERS, suspend_fts_triggers
+from app.storage.repository import MessageRepository
+from app.storage.rowid_order import TIME_ID_SHIFT
+
+
+def _repo() -> MessageRepository:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    return MessageRepository(conn)
+
+
+def _write_export(path: Path, count: int) -> None:
+    messages = [
+        {
+            "id": i,
+            "type": "message",
+            "date_unixtime": str(1700000000 + i),
+            "text": f"批量导入测试 第{i}条",
+        }
+        for i in range(1, count + 1)
+    ]
+    messages.append({"id": count + 1, "type": "service", "date_unixtime": "1700009999"})
+    path.write_text(
+        json.dumps({"id": 123456, "name": "demo", "messages": messages}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+
+
+def _trigger_names(repo: MessageRepository) -> set[str]:
+    rows = repo.conn.execute("SELECT name FROM sqlite_master WHERE type='trigger'").fetchall()
+    return {row["name"] for row in rows}
+
+
+def test_bulk_import_rebuilds_fts_and_restores_triggers(tmp_path: Path) -> None:
+    repo = _repo()
+    export = tmp_path / "result.json"
+    _write_export(export, 25)
+
+    stats = import_telegram_export(str(export), repo, default_tokenizer(), bulk=True, batch_size=10)
+
+    assert stats.imported == 25
+    assert stats.skipped == 1
+    assert set(FTS_TRIGGERS) <= _trigger_names(repo)
+    assert repo.search_count('"导入"*') == 25
+    assert repo.search_count('"导入"*', channel="demo") == 25
+
+
+def test_interrupted_bulk_load_is_repaired_by_init_db() -> None:
+    repo = _repo()
+    suspend_fts_triggers(repo.conn)
+    repo.conn.execute(
+        """
+        INSERT INTO channel_messages(chat_id, message_id, text, tokens, timestamp, source, created_at, updated_at)
+        VALUES (1, 1, '中断', '中断', 1, 'import', 1, 1)
+        """
+    )
+    repo.conn.commit()
+    assert repo.search_count('"中断"') == 0
+
+    init_db(repo.conn)
+
+    assert set(FTS_TRIGGERS) <= _trigger_names(repo)
+    assert repo.search_count('"中断"') == 1
+
+
+def test_bulk_reimport_realigns_ids_of_redated_messages() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    assert repo.time_ids
+
+    def _items(*stamps: tuple[int, int]) -> list[tuple[NormalizedMessage, list[str]]]:
+        items = []
+        for message_id, timestamp in stamps:
+            msg = NormalizedMessage(
+                message_id=message_id,
+                chat_id=100,
+                text=f"重新导入 {message_id}",
+                timestamp=timestamp,
+                edited_timestamp=None,
+                source="import",
+                channel_username=None,
+                source_link=None,
+            )
+            items.append((msg, tokenizer.tokenize(msg.text)))
+        return items
+
+    with repo.bulk_load():
+        repo.bulk_upsert_messages(_items((1, 5000), (2, 3000)))
+    with repo.bulk_load():
+        repo.bulk_upsert_messages(_items((1, 1000), (2, 3000), (3, 2000)))
+
+    rows = repo.conn.execute("SELECT id, timestamp FROM channel_messages").fetchall()
+    assert all(row["id"] >> TIME_ID_SHIFT == row["timestamp"] for row in rows)
+    assert [row.message_id for row in repo.search('"导入"', limit=10)] == [2, 3, 1]
+    assert [row.message_id for row in repo.search('"导入"', limit=10, since=4000)] == []
+    assert repo.random_count() == 3
+
+
+def test_multiprocess_tokenize_matches_inline(tmp_path: Path) -> None:
+    export = tmp_path / "result.json"
+    _write_export(export, 600)
+    inline_repo = _repo()
+    pooled_repo = _repo()
+
+    inline = import_telegram_export(str(export), inline_repo, default_tokenizer(), bulk=True, batch_size=128)
+    pooled = import_telegram_export(
+        str(export), pooled_repo, default_tokenizer(), bulk=True, batch_size=128, workers=2
+    )
+
+    assert (pooled.total, pooled.imported, pooled.skipped) == (inline.total, inline.imported, inline.skipped)
+    assert pooled.workers == 2 and pooled.tokenize_seconds > 0 and pooled.tokenize_cpu_seconds > 0
+    assert pooled.tokenized == inline.tokenized == 600
+    assert pooled.stage_rates()["tokenize"] == pooled.tokenized / pooled.tokenize_seconds
+    query = "SELECT message_id, tokens FROM channel_messages ORDER BY id"
+    assert [tuple(r) for r in pooled_repo.conn.execute(query)] == [
+        tuple(r) for r in inline_repo.conn.execute(query)
+    ]
+
+
+def test_tokenize_stage_counts_messages_when_results_return() -> None:
+    messages = [
+        NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=f"分词计数 {i}",
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        for i in range(1, 101)
+    ]
+    produced = 0
+
+    def _parsed():
+        nonlocal produced
+        for msg in messages:
+            produced += 1
+            yield msg
+
+    stage = TokenizeStage(default_tokenizer(), workers=2, chunk_size=10)
+    results = stage.run(_parsed())
+    next(results)
+    # Four chunks were parsed and submitted, but only the first came back.
+    assert produced == 40
+    assert stage.tokenized == 10
+    assert sum(1 for _ in results) == 99
+    assert stage.tokenized == 100
+    assert stage.seconds > 0 and stage.cpu_seconds > 0
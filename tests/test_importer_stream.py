@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.importer.json_stream import read_export_header, stream_export
+
+
+def _export() -> dict:
+    return {
+        "name": "演示频道",
+        "type": "public_channel",
+        "id": 1234567890,
+        "messages": [
+            {"id": 1, "type": "message", "date_unixtime": "1700000001", "text": "你好 世界"},
+            {
+                "id": 22,
+                "type": "message",
+                "date_unixtime": "1700000002",
+                "text": ["混合", {"type": "bold", "text": "文本"}, " \"quoted\" \\ end"],
+            },
+            {"id": 333, "type": "service", "date_unixtime": "1700000003", "text": ""},
+        ],
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 16])
+def test_stream_export_matches_json_loads(tmp_path: Path, chunk_size: int) -> None:
+    data = _export()
+    path = tmp_path / "result.json"
+    path.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    header: dict = {}
+    messages = list(stream_export(str(path), header, chunk_size=chunk_size))
+
+    assert messages == data["messages"]
+    assert header == {"name": "演示频道", "type": "public_channel", "id": 1234567890}
+    assert read_export_header(str(path), chunk_size=chunk_size)["id"] == 1234567890
+
+
+def test_read_export_header_finds_id_after_messages(tmp_path: Path) -> None:
+    path = tmp_path / "result.json"
+    path.write_text(
+        '{"messages": [{"id": 1}, {"id": 2}], "name": "late", "id": 42}',
+        encoding="utf-8",
+    )
+
+    header = read_export_header(str(path), chunk_size=5)
+
+    assert header == {"name": "late", "id": 42}
+
+
+def test_stream_export_handles_empty_messages(tmp_path: Path) -> None:
+    path = tmp_path / "result.json"
+    path.write_text('{"id": 7, "messages": []}', encoding="utf-8")
+
+    header: dict = {}
+    assert list(stream_export(str(path), header, chunk_size=3)) == []
+    assert header == {"id": 7}
+
+
+def test_stream_export_rejects_truncated_file(tmp_path: Path) -> None:
+    path = tmp_path / "result.json"
+    path.write_text('{"id": 7, "messages": [{"id": 1}, {"id": ', encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        list(stream_export(str(path), {}, chunk_size=4))
@@ -64,3 +64,26 @@ def test_edited_message_cleared_text_should_remove_index() -> None:
 
     rows_after = repo.search('"内容"*', limit=10, channel=-1001234567890)
     assert rows_after == []
+
+
+def test_edit_with_same_text_reports_unchanged_and_keeps_index() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    chat = _Chat(id=-1001234567890)
+    created = _Message(message_id=11, chat=chat, date=1700000000, text="原文内容不变")
+    assert handle_channel_message(created, repo, tokenizer).reason == "indexed"
+    segments_before = repo.conn.execute("SELECT COUNT(1) FROM channel_messages_fts_data").fetchone()[0]
+
+    edited = _Message(message_id=11, chat=chat, date=1700000000, text="原文内容不变", edit_date=1700000100)
+    result = handle_edited_channel_message(edited, repo, tokenizer)
+
+    assert result.reason == "unchanged"
+    assert result.ok is True
+    row = repo.conn.execute("SELECT edited_timestamp FROM channel_messages WHERE message_id=11").fetchone()
+    assert row["edited_timestamp"] == 1700000100
+    assert repo.conn.execute("SELECT COUNT(1) FROM channel_messages_fts_data").fetchone()[0] == segments_before
+    assert len(repo.search('"原文"*', limit=10)) == 1
+
+    changed = _Message(message_id=11, chat=chat, date=1700000000, text="改过的内容", edit_date=1700000200)
+    assert handle_edited_channel_message(changed, repo, tokenizer).reason == "indexed"
+    assert repo.search('"原文"*', limit=10) == []
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import sqlite3
+
+from app.ingest.ordering import IngestOrder
+from app.ingest.queue import IngestQueue
+from app.normalize.channel_message import NormalizedMessage
+from app.search.tokenizer import default_tokenizer
+from app.storage.async_repository import create_db_executor
+from app.storage.db import init_db
+from app.storage.repository import MessageRepository, MessageWrite
+
+
+def _repo() -> MessageRepository:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    return MessageRepository(conn)
+
+
+def _write(message_id: int, text: str) -> MessageWrite:
+    msg = NormalizedMessage(
+        message_id=message_id,
+        chat_id=100,
+        text=text,
+        timestamp=1000 + message_id,
+        edited_timestamp=None,
+        source="live",
+        channel_username="a_channel",
+        source_link=None,
+    )
+    return MessageWrite.upsert(msg, default_tokenizer().tokenize(text))
+
+
+def test_ingest_queue_groups_writes_into_batches() -> None:
+    repo = _repo()
+    executor = create_db_executor(1)
+    queue = IngestQueue(repo, executor, batch_size=50, flush_interval_ms=20, max_size=100)
+
+    async def _scenario() -> list[str]:
+        await queue.start()
+        futures = [await queue.submit(_write(i, f"批量写入 {i}")) for i in range(1, 31)]
+        futures.append(await queue.submit(MessageWrite.delete(100, 1)))
+        futures.append(await queue.submit(MessageWrite.delete(100, 999)))
+        statuses = list(await asyncio.gather(*futures))
+        await queue.stop()
+        return statuses
+
+    try:
+        statuses = asyncio.run(_scenario())
+    finally:
+        executor.shutdown(wait=True)
+
+    assert statuses[:30] == ["indexed"] * 30
+    assert statuses[30:] == ["deindexed", "deindex_not_found"]
+    assert queue.stats.committed == 32
+    assert queue.stats.batches < 32
+    assert repo.random_count(channel=100) == 29
+    assert repo.resolve_channel("@a_channel") == 100
+
+
+def test_ingest_queue_flushes_pending_writes_on_stop() -> None:
+    repo = _repo()
+    executor = create_db_executor(1)
+    queue = IngestQueue(repo, executor, batch_size=500, flush_interval_ms=10_000, max_size=1000)
+
+    async def _scenario() -> None:
+        await queue.start()
+        for i in range(1, 11):
+            await queue.submit(_write(i, f"关闭前刷盘 {i}"))
+        await queue.stop()
+
+    try:
+        asyncio.run(_scenario())
+    finally:
+        executor.shutdown(wait=True)
+
+    assert queue.depth == 0
+    assert repo.random_count() == 10
+
+
+def test_ingest_queue_isolates_a_failing_write_in_a_batch() -> None:
+    repo = _repo()
+    repo.conn.execute("INSERT INTO channel_alias(chat_id, username) VALUES (200, 'taken')")
+    repo.conn.commit()
+    executor = create_db_executor(1)
+    queue = IngestQueue(repo, executor, batch_size=50, flush_interval_ms=20, max_size=100)
+    # Another chat claiming an alias that is already taken violates UNIQUE(username).
+    poisoned = _write(99, "别名冲突")
+    poisoned = MessageWrite.upsert(
+        dataclasses.replace(poisoned.message, chat_id=300, channel_username="taken"), poisoned.tokens or []
+    )
+
+    async def _scenario() -> list[object]:
+        await queue.start()
+        futures = [await queue.submit(_write(i, f"正常写入 {i}")) for i in range(1, 5)]
+        futures.append(await queue.submit(poisoned))
+        futures.extend([await queue.submit(_write(i, f"正常写入 {i}")) for i in range(5, 9)])
+        results = list(await asyncio.gather(*futures, return_exceptions=True))
+        await queue.stop()
+        return results
+
+    try:
+        results = asyncio.run(_scenario())
+    finally:
+        executor.shutdown(wait=True)
+
+    assert isinstance(results[4], sqlite3.IntegrityError)
+    assert results[:4] + results[5:] == ["indexed"] * 8
+    assert queue.stats.failed == 1
+    assert queue.stats.committed == 8
+    assert repo.random_count(channel=100) == 8
+    assert repo.random_count(channel=300) == 0
+
+
+def test_ingest_order_keeps_an_edit_behind_its_slower_post() -> None:
+    repo = _repo()
+    executor = create_db_executor(1)
+    queue = IngestQueue(repo, executor, batch_size=50, flush_interval_ms=0, max_size=100)
+    order = IngestOrder()
+
+    async def _handle(write: MessageWrite, tokenize_delay: float) -> None:
+        turn = order.claim(write.chat_id, write.message_id)
+        try:
+            await asyncio.sleep(tokenize_delay)
+            await turn.wait()
+            await queue.submit(write)
+        finally:
+            order.release(turn)
+
+    async def _scenario() -> None:
+        await queue.start()
+        # The post is still tokenizing when its edit (and an unrelated post) are ready.
+        await asyncio.gather(
+            _handle(_write(1, "原始内容"), 0.05),
+            _handle(_write(1, "修改后的内容"), 0),
+            _handle(_write(2, "其他消息"), 0),
+        )
+        await queue.stop()
+
+    try:
+        asyncio.run(_scenario())
+    finally:
+        executor.shutdown(wait=True)
+
+    row = repo.conn.execute("SELECT text FROM channel_messages WHERE message_id = 1").fetchone()
+    assert row["text"] == "修改后的内容"
+    assert repo.random_count(channel=100) == 2
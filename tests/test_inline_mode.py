@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+from app.context import RuntimeContext
+from app.interaction.inline_gate import InlineQueryGate
+from app.interaction.inline_mode import handle_inline_query, inline_next_offset, inline_page_position
+from app.normalize.channel_message import NormalizedMessage
+from app.search.ranking import SORT_TIME
+from app.search.service import SearchService
+from app.search.tokenizer import default_tokenizer
+from app.storage.db import init_db
+from app.storage.repository import MessageRepository
+
+
+def test_newer_keystroke_cancels_running_search() -> None:
+    gate = InlineQueryGate()
+    started: list[str] = []
+
+    async def _search(query: str) -> list[str]:
+        started.append(query)
+        await asyncio.sleep(0.05)
+        return [query]
+
+    async def _handle(query: str) -> list[str] | None:
+        ticket = gate.begin(user_id=1)
+        if not await gate.settle(ticket):
+            return None
+        rows = await gate.run(ticket, lambda: _search(query))
+        if rows is not None:
+            gate.finish(ticket)
+        return rows
+
+    async def _handle_other() -> list[str] | None:
+        ticket = gate.begin(user_id=2)
+        rows = await gate.run(ticket, lambda: _search("世界"))
+        gate.finish(ticket)
+        return rows
+
+    async def _scenario() -> list[list[str] | None]:
+        first = asyncio.ensure_future(_handle("你"))
+        await asyncio.sleep(0.01)
+        second = asyncio.ensure_future(_handle("你好"))
+        other = asyncio.ensure_future(_handle_other())
+        return [await first, await second, await other]
+
+    results = asyncio.run(_scenario())
+
+    assert results == [None, ["你好"], ["世界"]]
+    assert gate.stats.cancelled == 1
+    assert gate.stats.answered == 2
+    assert gate.stats.received == 3
+
+
+def test_debounce_skips_superseded_queries_and_min_length() -> None:
+    gate = InlineQueryGate(debounce_ms=30, min_query_chars=2)
+
+    async def _scenario() -> list[bool]:
+        tickets = [gate.begin(user_id=1) for _ in range(3)]
+        return list(await asyncio.gather(*(gate.settle(ticket) for ticket in tickets)))
+
+    assert asyncio.run(_scenario()) == [False, False, True]
+    assert gate.stats.skipped == 2
+    assert not gate.long_enough("你")
+    assert gate.long_enough("你好")
+    assert gate.stats.too_short == 1
+
+
+def test_inline_pages_follow_cursor_while_new_posts_arrive() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn)
+    tokenizer = default_tokenizer()
+
+    def add(message_id: int) -> None:
+        msg = NormalizedMessage(
+            message_id=message_id,
+            chat_id=100,
+            text=f"内联翻页 {message_id}",
+            timestamp=1000 + message_id,
+            edited_timestamp=None,
+            source="live",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+
+    for i in range(1, 6):
+        add(i)
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+
+    seen: list[int] = []
+    next_offset = ""
+    while True:
+        offset, cursor = inline_page_position(next_offset)
+        rows = service.search("翻页", limit=2, offset=offset, cursor=cursor)
+        seen.extend(row.message_id for row in rows)
+        next_offset = inline_next_offset(rows, 2, SORT_TIME, offset)
+        if not next_offset:
+            break
+        # A post ingested mid-scroll lands before page one, not in later pages.
+        add(100 + len(seen))
+
+    assert seen == [5, 4, 3, 2, 1]
+    assert inline_page_position("20") == (20, None)
+    assert inline_next_offset([], 2, "relevance", 4) == ""
+
+
+def test_inline_answers_are_shared_and_cached_until_ingest() -> None:
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn)
+    tokenizer = default_tokenizer()
+
+    def add(message_id: int) -> None:
+        msg = NormalizedMessage(
+            message_id=message_id,
+            chat_id=100,
+            text=f"共享缓存 {message_id}",
+            timestamp=1000 + message_id,
+            edited_timestamp=None,
+            source="live",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+
+    add(1)
+    runtime = RuntimeContext(
+        repo=repo,
+        tokenizer=tokenizer,
+        search_service=SearchService(repo=repo, tokenizer=tokenizer),
+        admin_auth=SimpleNamespace(is_whitelisted=lambda user_id: user_id == 42),
+        config_store=None,
+        default_search_limit=10,
+        default_random_limit=1,
+        max_random_limit=10,
+        private_page_size=10,
+        private_separator="---",
+        proxy_fail_open=True,
+        polling_idle_restart_seconds=3600,
+        inline_cache_time=30,
+    )
+    context = SimpleNamespace(application=SimpleNamespace(bot_data={"runtime": runtime}))
+    answers: list[tuple[list[str], dict[str, object]]] = []
+
+    def ask(user_id: int, query: str = "共享") -> None:
+        async def answer(results: list, **kwargs: object) -> None:
+            answers.append(([result.id for result in results], kwargs))
+
+        inline_query = SimpleNamespace(query=query, offset="", from_user=SimpleNamespace(id=user_id), answer=answer)
+        asyncio.run(handle_inline_query(SimpleNamespace(inline_query=inline_query), context))
+
+    try:
+        ask(7)
+        ask(8)
+        add(2)
+        ask(9)
+        ask(42)
+    finally:
+        runtime.async_search.executor.shutdown(wait=True)
+
+    assert [len(ids) for ids, _ in answers] == [1, 1, 2, 2]
+    assert answers[0][1]["cache_time"] == 30 and answers[0][1]["is_personal"] is False
+    assert answers[3][1]["cache_time"] == 1 and answers[3][1]["is_personal"] is True
+    assert runtime.inline_cache.stats.hits == 2
+    assert runtime.inline_cache.stats.stale == 1
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import sqlite3
+
+from app.normalize.channel_message import NormalizedMessage
+from app.search.planner import QueryPlanner
+from app.search.query_builder import build_fts_query
+from app.search.service import SearchService
+from app.search.tokenizer import default_tokenizer
+from app.storage.db import init_db
+from app.storage.repository import MessageRepository
+
+
+def test_plan_uses_every_run_bigram_exactly_rarest_first() -> None:
+    freqs = {"你好": 50, "好世": 1, "世界": 5, "界和": 100, "和平": 3}
+    calls: list[list[str]] = []
+
+    def _lookup(terms: list[str]) -> dict[str, int]:
+        calls.append(terms)
+        return {term: freqs.get(term, 0) for term in terms}
+
+    planner = QueryPlanner(tokenizer=default_tokenizer(), doc_freqs=_lookup)
+    plan = planner.plan("你好世界和平 Telegram")
+
+    assert plan.fts_query == '"好世" AND "和平" AND "世界" AND "你好" AND "界和" AND "telegram"*'
+    planner.plan("世界和平")
+    # Positive counts are served from the cache on the second plan.
+    assert calls == [["你好", "好世", "世界", "界和", "和平"]]
+
+    missing = planner.plan("你好世界末日")
+    assert missing.impossible and missing.fts_query == ""
+
+
+def test_planned_queries_match_the_legacy_expression() -> None:
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn)
+    repo = MessageRepository(conn)
+    tokenizer = default_tokenizer()
+    texts = ["你好世界和平", "世界和平统一", "和平世界", "今天天气不错 telegram", "telegrams 天气预报", "我们的世界"]
+    texts += ["计算机", "算机计算的问题", "计算 算机"]
+    for i, text in enumerate(texts, start=1):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=text,
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(text))
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+
+    for query in ["世界", "世界和平", "计算机", "天气 telegram", "我", "电影"]:
+        legacy = [row.id for row in repo.search(build_fts_query(tokenizer.tokenize(query)), limit=50)]
+        assert [row.id for row in service.search(query, limit=50)] == legacy, query
+    # Every bigram stays required, so the reordered 和平世界 does not match.
+    assert [row.message_id for row in service.search("世界和平", limit=50)] == [2, 1]
+    # 计算 AND 算机 alone would also match 8 and 9; the in-run word 计算机 keeps adjacency.
+    assert [row.message_id for row in service.search("计算机", limit=50)] == [7]
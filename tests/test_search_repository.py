@@ -1,4 +1,12 @@
+import dataclasses
+import random
+import time
+
+import pytest
+
 from app.normalize.channel_message import NormalizedMessage
+from app.search.cursor import decode_cursor, next_cursor
+from app.search.service import SearchService
 from app.search.tokenizer import default_tokenizer
 from app.storage.db import init_db
 from app.storage.repository import MessageRepository
@@ -43,6 +51,215 @@ def test_insert_and_search_channel_filter() -> None:
     assert rows[0].chat_id == 100
 
 
+def test_multi_channel_filter_runs_inside_fts() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for i, (chat_id, username) in enumerate([(100, "a_channel"), (-1001, "b_channel"), (300, "c_channel")], start=1):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=chat_id,
+            text=f"频道过滤 {i}",
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="import",
+            channel_username=username,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+
+    def chats(channel: object) -> list[int]:
+        return sorted(row.chat_id for row in repo.search('"过滤"', limit=10, channel=channel))
+
+    assert chats("@a_channel,#b_channel") == [-1001, 100]
+    assert chats([300, "@missing"]) == [300]
+    assert chats("@missing") == []
+    assert repo.search_count('"过滤"', channel="-1001,300") == 2
+    # The query itself only searches the tokens column, never the chat terms.
+    assert repo.search('"c100"', limit=10) == []
+
+    repo.add_allowed_channel(100, "A")
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+    assert [row.chat_id for row in service.search("过滤", limit=10, channel_filter="@a_channel,@c_channel")] == [100]
+    assert service.search("过滤", limit=10, channel_filter="@c_channel") == []
+
+
+@pytest.mark.parametrize("time_ids", [True, False])
+def test_since_until_window(time_ids: bool) -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for i in range(1, 7):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=f"时间窗口 {i}",
+            timestamp=1000 * i,
+            edited_timestamp=None,
+            source="import",
+            channel_username="a_channel",
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    # Legacy ids: pretend the database predates time-aligned ids.
+    repo.time_ids = time_ids
+
+    def ids(**window: int) -> list[int]:
+        return [row.message_id for row in repo.search('"窗口"', limit=10, **window)]
+
+    assert ids(since=2000, until=4000) == [4, 3, 2]
+    assert ids(since=4500) == [6, 5]
+    assert ids(until=1999) == [1]
+    assert ids(since=5000, until=2000) == []
+    assert repo.search_count('"窗口"', since=2000, until=4000) == 3
+    page = repo.search_page('"窗口"', limit=2, since=2000, until=5000, sort="relevance")
+    assert page.total == 4 and len(page.rows) == 2
+    first = repo.search('"窗口"', limit=2, since=2000, until=5000)
+    rest = repo.search('"窗口"', limit=2, since=2000, until=5000, after=(first[-1].timestamp, first[-1].id))
+    assert [row.message_id for row in first + rest] == [5, 4, 3, 2]
+
+
+def test_search_cache_hits_until_channel_write() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+
+    def msg(message_id: int, chat_id: int, text: str) -> NormalizedMessage:
+        return NormalizedMessage(
+            message_id=message_id,
+            chat_id=chat_id,
+            text=text,
+            timestamp=1000 + message_id,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+
+    repo.upsert_message(msg(1, 100, "缓存命中"), tokenizer.tokenize("缓存命中"))
+    repo.upsert_message(msg(2, 200, "缓存命中"), tokenizer.tokenize("缓存命中"))
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+
+    assert service.count("缓存") == 2
+    assert service.count(" 缓存 ") == 2
+    assert len(service.search("缓存", limit=10, channel_filter=100)) == 1
+    assert service.search_page("缓存", limit=10, channel_filter=100).total == 1
+    assert service.cache.stats.hits == 1
+
+    # A write to channel 200 keeps channel 100's entries, not the global ones.
+    repo.upsert_message(msg(3, 200, "缓存失效"), tokenizer.tokenize("缓存失效"))
+    assert len(service.search("缓存", limit=10, channel_filter=100)) == 1
+    assert service.cache.stats.hits == 2
+    assert service.count("缓存") == 3
+
+    repo.delete_message(100, 1)
+    assert service.search("缓存", limit=10, channel_filter=100) == []
+    assert service.cache.stats.stale == 2
+
+
+def test_whitelist_edits_invalidate_cached_unfiltered_searches() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for message_id, chat_id in [(1, 100), (2, 200)]:
+        msg = NormalizedMessage(
+            message_id=message_id,
+            chat_id=chat_id,
+            text="白名单缓存",
+            timestamp=1000 + message_id,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    repo.add_allowed_channel(100, "a")
+    repo.add_allowed_channel(200, "b")
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+
+    def chats() -> list[int]:
+        return sorted(row.chat_id for row in service.search("白名单", limit=10))
+
+    assert chats() == [100, 200]
+    assert chats() == [100, 200]
+    assert service.cache.stats.hits == 1
+
+    repo.disable_allowed_channel(200)
+    assert chats() == [100]
+    repo.enable_allowed_channel(200)
+    assert chats() == [100, 200]
+    repo.remove_allowed_channel(200)
+    assert chats() == [100]
+    repo.add_allowed_channel(200, "b")
+    assert chats() == [100, 200]
+    assert service.cache.stats.hits == 1
+
+
+def test_channel_directory_serves_resolution_without_sqlite() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    msg = NormalizedMessage(
+        message_id=1,
+        chat_id=100,
+        text="目录",
+        timestamp=1000,
+        edited_timestamp=None,
+        source="import",
+        channel_username="@a_channel",
+        source_link=None,
+    )
+    repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    statements: list[str] = []
+    repo.conn.set_trace_callback(statements.append)
+
+    assert repo.resolve_channel("#a_channel") == 100
+    assert repo.resolve_channel("@missing") is None
+    assert repo.is_channel_allowed(200)
+    assert statements == []
+
+    repo.add_allowed_channel(100, "A")
+    assert repo.is_channel_allowed(100) and not repo.is_channel_allowed(200)
+    repo.disable_allowed_channel(100)
+    assert not repo.is_channel_allowed(100)
+    repo.remove_allowed_channel(100)
+    assert repo.is_channel_allowed(200)
+
+    renamed = dataclasses.replace(msg, channel_username="b_channel")
+    repo.upsert_message(renamed, tokenizer.tokenize(renamed.text))
+    repo.conn.set_trace_callback(None)
+    assert repo.resolve_channel("@b_channel") == 100
+    assert repo.resolve_channel("@a_channel") is None
+
+
+def test_whitelist_applies_to_unfiltered_search_and_random() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for i in range(1, 7):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100 * (i % 3 + 1),
+            text=f"白名单 {i}",
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+    assert service.count("白名单") == 6
+
+    repo.add_allowed_channel(100, "A")
+    repo.add_allowed_channel(200, "B")
+    page = service.search_page("白名单", limit=3)
+    assert page.total == 4 and page.total_exact
+    assert {row.chat_id for row in page.rows} <= {100, 200}
+    assert len(service.search("白名单", limit=3, offset=3)) == 1
+    assert service.random_count() == 4
+    assert {row.chat_id for row in service.random(limit=10)} == {100, 200}
+
+    repo.disable_allowed_channel(100)
+    repo.disable_allowed_channel(200)
+    assert service.count("白名单") == 0
+    assert service.random(limit=10) == []
+
+
 def test_random_messages_with_channel_filter() -> None:
     repo = _repo()
     tokenizer = default_tokenizer()
@@ -108,3 +325,321 @@ def test_random_count_with_channel_filter() -> None:
 
     assert repo.random_count(channel="@a_channel") == 2
     assert repo.random_count(channel="@missing") == 0
+
+
+def test_search_cursor_pages_match_offset_pages() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for i in range(1, 8):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=f"翻页测试 {i}",
+            # Duplicate timestamps exercise the id tie-breaker.
+            timestamp=1000 + i // 2,
+            edited_timestamp=None,
+            source="import",
+            channel_username="a_channel",
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+
+    by_offset = [row.id for offset in range(0, 7, 3) for row in service.search("翻页", limit=3, offset=offset)]
+    by_cursor: list[int] = []
+    cursor = None
+    while True:
+        rows = service.search("翻页", limit=3, cursor=cursor)
+        by_cursor.extend(row.id for row in rows)
+        cursor = next_cursor(rows, 3)
+        if cursor is None:
+            break
+
+    assert by_cursor == by_offset
+    assert len(by_cursor) == 7
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_search_page_returns_rows_and_capped_total() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for i in range(1, 13):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=f"计数测试 {i}",
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="import",
+            channel_username="a_channel",
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+
+    exact = SearchService(repo=repo, tokenizer=tokenizer)
+    first = exact.search_page("计数", limit=5)
+    assert [row.id for row in first.rows] == [row.id for row in exact.search("计数", limit=5)]
+    assert (first.total, first.total_exact) == (12, True)
+    # The total stays exact on cursor pages and past the last page.
+    second = exact.search_page("计数", limit=5, cursor=next_cursor(first.rows, 5))
+    assert (len(second.rows), second.total) == (5, 12)
+    assert exact.search_page("计数", limit=5, offset=20).total == 12
+
+    capped = SearchService(repo=repo, tokenizer=tokenizer, count_limit=10)
+    page = capped.search_page("计数", limit=5)
+    assert (len(page.rows), page.total, page.total_exact) == (5, 10, False)
+    assert capped.search_page("计数", limit=5, exact=True).total == 12
+    assert capped.search_page("计数 12", limit=5).total_exact is True
+
+
+def test_random_slots_stay_dense_after_deletes() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    for i in range(1, 21):
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100 if i % 2 else 200,
+            text=f"随机抽样 {i}",
+            timestamp=1000 + i,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    for message_id in (1, 19, 4, 20, 7):
+        repo.delete_message(100 if message_id % 2 else 200, message_id)
+
+    slots = repo.conn.execute(
+        "SELECT s.chat_id, s.slot, m.chat_id AS owner FROM channel_message_slots s "
+        "JOIN channel_messages m ON m.id = s.message_row_id ORDER BY s.chat_id, s.slot"
+    ).fetchall()
+    by_chat: dict[int, list[int]] = {}
+    for row in slots:
+        assert row["chat_id"] == row["owner"]
+        by_chat.setdefault(row["chat_id"], []).append(row["slot"])
+    assert by_chat == {100: list(range(7)), 200: list(range(8))}
+
+    sampled = repo.random_messages(limit=50)
+    assert len(sampled) == 15
+    assert len({row.id for row in sampled}) == 15
+    assert {row.chat_id for row in repo.random_messages(limit=50, channel=200)} == {200}
+
+
+def test_init_db_backfills_random_slots() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    msg = NormalizedMessage(
+        message_id=1,
+        chat_id=100,
+        text="旧数据",
+        timestamp=1000,
+        edited_timestamp=None,
+        source="import",
+        channel_username=None,
+        source_link=None,
+    )
+    repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    with repo.conn:
+        repo.conn.execute("DELETE FROM channel_message_slots")
+        repo.conn.execute("DELETE FROM storage_meta WHERE key = 'random_index_version'")
+
+    init_db(repo.conn)
+
+    assert [row.message_id for row in repo.random_messages(limit=5)] == [1]
+
+
+def test_channel_stats_follow_inserts_updates_and_deletes() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+
+    def _msg(message_id: int, chat_id: int, timestamp: int) -> NormalizedMessage:
+        return NormalizedMessage(
+            message_id=message_id,
+            chat_id=chat_id,
+            text=f"统计 {message_id}",
+            timestamp=timestamp,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+
+    for message_id, chat_id, ts in [(1, 100, 1000), (2, 100, 1005), (3, 100, 1010), (4, 200, 2000)]:
+        msg = _msg(message_id, chat_id, ts)
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    repo.delete_message(100, 3)
+    moved = _msg(1, 100, 1003)
+    repo.upsert_message(moved, tokenizer.tokenize(moved.text))
+    repo.delete_message(200, 4)
+
+    stats = repo.get_channel_stats()
+    assert [(s.chat_id, s.message_count, s.first_timestamp, s.last_timestamp) for s in stats] == [
+        (100, 2, 1003, 1005)
+    ]
+    assert repo.random_count() == repo.get_all_messages_count() == 2
+    assert repo.random_count(channel=200) == 0
+
+
+def test_relevance_and_hybrid_sorts() -> None:
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    now = int(time.time())
+    day = 86400
+    texts = [
+        # (message_id, text, age in days)
+        (1, "相关度 相关度 相关度 排序", 400),
+        (2, "相关度 很长很长的一段其他内容 随便写点东西 凑一些字数 让这条的分数更低", 1),
+        (3, "相关度 相关度 排序", 40),
+    ]
+    for message_id, text, age in texts:
+        msg = NormalizedMessage(
+            message_id=message_id,
+            chat_id=100,
+            text=text,
+            timestamp=now - age * day,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    service = SearchService(repo=repo, tokenizer=tokenizer)
+
+    assert [row.message_id for row in service.search("相关度", limit=10)] == [2, 3, 1]
+    relevance = [row.message_id for row in service.search("相关度", limit=10, sort="relevance")]
+    assert relevance[-1] == 2
+    assert [row.message_id for row in service.search("相关度", limit=2, offset=1, sort="relevance")] == relevance[1:]
+    page = service.search_page("相关度", limit=1, sort="hybrid")
+    assert page.total == 3 and len(page.rows) == 1
+    with pytest.raises(ValueError):
+        service.search("相关度", limit=10, sort="relevance", cursor="djE6MTox")
+    with pytest.raises(ValueError):
+        service.search("相关度", limit=10, sort="newest")
+
+
+def test_hybrid_top_k_matches_full_sort() -> None:
+    from app.search.ranking import HybridRanking
+
+    repo = _repo()
+    tokenizer = default_tokenizer()
+    rng = random.Random(3)
+    now = int(time.time())
+    for i in range(1, 301):
+        text = "混合排序 " + " ".join(rng.choice(["混合", "排序", "填充", "内容"]) for _ in range(rng.randint(1, 12)))
+        msg = NormalizedMessage(
+            message_id=i,
+            chat_id=100,
+            text=text,
+            timestamp=now - rng.randint(0, 720) * 86400,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    ranking = HybridRanking(half_life_seconds=7 * 86400, recency_weight=5.0)
+
+    rows = repo.conn.execute(
+        "SELECT m.id, f.rank AS score, m.timestamp AS ts FROM channel_messages_fts f "
+        "JOIN channel_messages m ON m.id = f.rowid WHERE channel_messages_fts MATCH '\"混合\"'"
+    ).fetchall()
+    expected = [
+        row_id
+        for _, row_id in sorted((row["score"] * ranking.factor(now - row["ts"]), -row["id"]) for row in rows)
+    ][:15]
+    statements: list[str] = []
+    repo.conn.set_trace_callback(statements.append)
+    got = repo.search('"混合"', limit=10, offset=5, sort="hybrid", ranking=ranking)
+    repo.conn.set_trace_callback(None)
+    assert [row.id for row in got] == [-row_id for row_id in expected[5:15]]
+    # One ranking pass over the matches, then one lookup of the page's rows
+    # (FTS5's own shadow-table reads are traced with a leading "--").
+    queries = [sql for sql in statements if not sql.lstrip().startswith("--")]
+    assert sum("MATCH" in sql for sql in queries) == 1
+    assert len(queries) == 2
+
+
+def test_reorder_ids_aligns_rowids_with_time() -> None:
+    from app.storage.fts import FTS_MODE_CONTENTLESS, FTS_MODE_EXTERNAL
+    from app.storage.rowid_order import TIME_ID_SHIFT
+
+    tokenizer = default_tokenizer()
+
+    def _msg(message_id: int, timestamp: int) -> NormalizedMessage:
+        return NormalizedMessage(
+            message_id=message_id,
+            chat_id=100 + message_id % 2,
+            text=f"时间对齐 {message_id}",
+            timestamp=timestamp,
+            edited_timestamp=None,
+            source="import",
+            channel_username=None,
+            source_link=None,
+        )
+
+    for mode in (FTS_MODE_EXTERNAL, FTS_MODE_CONTENTLESS):
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = sqlite3.Row
+        init_db(conn, fts_mode=mode, tokenizer=tokenizer)
+        # A database from before time-aligned ids: live rows first, then an older import.
+        conn.execute("DELETE FROM storage_meta WHERE key = 'rowid_order'")
+        conn.commit()
+        repo = MessageRepository(conn, tokenizer=tokenizer)
+        for message_id, ts in [(10, 5000), (11, 5000), (1, 1000), (2, 3000), (3, 2000)]:
+            msg = _msg(message_id, ts)
+            repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+        before = [row.message_id for row in repo.search('"对齐"', limit=10)]
+
+        assert repo.reorder_ids() == 5
+        assert repo.time_ids
+
+        rows = conn.execute("SELECT id, timestamp FROM channel_messages").fetchall()
+        assert all(row["id"] >> TIME_ID_SHIFT == row["timestamp"] for row in rows)
+        assert [row.message_id for row in repo.search('"对齐"', limit=10)] == before == [11, 10, 2, 3, 1]
+        service = SearchService(repo=repo, tokenizer=tokenizer)
+        first = service.search("对齐", limit=2)
+        rest = service.search("对齐", limit=10, cursor=next_cursor(first, 2))
+        assert [row.message_id for row in first + rest] == before
+        assert len(repo.random_messages(limit=10)) == 5
+
+        # New and re-dated rows take time-aligned ids.
+        for msg in (_msg(4, 4000), _msg(1, 6000)):
+            repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+        assert [row.message_id for row in repo.search('"对齐"', limit=10)] == [1, 11, 10, 4, 2, 3]
+        assert repo.random_count() == 6
+        if mode == FTS_MODE_CONTENTLESS:
+            conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts, rank) VALUES('integrity-check', 0)")
+        else:
+            conn.execute("INSERT INTO channel_messages_fts(channel_messages_fts) VALUES('integrity-check')")
+
+
+def test_reorder_ids_can_run_again_after_deletes() -> None:
+    tokenizer = default_tokenizer()
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    init_db(conn, tokenizer=tokenizer)
+    repo = MessageRepository(conn, tokenizer=tokenizer)
+    for message_id in range(1, 6):
+        msg = NormalizedMessage(
+            message_id=message_id,
+            chat_id=100,
+            text=f"重复整理 {message_id}",
+            timestamp=1000,
+            edited_timestamp=None,
+            source="live",
+            channel_username=None,
+            source_link=None,
+        )
+        repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+    repo.delete_message(100, 2)
+
+    # Compacting ids within the second moves rows onto their neighbours' old ids.
+    assert repo.reorder_ids() == 3
+    assert repo.reorder_ids() == 0
+    assert [row.message_id for row in repo.search('"整理"', limit=10)] == [5, 4, 3, 1]
+    slots = conn.execute("SELECT message_row_id FROM channel_message_slots ORDER BY slot").fetchall()
+    ids = conn.execute("SELECT id FROM channel_messages").fetchall()
+    assert sorted(row[0] for row in slots) == sorted(row[0] for row in ids)
+    assert repo.random_count(channel=100) == 4
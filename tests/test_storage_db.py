@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.normalize.channel_message import NormalizedMessage
+from app.search.tokenizer import default_tokenizer
+from app.storage.db import ReadConnectionPool, connect_db, init_db
+from app.storage.repository import MessageRepository
+
+
+def _pooled_repo(tmp_path: Path, size: int = 2) -> MessageRepository:
+    db_path = str(tmp_path / "pool.db")
+    conn = connect_db(db_path, busy_timeout_ms=1234, pragmas={"cache_size": "-2048"})
+    init_db(conn)
+    pool = ReadConnectionPool(db_path, size=size, busy_timeout_ms=1234, pragmas={"cache_size": "-2048"})
+    return MessageRepository(conn, read_pool=pool)
+
+
+def test_read_pool_gives_each_thread_its_own_connection(tmp_path: Path) -> None:
+    repo = _pooled_repo(tmp_path)
+    barrier = threading.Barrier(2)
+    seen: list[int] = []
+
+    def _reader() -> None:
+        with repo.reader() as conn:
+            barrier.wait(timeout=5)
+            seen.append(id(conn))
+
+    threads = [threading.Thread(target=_reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(set(seen)) == 2
+    assert repo.conn is not None and id(repo.conn) not in seen
+
+
+def test_read_pool_connections_are_read_only_and_tuned(tmp_path: Path) -> None:
+    repo = _pooled_repo(tmp_path)
+    with repo.reader() as conn:
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+        assert conn.execute("PRAGMA cache_size").fetchone()[0] == -2048
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM channel_messages")
+
+
+def test_writes_are_visible_to_pooled_readers(tmp_path: Path) -> None:
+    repo = _pooled_repo(tmp_path)
+    tokenizer = default_tokenizer()
+    msg = NormalizedMessage(
+        message_id=1,
+        chat_id=100,
+        text="你好世界",
+        timestamp=1000,
+        edited_timestamp=None,
+        source="live",
+        channel_username="a_channel",
+        source_link=None,
+    )
+    repo.upsert_message(msg, tokenizer.tokenize(msg.text))
+
+    assert repo.resolve_channel("@a_channel") == 100
+    assert len(repo.search('"你好"*', limit=10)) == 1
+
+
+def test_invalid_pragma_is_rejected(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        connect_db(str(tmp_path / "bad.db"), pragmas={"cache_size": "1; DROP TABLE x"})
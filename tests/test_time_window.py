@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+
+from app.interaction.parser import parse_search_input
+from app.search.time_window import parse_time_bound
+
+
+def test_parse_time_bound_formats() -> None:
+    may = int(dt.datetime(2024, 5, 1).timestamp())
+    june = int(dt.datetime(2024, 6, 1).timestamp())
+    assert parse_time_bound("1700000000") == 1700000000
+    assert parse_time_bound("2024-05-01") == may
+    assert parse_time_bound("2024-05-01", end=True) == int(dt.datetime(2024, 5, 2).timestamp()) - 1
+    assert parse_time_bound("2024-05", end=True) == june - 1
+    assert parse_time_bound("7d", now=1_000_000) == 1_000_000 - 7 * 86400
+    assert parse_time_bound(" ") is None
+    with pytest.raises(ValueError):
+        parse_time_bound("2024-13-01")
+    with pytest.raises(ValueError):
+        parse_time_bound("yesterday")
+
+
+def test_parse_search_input_extracts_time_window() -> None:
+    parsed = parse_search_input("@mychannel since:2024-05 until:2024-05 你好 sort:relevance", mode="private")
+    assert parsed.channel == "@mychannel"
+    assert parsed.query == "你好"
+    assert parsed.sort == "relevance"
+    assert parsed.since == int(dt.datetime(2024, 5, 1).timestamp())
+    assert parsed.until == int(dt.datetime(2024, 6, 1).timestamp()) - 1
+
+    # Values that are not times stay part of the query.
+    parsed = parse_search_input("#mychannel until:someday 你好", mode="inline")
+    assert parsed.query == "until:someday 你好"
+    assert parsed.until is None